@@ -1,7 +1,9 @@
 
 
-from django.contrib import admin
-from .models import Department, Teacher, Application, ApplicationFile, Payment
+from django.contrib import admin, messages
+from .models import Department, Teacher, Application, ApplicationFile, Payment, ApplicationEvent
+from .seats import allocate_seats
+from . import events
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
@@ -11,10 +13,11 @@ class DepartmentAdmin(admin.ModelAdmin):
 @admin.register(Teacher)
 class TeacherAdmin(admin.ModelAdmin):
     list_display = ('name','department','position','email')
+    list_select_related = ('department',)  # department is nullable, so the default select_related() skips it
 
 class ApplicationFileInline(admin.TabularInline):
     model = ApplicationFile
-    readonly_fields = ('uploaded_at',)
+    readonly_fields = ('uploaded_at', 'verification', 'verification_detail', 'verified_at')
     extra = 0
 
 
@@ -22,6 +25,43 @@ class ApplicationFileInline(admin.TabularInline):
 class ApplicationAdmin(admin.ModelAdmin):
     list_display = ('id','full_name','department','program','status','applied_at')
     inlines = [ApplicationFileInline]
+    actions = ['accept_selected']
+
+    @admin.action(description='Accept selected applications (allocate seats)')
+    def accept_selected(self, request, queryset):
+        accepted, refused = allocate_seats(list(queryset.exclude(status='accepted').order_by('applied_at')),
+                                           actor=request.user, source='admin')
+        self.message_user(request, f'{len(accepted)} application(s) accepted.')
+        if refused:
+            self.message_user(request, f'{len(refused)} application(s) not accepted: no seats left.', messages.WARNING)
+
+    def save_model(self, request, obj, form, change):
+        with events.atomic():
+            super().save_model(request, obj, form, change)
+            if not change:
+                events.record(obj, 'created', new_status=obj.status, actor=request.user, source='admin')
+            elif 'status' in form.changed_data:
+                events.record(obj, 'status', form.initial.get('status', ''), obj.status, request.user, 'admin')
+
+
+@admin.register(ApplicationEvent)
+class ApplicationEventAdmin(admin.ModelAdmin):
+    # application_id, not application: no query per row, and the events of a
+    # deleted application still list (a join on it would drop them)
+    list_display = ('created_at', 'application_id', 'kind', 'old_status', 'new_status', 'actor', 'source')
+    list_filter = ('kind', 'source')
+    date_hierarchy = 'created_at'
+    list_select_related = ('actor',)
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 
@@ -0,0 +1,351 @@
+"""Admission control for the application submit endpoint.
+
+On deadline day far more submissions arrive than the workers and the single
+SQLite writer can absorb.  Rather than letting every request queue inside
+the server until it times out (and possibly leaves a half-saved
+application), ``admission_control`` decides up front, using a few cache
+reads and writes, whether a submission runs now:
+
+* each client has a small token bucket, so one browser retrying in a loop
+  cannot take the whole capacity (excess gets a cheap 429 asking it to try
+  again later).  The client is the connecting address, or with
+  ``TRUSTED_PROXIES`` set, the address that many proxy hops back in
+  X-Forwarded-For; anything further left is whatever the client sent;
+* a global token bucket caps submissions per second at what the database
+  sustains;
+* when the global bucket is empty the client gets a signed, numbered queue
+  ticket and the waiting-room page instead.  Tickets are released in order
+  at the global rate, and while anyone is queued new arrivals queue behind
+  them.  A waiting ticket keeps its place only while its holder checks in
+  (the waiting-room page reloads every third of ``TICKET_HEARTBEAT``), so
+  tickets abandoned in a closed tab are skipped instead of holding up
+  everyone behind them.  A released ticket lets its holder submit once,
+  ahead of new arrivals but still through the global bucket, so holders
+  returning together do not hit the database all at once;
+* ``hold_for_form`` applies the same queue to the GET of the application
+  form, so while submissions are queued applicants wait before they fill
+  the form in rather than losing it to a busy page when they submit;
+* at most ``CONCURRENCY`` submissions run at a time in each process, which
+  keeps SQLite writers from piling up behind its lock.
+
+State lives in the cache named by ``ADMISSION_CONTROL['CACHE']``, an
+alias of its own so that culling in the busy default cache cannot drop the
+queue position or the record of a used ticket.  Buckets and the queue are
+read and written under a short lock taken with the cache's atomic add(), so
+concurrent submissions cannot spend the same token or queue slot twice.
+The local-memory backend is per process; point the alias at a shared one
+(see CACHE_URL in settings) when running several workers.
+"""
+import time
+import uuid
+import asyncio
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import render
+from django.urls import reverse
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE': 'admission',
+    'TRUSTED_PROXIES': 0,  # proxies in front that append to X-Forwarded-For
+    'RATE': 20.0,          # submissions per second across the site
+    'BURST': 40,
+    'CLIENT_RATE': 0.2,    # submissions per second from one client
+    'CLIENT_BURST': 3,
+    'TICKET_TTL': 30 * 60,  # seconds a released ticket stays usable
+    'TICKET_HEARTBEAT': 30,  # seconds a waiting ticket keeps its place without checking in
+    'CONCURRENCY': 4,      # submissions running at once per process
+    'CONCURRENCY_WAIT': 0.5,
+}
+TICKET_COOKIE = 'uap_queue_ticket'
+TICKET_SALT = 'admission.waiting_room'
+QUEUE_KEY = 'admission:queue'  # (tickets issued, tickets served, time of the last release)
+LOCK_TTL = 2      # seconds a crashed lock holder can block a bucket
+LOCK_WAIT = 0.5   # seconds to wait for a lock before shedding the request
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'ADMISSION_CONTROL', {})}
+
+
+def client_key(request, trusted_proxies=0):
+    """The client's address: REMOTE_ADDR, or the X-Forwarded-For entry the
+    outermost of trusted_proxies proxies received the request from."""
+    if trusted_proxies:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+@contextmanager
+def cache_lock(cache, key, wait=LOCK_WAIT):
+    """Hold key as a lock for at most LOCK_TTL seconds; yields whether it was acquired within wait."""
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not cache.add(key, token, timeout=LOCK_TTL):
+        if time.monotonic() >= deadline:
+            yield False
+            return
+        time.sleep(0.001)
+    try:
+        yield True
+    finally:
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def take_token(cache, key, rate, burst, now=None):
+    """Take one token from the bucket at key; returns (ok, seconds until one is free)."""
+    now = time.time() if now is None else now
+    with cache_lock(cache, key + ':lock') as locked:
+        if not locked:
+            return False, 1.0
+        tokens, stamp = cache.get(key, (burst, now))
+        now = max(now, stamp)
+        tokens = min(burst, tokens + (now - stamp) * rate)
+        ok = tokens >= 1
+        cache.set(key, (tokens - 1 if ok else tokens, now), timeout=max(60, int(burst / rate) + 1))
+    return (True, 0.0) if ok else (False, (1 - tokens) / rate)
+
+
+def peek_tokens(cache, key, rate, burst, now=None):
+    """Tokens in the bucket at key, without taking one."""
+    now = time.time() if now is None else now
+    tokens, stamp = cache.get(key, (burst, now))
+    return min(burst, tokens + max(0.0, now - stamp) * rate)
+
+
+def _advance(cache, conf, now):
+    """Release waiting tickets at RATE since the last release, skipping any whose
+    holder stopped checking in; call with the queue lock held."""
+    issued, served, stamp = cache.get(QUEUE_KEY, (0, 0, now))
+    now = max(now, stamp)
+    budget = (now - stamp) * conf['RATE']
+    while served < issued:
+        if cache.get(f'admission:alive:{served}') is None:
+            served += 1  # abandoned: its slot goes to the next holder
+            continue
+        if budget < 1:
+            break
+        cache.set(f'admission:released:{served}', now, timeout=conf['TICKET_TTL'])
+        served += 1
+        budget -= 1
+    stamp = now if served == issued else now - budget / conf['RATE']
+    cache.set(QUEUE_KEY, (issued, served, stamp), timeout=None)
+    return issued, served, stamp
+
+
+def issue_ticket(cache, conf, now=None):
+    """Queue a new ticket behind everyone already waiting; returns (ticket, release_at),
+    or (None, None) if the queue could not be locked in time.  release_at is an
+    estimate: it comes sooner if tickets ahead are abandoned."""
+    now = time.time() if now is None else now
+    with cache_lock(cache, QUEUE_KEY + ':lock') as locked:
+        if not locked:
+            return None, None
+        number, served, stamp = _advance(cache, conf, now)
+        cache.set(f'admission:alive:{number}', 1, timeout=conf['TICKET_HEARTBEAT'])
+        cache.set(QUEUE_KEY, (number + 1, served, stamp), timeout=None)
+    ticket = signing.dumps({'id': uuid.uuid4().hex, 'n': number}, salt=TICKET_SALT)
+    return ticket, stamp + (number - served + 1) / conf['RATE']
+
+
+def read_ticket(request, ttl):
+    """The (id, number) of the request's ticket, or None if missing or forged."""
+    raw = request.COOKIES.get(TICKET_COOKIE)
+    if not raw:
+        return None
+    try:
+        data = signing.loads(raw, salt=TICKET_SALT, max_age=ttl + 24 * 3600)
+    except signing.BadSignature:
+        return None
+    return data['id'], data['n']
+
+
+def check_in(cache, conf, ticket, now=None):
+    """Advance the queue and keep ticket's place while it waits.  Returns
+    ('waiting', release_at, ahead), ('released', None, 0) while the ticket is
+    released and unused, or (None, None, None) once it has been used, has
+    expired or was skipped (or when the queue could not be locked)."""
+    now = time.time() if now is None else now
+    ticket_id, number = ticket
+    with cache_lock(cache, QUEUE_KEY + ':lock') as locked:
+        if not locked:
+            return None, None, None
+        issued, served, stamp = _advance(cache, conf, now)
+        if served <= number < issued:
+            cache.set(f'admission:alive:{number}', 1, timeout=conf['TICKET_HEARTBEAT'])
+            return 'waiting', stamp + (number - served + 1) / conf['RATE'], number - served
+    if (cache.get(f'admission:released:{number}') is not None
+            and cache.get(f'admission:used:{ticket_id}') is None):
+        return 'released', None, 0
+    return None, None, None
+
+
+def poll_interval(conf):
+    """Seconds between check-ins of a waiting ticket, well inside TICKET_HEARTBEAT."""
+    return max(1, int(conf['TICKET_HEARTBEAT'] // 3))
+
+
+def set_ticket(response, ticket, conf):
+    response.set_cookie(TICKET_COOKIE, ticket, max_age=conf['TICKET_TTL'] + 24 * 3600,
+                        httponly=True, samesite='Lax')
+
+
+def waiting_room_response(request, status=200):
+    """The full waiting-room page for the request's ticket; checking in here is
+    what keeps a waiting ticket's place (see views.waiting_room)."""
+    conf = config()
+    ticket = read_ticket(request, conf['TICKET_TTL'])
+    state, release_at, ahead = None, None, None
+    if ticket is not None:
+        state, release_at, ahead = check_in(caches[conf['CACHE']], conf, ticket)
+    wait = max(1, int(release_at - time.time() + 0.999)) if state == 'waiting' else 0
+    return render(request, 'admission/waiting_room.html', {
+        'queued': state is not None,
+        'wait_seconds': wait,
+        'refresh_seconds': min(wait, poll_interval(conf)),
+        'ahead': ahead,
+    }, status=status)
+
+
+def throttled_response(release_at, status=503, ticket=None, queued=True):
+    """Small fixed page sent while shedding load, so overload costs no template
+    rendering or session work.  A queued client (holding a ticket or given one
+    here) is forwarded to the waiting room and told to check in again within
+    the heartbeat; anyone else is asked to try again after Retry-After."""
+    conf = config()
+    wait = max(0, int(release_at - time.time() + 0.999))
+    if queued:
+        url = reverse('admission:waiting_room')
+        body = (f'<!doctype html><meta http-equiv="refresh" content="0;url={url}">'
+                f'<p>The application service is busy. <a href="{url}">Continue to the waiting room</a>.</p>')
+        wait = min(wait, poll_interval(conf))
+    else:
+        body = ('<!doctype html><p>The application service is busy. Wait a few seconds, then use your '
+                "browser's Back button to return to the form you filled in and submit it.</p>")
+    response = HttpResponse(body, status=status)
+    response['Retry-After'] = str(max(1, wait))
+    if ticket:
+        set_ticket(response, ticket, conf)
+    return response
+
+
+def run_limited(conf, view_func, request, *args, **kwargs):
+    """Run the view if one of the process's CONCURRENCY slots frees up in time."""
+    with _slots_lock:
+        slots = _slots.get(conf['CONCURRENCY'])
+        if slots is None:
+            slots = _slots[conf['CONCURRENCY']] = threading.BoundedSemaphore(conf['CONCURRENCY'])
+    if not slots.acquire(timeout=conf['CONCURRENCY_WAIT']):
+        return None
+    try:
+        return view_func(request, *args, **kwargs)
+    finally:
+        slots.release()
+
+
+def admission_control(view_func):
+    """Run view_func only when the client and the site have capacity (see module docstring)."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        conf = config()
+        if not conf['ENABLED'] or request.method != 'POST':
+            return view_func(request, *args, **kwargs)
+        cache = caches[conf['CACHE']]
+        now = time.time()
+
+        ok, retry = take_token(cache, f'admission:client:{client_key(request, conf["TRUSTED_PROXIES"])}',
+                               conf['CLIENT_RATE'], conf['CLIENT_BURST'], now)
+        if not ok:
+            return throttled_response(now + retry, status=429, queued=False)
+
+        ticket = read_ticket(request, conf['TICKET_TTL'])
+        holder = False
+        if ticket is not None:
+            state, release_at, _ = check_in(cache, conf, ticket, now)
+            if state == 'waiting':
+                return throttled_response(release_at)
+            holder = state == 'released'
+
+        issued, served, _ = cache.get(QUEUE_KEY, (0, 0, now))
+        if holder or served >= issued:
+            ok, retry = take_token(cache, 'admission:global', conf['RATE'], conf['BURST'], now)
+            if not ok and holder and retry <= LOCK_WAIT:
+                # released holders come in at RATE, so a token is rarely more than a moment away
+                time.sleep(retry)
+                ok, retry = take_token(cache, 'admission:global', conf['RATE'], conf['BURST'])
+            if ok and (not holder or cache.add(f'admission:used:{ticket[0]}', 1,
+                                               timeout=conf['TICKET_TTL'] + 24 * 3600)):
+                response = run_limited(conf, view_func, request, *args, **kwargs)
+                if response is None:
+                    if holder:
+                        cache.delete(f'admission:used:{ticket[0]}')
+                    return throttled_response(time.time() + 1, queued=holder)
+                if holder:
+                    response.delete_cookie(TICKET_COOKIE)
+                return response
+            if holder:
+                # keep the ticket and come straight back for the next token
+                return throttled_response(now + retry)
+
+        ticket, release_at = issue_ticket(cache, conf, now)
+        if ticket is None:
+            return throttled_response(now + 1, queued=False)
+        return throttled_response(release_at, ticket=ticket)
+    return wrapper
+
+
+def hold_response(request):
+    """The redirect to the waiting room for a visitor who should queue before
+    filling in the form, or None to show them the form."""
+    conf = config()
+    if not conf['ENABLED'] or request.method != 'GET':
+        return None
+    cache = caches[conf['CACHE']]
+    now = time.time()
+    ticket = read_ticket(request, conf['TICKET_TTL'])
+    if ticket is not None:
+        state, _, _ = check_in(cache, conf, ticket, now)
+        if state == 'released':
+            return None
+        if state == 'waiting':
+            return HttpResponseRedirect(reverse('admission:waiting_room'))
+
+    issued, served, _ = cache.get(QUEUE_KEY, (0, 0, now))
+    if served >= issued and peek_tokens(cache, 'admission:global', conf['RATE'], conf['BURST'], now) >= 1:
+        return None
+    ticket, _ = issue_ticket(cache, conf, now)
+    if ticket is None:
+        return None  # the submit is still gated by admission_control
+    response = HttpResponseRedirect(reverse('admission:waiting_room'))
+    set_ticket(response, ticket, conf)
+    return response
+
+
+def hold_for_form(view_func):
+    """Queue visitors in the waiting room before they see the form while
+    submissions are queued or the site is at capacity (see module docstring)."""
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            response = await sync_to_async(hold_response)(request)
+            if response is not None:
+                return response
+            return await view_func(request, *args, **kwargs)
+    else:
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return hold_response(request) or view_func(request, *args, **kwargs)
+    return wrapper
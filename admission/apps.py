@@ -8,3 +8,6 @@ class AdmissionConfig(AppConfig):
    
     
     name = 'admission' 
+
+    def ready(self):
+        from . import catalog, fees, reports, seats, sessions, slow_queries  # noqa: F401  (connect their signal receivers)
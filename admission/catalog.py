@@ -0,0 +1,42 @@
+"""Cached department and teacher lists for the public pages.
+
+The lists change a few times a term but are read on every page view, so
+they are kept in the default cache and dropped whenever a Department or
+Teacher is saved or deleted.  Lookups use the async cache and ORM APIs for
+the async views; cache fills read from the primary, because filling from a
+lagging replica right after an invalidation would cache the old rows again.
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Department, Teacher
+
+
+DEPARTMENTS_KEY = 'admission:catalog:departments'
+TEACHERS_KEY = 'admission:catalog:teachers'
+CATALOG_TTL = 10 * 60
+
+
+async def adepartments():
+    departments = await cache.aget(DEPARTMENTS_KEY)
+    if departments is None:
+        departments = [d async for d in Department.objects.using(DEFAULT_DB_ALIAS).order_by('code')]
+        await cache.aset(DEPARTMENTS_KEY, departments, CATALOG_TTL)
+    return departments
+
+
+async def ateachers():
+    teachers = await cache.aget(TEACHERS_KEY)
+    if teachers is None:
+        teachers = [t async for t in Teacher.objects.using(DEFAULT_DB_ALIAS)
+                    .select_related('department').order_by('department__code', 'name')]
+        await cache.aset(TEACHERS_KEY, teachers, CATALOG_TTL)
+    return teachers
+
+
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Teacher)
+def invalidate_catalog(sender, **kwargs):
+    cache.delete_many([DEPARTMENTS_KEY, TEACHERS_KEY])
@@ -0,0 +1,164 @@
+"""Primary/replica database routing.
+
+Writes always go to ``default``.  Reads of admission data go to the
+``replica`` alias only inside code that opted in (views, sync or async,
+decorated with ``@replica_reads()``, such as application_detail, and
+blocks wrapped in ``with replica_reads():``, such as the staff reports),
+and only while the replica database exists.  The public catalog pages read
+from a cache that is filled from the primary instead; see catalog.py.
+
+The replica is a copy of the primary SQLite file refreshed by
+``manage.py refresh_replica``, so report queries never hold read locks on
+the file application_create writes to.
+
+Read-your-writes: once a request (or a ``replica_reads()`` block outside
+one) writes, the rest of it reads from the primary, and
+``PinPrimaryMiddleware`` sets a short-lived cookie so the client's next
+requests (typically the redirect after a POST) also read from the primary
+until the replica has had time to catch up.  Every request that writes sets
+the cookie afresh, so the pin always runs from the last write.  Writes
+outside both scopes (management commands, worker threads) pin nothing.
+"""
+import os
+import time
+import functools
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+
+REPLICA = 'replica'
+REPLICA_APPS = {'admission'}
+PIN_COOKIE = 'uap_pin_primary'
+
+_use_replica = ContextVar('use_replica', default=False)
+# None outside a request or replica_reads() block: nothing to pin there
+_pinned = ContextVar('pinned_to_primary', default=None)
+_wrote = ContextVar('wrote_to_primary', default=None)
+
+
+class replica_reads:
+    """Route reads in the decorated view (sync or async) or with-block to the replica."""
+
+    def __enter__(self):
+        self._tokens = [_use_replica.set(True)]
+        if _pinned.get() is None:
+            self._tokens.append(_pinned.set(False))
+        return self
+
+    def __exit__(self, *exc_info):
+        for token in reversed(self._tokens):
+            token.var.reset(token)
+
+    def __call__(self, func):
+        # A fresh instance per call: one decorated view serves many requests at once.
+        if iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def inner(*args, **kwargs):
+                with replica_reads():
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def inner(*args, **kwargs):
+                with replica_reads():
+                    return func(*args, **kwargs)
+        return inner
+
+
+_replica_ready = False
+
+
+def replica_available():
+    """True once the replica alias is configured and its database file exists."""
+    global _replica_ready
+    if _replica_ready:
+        return True
+    if REPLICA not in settings.DATABASES:
+        return False
+    conf = connections[REPLICA].settings_dict
+    if conf['NAME'] == connections['default'].settings_dict['NAME']:
+        # a test mirror: same data, so read it through the primary's connection
+        return False
+    _replica_ready = conf['ENGINE'] != 'django.db.backends.sqlite3' or os.path.exists(conf['NAME'])
+    return _replica_ready
+
+
+def replica_as_of():
+    """
+    Unix time up to which replica reads see the primary's data: the last
+    refresh_replica copy of an SQLite replica, or now when reads go to the
+    primary (or to a replica kept current by real replication).
+    """
+    if replica_available():
+        conf = connections[REPLICA].settings_dict
+        if conf['ENGINE'] == 'django.db.backends.sqlite3':
+            return os.path.getmtime(conf['NAME'])
+    return time.time()
+
+
+class PrimaryReplicaRouter:
+    # Only admission data is read from the replica: sessions and users must
+    # be fresh, and they are cheap primary-key lookups anyway.
+    def db_for_read(self, model, **hints):
+        if (_use_replica.get() and not _pinned.get()
+                and model._meta.app_label in REPLICA_APPS and replica_available()):
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:
+            if _pinned.get() is not None:
+                _pinned.set(True)
+            if _wrote.get() is not None:
+                _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema and data from refresh_replica
+        return db != REPLICA
+
+
+class PinPrimaryMiddleware:
+    """Pin a client to the primary for REPLICA_PIN_SECONDS after it writes.
+
+    Sync and async capable, so under ASGI it does not push async views
+    through a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _pinned.set(PIN_COOKIE in request.COOKIES)
+        wrote = _wrote.set(False)
+        try:
+            return self.pin(request, self.get_response(request))
+        finally:
+            _wrote.reset(wrote)
+            _pinned.reset(token)
+
+    async def __acall__(self, request):
+        token = _pinned.set(PIN_COOKIE in request.COOKIES)
+        wrote = _wrote.set(False)
+        try:
+            return self.pin(request, await self.get_response(request))
+        finally:
+            _wrote.reset(wrote)
+            _pinned.reset(token)
+
+    def pin(self, request, response):
+        if _wrote.get():
+            response.set_cookie(PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 60),
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,154 @@
+"""Content checks for uploaded application documents.
+
+check_document() looks at the bytes of one file, not its name:
+
+* the file type comes from its first bytes (PNG, JPEG or PDF) and has to be
+  one the document kind accepts;
+* images are opened with Pillow, verified, decoded at reduced size, and must
+  be at least the kind's minimum dimensions and not a single flat colour;
+* PDFs need a header and an end-of-file marker, must not be encrypted, and
+  their page count (from the page tree, including compressed object
+  streams) must be between 1 and MAX_PDF_PAGES.
+
+No file larger than MAX_FILE_SIZE is read, and the object streams of a PDF
+may inflate to MAX_INFLATE bytes in all, so a small crafted upload cannot
+make the checker allocate gigabytes.
+
+It takes plain arguments and imports nothing from Django, so the
+verify_documents command can run it in a process pool.
+"""
+import os
+import re
+import zlib
+
+from PIL import Image
+
+
+DEFAULTS = {
+    'KIND_TYPES': {'photo': ['png', 'jpeg'], 'sign': ['png', 'jpeg'], 'transcript': ['pdf', 'png', 'jpeg']},
+    'MIN_IMAGE_SIZE': {'photo': (300, 300), 'sign': (150, 50), 'transcript': (600, 800)},
+    'MAX_PDF_PAGES': 50,
+    'BLANK_SPREAD': 8,  # images whose darkest and lightest pixel differ by less are blank
+    'MAX_FILE_SIZE': 10 * 1024 * 1024,  # the largest upload (uploads.DEFAULTS['MAX_SIZE'])
+    'MAX_INFLATE': 32 * 1024 * 1024,    # bytes of decompressed object streams per PDF
+}
+SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'%PDF-', 'pdf'),
+]
+PAGES_COUNT = re.compile(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b')
+OBJECT_STREAM = re.compile(rb'/Type\s*/ObjStm\b.*?stream\r?\n', re.S)
+ENCRYPT = re.compile(rb'/Encrypt\s')
+CONTENTS = re.compile(rb'/Contents\b')
+
+
+class DocumentError(Exception):
+    pass
+
+
+def sniff(head):
+    for magic, kind in SIGNATURES:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def _object_streams(data, limit):
+    """
+    Decompressed contents of the PDF's object streams (PDF 1.5+ keeps the
+    page tree there), at most limit bytes of them in all.
+    """
+    for match in OBJECT_STREAM.finditer(data):
+        end = data.find(b'endstream', match.end())
+        if end < 0:
+            raise DocumentError('PDF is truncated')
+        if limit <= 0:  # max_length=0 would mean no limit at all
+            raise DocumentError('PDF object streams are too large')
+        inflate = zlib.decompressobj()
+        try:
+            section = inflate.decompress(data[match.end():end], limit)
+        except zlib.error:
+            raise DocumentError('PDF has a corrupt object stream')
+        if inflate.unconsumed_tail:
+            raise DocumentError('PDF object streams are too large')
+        limit -= len(section)
+        yield section
+
+
+def inspect_pdf(path, conf):
+    with open(path, 'rb') as f:
+        data = f.read(conf['MAX_FILE_SIZE'])
+    if b'%%EOF' not in data[-1024:]:
+        raise DocumentError('PDF is truncated')
+    if ENCRYPT.search(data):
+        raise DocumentError('PDF is encrypted')
+    sections = [data]
+    if not PAGES_COUNT.search(data) or not CONTENTS.search(data):
+        sections.extend(_object_streams(data, conf['MAX_INFLATE']))
+    counts = [int(a or b) for section in sections for a, b in PAGES_COUNT.findall(section)]
+    pages = max(counts, default=0)
+    if not pages:
+        raise DocumentError('PDF has no pages')
+    if pages > conf['MAX_PDF_PAGES']:
+        raise DocumentError(f'PDF has {pages} pages (at most {conf["MAX_PDF_PAGES"]})')
+    if not any(CONTENTS.search(section) for section in sections):
+        raise DocumentError('PDF pages are blank')
+    return {'pages': pages}
+
+
+def inspect_image(path, kind, conf):
+    try:
+        with Image.open(path) as im:
+            im.verify()
+        with Image.open(path) as im:
+            width, height = im.size
+            im.draft('L', (256, 256))  # JPEG decodes at a fraction of full size
+            im = im.convert('L')
+            im.thumbnail((256, 256))
+            low, high = im.getextrema()
+    except Image.DecompressionBombError:
+        raise DocumentError('image has too many pixels')
+    except (OSError, SyntaxError, ValueError) as exc:
+        raise DocumentError(f'image is corrupt ({exc})')
+    min_width, min_height = conf['MIN_IMAGE_SIZE'].get(kind, (1, 1))
+    if width < min_width or height < min_height:
+        raise DocumentError(f'image is {width}x{height} (at least {min_width}x{min_height})')
+    if high - low < conf['BLANK_SPREAD']:
+        raise DocumentError('image is blank')
+    return {'width': width, 'height': height}
+
+
+def check_document(path, kind, conf=DEFAULTS):
+    """
+    Check one file; returns {'ok': bool, 'type', 'size', 'errors': [...]} plus
+    'pages' for PDFs or 'width'/'height' for images.  Never raises: any
+    error is recorded in 'errors'.
+    """
+    result = {'ok': False, 'type': None, 'size': 0, 'errors': []}
+    try:
+        result['size'] = os.path.getsize(path)
+        if not result['size']:
+            raise DocumentError('file is empty')
+        if result['size'] > conf['MAX_FILE_SIZE']:
+            raise DocumentError(f'file is larger than {conf["MAX_FILE_SIZE"]:,} bytes')
+        with open(path, 'rb') as f:
+            result['type'] = sniff(f.read(16))
+        if result['type'] is None:
+            raise DocumentError('not a PNG, JPEG or PDF file')
+        if result['type'] not in conf['KIND_TYPES'].get(kind, ()):
+            raise DocumentError(f'{result["type"]} is not accepted for {kind}')
+        if result['type'] == 'pdf':
+            result.update(inspect_pdf(path, conf))
+        else:
+            result.update(inspect_image(path, kind, conf))
+    except FileNotFoundError:
+        result['errors'].append('file is missing')
+    except DocumentError as exc:
+        result['errors'].append(str(exc))
+    except Exception as exc:
+        # Unreadable file or a checker bug: report it for this document
+        # rather than failing the whole batch in verify_documents.
+        result['errors'].append(f'could not be checked ({type(exc).__name__}: {exc})')
+    result['ok'] = not result['errors']
+    return result
@@ -0,0 +1,94 @@
+"""Recording and reading the ApplicationEvent log.
+
+Every change to an application's status appends one ApplicationEvent (who,
+what, from which status to which, when); rows are never updated.  Writers
+wrap the change in ``events.atomic()``: events recorded inside it are
+buffered and inserted with bulk_create just before the block commits, so
+they land in the same transaction as the change and a batch of N
+acceptances costs a few INSERTs rather than N.  ``record()`` outside a
+batch inserts the event at once (still inside any transaction in progress).
+
+Readers use the (created_at, id) index for time ranges and the primary key
+for checkpoints: ``read_new('nightly-export')`` returns the events since
+that reader's EventCheckpoint and moves it forward when the reader's
+transaction commits.  Ids are handed out in commit order because SQLite
+runs one writer at a time; with concurrent writers (PostgreSQL) give
+in-flight transactions time to commit before reading up to the newest id.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .models import ApplicationEvent, EventCheckpoint
+
+
+BATCH_SIZE = 500
+_batch = ContextVar('admission_event_batch', default=None)
+
+
+def record(application, kind, old_status='', new_status='', actor=None, source='', **data):
+    """Append an event for application (an Application or its pk)."""
+    event = ApplicationEvent(
+        application_id=getattr(application, 'pk', application),
+        kind=kind, old_status=old_status or '', new_status=new_status or '',
+        actor=actor if getattr(actor, 'is_authenticated', False) else None,
+        source=source, data=data,
+    )
+    batch = _batch.get()
+    if batch is None:
+        ApplicationEvent.objects.bulk_create([event])
+    else:
+        batch.append(event)
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+
+
+def status_changed(application, new_status, actor=None, source='', **data):
+    """Record application's move from its current status to new_status, then set it (not saved)."""
+    record(application, 'status', application.status, new_status, actor, source, **data)
+    application.status = new_status
+
+
+def flush(batch):
+    ApplicationEvent.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+    batch.clear()
+
+
+@contextmanager
+def atomic(using=None):
+    """transaction.atomic() whose recorded events are inserted just before it commits."""
+    with transaction.atomic(using=using):
+        batch = []
+        token = _batch.set(batch)
+        try:
+            yield
+            flush(batch)
+        finally:
+            _batch.reset(token)
+
+
+def events_between(start, end):
+    """Events with start <= created_at < end, oldest first (served by the time index)."""
+    return ApplicationEvent.objects.filter(created_at__gte=start, created_at__lt=end).order_by('created_at', 'id')
+
+
+def events_since(event_id, limit=1000):
+    """Up to limit events after event_id, oldest first."""
+    return list(ApplicationEvent.objects.filter(id__gt=event_id).order_by('id')[:limit])
+
+
+def read_new(name, limit=1000):
+    """
+    The events the reader called name has not seen yet, at most limit of
+    them, moving its checkpoint past them.  Call it inside the transaction
+    that processes the events, so a reader that fails half-way reads them
+    again.
+    """
+    with transaction.atomic():
+        checkpoint, _ = EventCheckpoint.objects.select_for_update().get_or_create(name=name)
+        new = events_since(checkpoint.event_id, limit)
+        if new:
+            checkpoint.event_id = new[-1].id
+            checkpoint.save(update_fields=['event_id', 'updated_at'])
+    return new
@@ -0,0 +1,154 @@
+"""Server-side fee engine.
+
+Every fee shown or charged comes from one FeeTable, built from the
+Department rows and the fee policy below (overridable through
+``settings.ADMISSION_FEES``):
+
+* the application fee depends on the program;
+* tuition is credits x the department's per-credit fee, where bachelors use
+  the department's total credits and other programs a fixed credit load;
+* a scholarship tier (by HSC GPA) or a named waiver takes a percentage off
+  tuition.  They do not stack: the larger one applies.
+
+The table precomputes every (department, program) row and the discounted
+tuition for each tier and waiver percentage, so a quote is a few dict
+lookups.  Each process keeps its own copy tagged with a version stored in
+the cache; saving or deleting a Department drops that version, and every
+process rebuilds on its next lookup.
+"""
+import uuid
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Department, Application
+
+
+DEFAULTS = {
+    'CURRENCY': 'BDT',
+    'APPLICATION_FEE': {'bachelors': 500, 'masters': 700, 'postgraduate': 900},
+    'PROGRAM_CREDITS': {'masters': 36, 'postgraduate': 24},  # bachelors: Department.total_credits
+    'SCHOLARSHIP_TIERS': [(5.00, 50), (4.80, 25), (4.50, 10)],  # (minimum GPA, % off tuition)
+    'WAIVERS': {'sibling': 20, 'freedom_fighter_ward': 50, 'staff_ward': 50},
+    'QUOTE_MAX_AGE': 5 * 60,  # seconds browsers may reuse a quote
+}
+VERSION_KEY = 'admission:fees:version'
+PROGRAMS = [value for value, _ in Application._meta.get_field('program').choices]
+
+FeeRow = namedtuple('FeeRow', 'department program application_fee credits per_credit_fee tuition discounted')
+
+_table = None
+_lock = threading.Lock()
+
+
+class FeeError(Exception):
+    """An unknown department, program or waiver in a quote request."""
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'ADMISSION_FEES', {})}
+
+
+class FeeTable:
+    def __init__(self, departments, conf, version):
+        self.version = version
+        self.currency = conf['CURRENCY']
+        self.tiers = sorted(conf['SCHOLARSHIP_TIERS'], reverse=True)
+        self.waivers = dict(conf['WAIVERS'])
+        self.program_fees = {p: conf['APPLICATION_FEE'][p] for p in PROGRAMS}
+        percents = {0} | {pct for _, pct in self.tiers} | set(self.waivers.values())
+        self.rows = {}
+        self.codes = {}
+        for dept in departments:
+            self.codes[dept.pk] = dept.code
+            for program in PROGRAMS:
+                credits = dept.total_credits if program == 'bachelors' else conf['PROGRAM_CREDITS'][program]
+                tuition = credits * dept.per_credit_fee
+                self.rows[dept.code.upper(), program] = FeeRow(
+                    dept.code, program, self.program_fees[program], credits, dept.per_credit_fee, tuition,
+                    {pct: tuition - tuition * pct // 100 for pct in percents},
+                )
+
+    def row(self, department, program):
+        """The FeeRow for a Department (or its pk or code) and program, or None."""
+        if isinstance(department, Department):
+            department = department.code
+        elif isinstance(department, int):
+            department = self.codes.get(department, '')
+        return self.rows.get((str(department).upper(), program))
+
+    def application_fee(self, department, program):
+        row = self.row(department, program)
+        return row.application_fee if row else None
+
+    def scholarship(self, gpa):
+        for minimum, percent in self.tiers:
+            if gpa >= minimum:
+                return percent
+        return 0
+
+    def quote(self, department, program, gpa=None, waivers=()):
+        if program not in self.program_fees:
+            raise FeeError(f'Unknown program {program!r}.')
+        quote = {'program': program, 'currency': self.currency,
+                 'application_fee': self.program_fees[program]}
+        if department in (None, ''):
+            return quote
+        row = self.row(department, program)
+        if row is None:
+            raise FeeError(f'Unknown department {department!r}.')
+        discount = None
+        if gpa is not None and self.scholarship(gpa):
+            discount = {'kind': 'scholarship', 'name': f'GPA {gpa:.2f}', 'percent': self.scholarship(gpa)}
+        for name in waivers:
+            if name not in self.waivers:
+                raise FeeError(f'Unknown waiver {name!r}.')
+            if discount is None or self.waivers[name] > discount['percent']:
+                discount = {'kind': 'waiver', 'name': name, 'percent': self.waivers[name]}
+        quote.update({
+            'department': row.department,
+            'application_fee': row.application_fee,
+            'credits': row.credits,
+            'per_credit_fee': row.per_credit_fee,
+            'tuition': row.tuition,
+            'discount': discount,
+            'tuition_after_discount': row.discounted[discount['percent'] if discount else 0],
+        })
+        return quote
+
+
+def fee_table():
+    """The current FeeTable, rebuilt if a Department changed since it was built."""
+    global _table
+    version = cache.get(VERSION_KEY)
+    table = _table
+    if table is not None and version is not None and table.version == version:
+        return table
+    with _lock:
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(VERSION_KEY, version, timeout=None):
+                version = cache.get(VERSION_KEY, version)
+        departments = Department.objects.using(DEFAULT_DB_ALIAS).only('code', 'total_credits', 'per_credit_fee')
+        _table = FeeTable(list(departments), config(), version)
+        return _table
+
+
+def reset_fee_table():
+    """Make every process rebuild its table, e.g. after raw SQL changed departments."""
+    global _table
+    _table = None
+    cache.delete(VERSION_KEY)
+
+
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_fee_table(sender, **kwargs):
+    # Now, and again after commit: a rebuild in between would still read
+    # the old rows.
+    reset_fee_table()
+    transaction.on_commit(reset_fee_table)
@@ -0,0 +1,40 @@
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admission.reports import admission_report, default_range, report_csv, report_html
+
+
+class Command(BaseCommand):
+    help = "Applications, decisions, acceptance rate, time to decision and revenue per department and program."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='first day, YYYY-MM-DD (default: a week ago)')
+        parser.add_argument('--end', type=date.fromisoformat, help='last day, YYYY-MM-DD (default: yesterday)')
+        parser.add_argument('--format', choices=['json', 'csv', 'html'], default='json')
+        parser.add_argument('--output', help='write to this file instead of stdout')
+        parser.add_argument('--no-cache', action='store_true', help='recompute even a cached closed range')
+
+    def handle(self, *args, **opts):
+        start, end = default_range()
+        start, end = opts['start'] or start, opts['end'] or end
+        if start > end:
+            raise CommandError('--start must not be after --end')
+        began = time.perf_counter()
+        report = admission_report(start, end, use_cache=not opts['no_cache'])
+        elapsed = time.perf_counter() - began
+        if opts['format'] == 'csv':
+            text = report_csv(report)
+        elif opts['format'] == 'html':
+            text = report_html(report)
+        else:
+            text = json.dumps(report, indent=2) + '\n'
+        if opts['output']:
+            with open(opts['output'], 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+        else:
+            self.stdout.write(text, ending='')
+        if opts['verbosity'] > 1 or opts['output']:
+            self.stderr.write(f'Report {start}..{end} in {elapsed:.2f}s{" (cached)" if report["cached"] else ""}')
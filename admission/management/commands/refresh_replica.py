@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from admission.db_router import REPLICA
+
+
+def refresh_replica(source, target, pages=-1, sleep=0.005):
+    """Copy the SQLite database at source over target with the online backup API.
+
+    The copy goes to a temporary file next to the replica and is renamed
+    into place, so readers see either the old or the new snapshot and never
+    a half-written one.  By default the whole file is copied in one step,
+    inside one read transaction: a consistent snapshot that finishes however
+    busy the primary is.  A positive ``pages`` copies that many pages per
+    step and sleeps in between, letting writers in, but SQLite restarts such
+    a backup whenever another connection writes to the source, so on a busy
+    primary it may never finish.
+
+    The replica's modification time is set to when the copy started, which
+    is no later than its snapshot (see db_router.replica_as_of()).
+    """
+    tmp = f'{target}.tmp'
+    started = time.time()
+    src = sqlite3.connect(source)
+    try:
+        dest = sqlite3.connect(tmp)
+        try:
+            src.backup(dest, pages=pages, sleep=sleep)
+        finally:
+            dest.close()
+    finally:
+        src.close()
+    os.utime(tmp, (started, started))
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+class Command(BaseCommand):
+    help = "Refresh the read replica from the primary database (SQLite online backup)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='keep refreshing every INTERVAL seconds (default: once)')
+        parser.add_argument('--pages', type=int, default=-1,
+                            help='pages copied per backup step (default -1: everything in one step); '
+                                 'a paged copy restarts whenever the primary is written to')
+
+    def handle(self, *args, **opts):
+        primary = connections['default'].settings_dict
+        replica = connections[REPLICA].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or replica['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('refresh_replica only copies SQLite databases; use real replication elsewhere.')
+        while True:
+            start = time.perf_counter()
+            size = refresh_replica(str(primary['NAME']), str(replica['NAME']), pages=opts['pages'])
+            if opts['verbosity'] > 0:
+                self.stdout.write(f'Replica refreshed: {size:,} bytes in {time.perf_counter() - start:.2f}s')
+            if opts['interval'] <= 0:
+                return
+            time.sleep(opts['interval'])
@@ -0,0 +1,283 @@
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from admission.fees import fee_table, reset_fee_table
+from admission.models import Department, Teacher, Application, ApplicationFile, Payment, ApplicationEvent
+
+
+DEPARTMENT_NAMES = [
+    ('CSE', 'Computer Science & Engineering'),
+    ('EEE', 'Electrical & Electronic Engineering'),
+    ('CE', 'Civil Engineering'),
+    ('ARCH', 'Architecture'),
+    ('BBA', 'Business Administration'),
+    ('ENG', 'English'),
+    ('LAW', 'Law & Human Rights'),
+    ('PHAR', 'Pharmacy'),
+]
+FIRST_NAMES = ['Rahim', 'Karim', 'Jamal', 'Rafi', 'Imran', 'Sami', 'Hasan', 'Fahim',
+               'Aisha', 'Nusrat', 'Tania', 'Farhana', 'Sadia', 'Mim', 'Tanvir', 'Arif']
+LAST_NAMES = ['Ahmed', 'Hossain', 'Rahman', 'Sheikh', 'Mia', 'Talukder', 'Biswas',
+              'Chowdhury', 'Khan', 'Islam', 'Sarkar', 'Noor']
+POSITIONS = ['Lecturer', 'Senior Lecturer', 'Assistant Professor', 'Associate Professor', 'Professor']
+PAYMENT_METHODS = ['bkash', 'nagad', 'card', 'mock']
+# Smallest valid header for each stub type, so the files look real to sniffers.
+STUB_FILES = {
+    'photo': ('stub_photo.png', b'\x89PNG\r\n\x1a\n' + b'\0' * 24),
+    'sign': ('stub_sign.jpg', b'\xff\xd8\xff\xe0' + b'\0' * 16 + b'\xff\xd9'),
+    'transcript': ('stub_transcript.pdf', b'%PDF-1.4\n1 0 obj<<>>endobj\ntrailer<<>>\n%%EOF\n'),
+}
+
+
+def parse_weights(value):
+    """'a=3,b=1' -> (['a', 'b'], [3.0, 1.0])"""
+    keys, weights = [], []
+    for part in value.split(','):
+        key, _, weight = part.partition('=')
+        try:
+            weights.append(float(weight or 1))
+        except ValueError:
+            raise CommandError(f'Bad weight in {value!r}')
+        keys.append(key.strip())
+    return keys, weights
+
+
+class RowInserter:
+    """executemany() INSERT of plain tuples for the high-volume tables.
+
+    bulk_create spends most of its time building model instances and
+    compiling one SQL statement per batch; here the statement is built once
+    and only the columns whose database form differs from the Python value
+    (UUIDs, datetimes, foreign keys) go through the field's own
+    get_db_prep_save, so the stored values are exactly what the ORM writes.
+    """
+    PREPARED = {'UUIDField', 'DateTimeField', 'ForeignKey', 'OneToOneField', 'JSONField'}
+
+    def __init__(self, model, field_names):
+        fields = [model._meta.get_field(name) for name in field_names]
+        qn = connection.ops.quote_name
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            qn(model._meta.db_table),
+            ', '.join(qn(f.column) for f in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        self.preps = [
+            (i, f.get_db_prep_save) for i, f in enumerate(fields)
+            if f.get_internal_type() in self.PREPARED
+        ]
+
+    def __call__(self, rows):
+        if not rows:
+            return
+        preps = self.preps
+        params = []
+        for row in rows:
+            row = list(row)
+            for i, prep in preps:
+                row[i] = prep(row[i], connection)
+            params.append(row)
+        with connection.cursor() as cursor:
+            cursor.executemany(self.sql, params)
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with deterministic synthetic departments, teachers, '
+            'applications, files and payments for profiling at production scale.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=8)
+        parser.add_argument('--teachers', type=int, default=12, help='teachers per department')
+        parser.add_argument('--applications', type=int, default=10_000)
+        parser.add_argument('--files', type=float, default=0.6,
+                            help='share of applications that uploaded documents')
+        parser.add_argument('--payments', type=float, default=0.4,
+                            help='share of applications with a payment')
+        parser.add_argument('--programs', default='bachelors=75,masters=20,postgraduate=5')
+        parser.add_argument('--statuses', default='submitted=40,docs_verified=35,accepted=15,rejected=10')
+        parser.add_argument('--department-skew', type=float, default=1.0,
+                            help='Zipf exponent for department popularity (0 = uniform)')
+        parser.add_argument('--days', type=int, default=90, help='spread applied_at over this many days')
+        parser.add_argument('--until', type=date.fromisoformat, default=None,
+                            help='last application day, YYYY-MM-DD (default today); fix it to reproduce a seed exactly')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--clear', action='store_true',
+                            help='delete existing admission data first (required when there are applications)')
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+        event_rng = random.Random(opts['seed'] + 1)  # keeps the main stream identical to earlier seeds
+        programs, program_weights = parse_weights(opts['programs'])
+        statuses, status_weights = parse_weights(opts['statuses'])
+        valid_programs = {p for p, _ in Application._meta.get_field('program').choices}
+        if not set(programs) <= valid_programs:
+            raise CommandError(f'--programs must use {sorted(valid_programs)}')
+        valid_statuses = {s for s, _ in Application.STATUS_CHOICES}
+        if not set(statuses) <= valid_statuses:
+            raise CommandError(f'--statuses must use {sorted(valid_statuses)}')
+        # The ids come from --seed, so a second run into the same rows would
+        # repeat them and fail part-way with an IntegrityError.
+        if not opts['clear'] and Application.objects.exists():
+            raise CommandError('The database already has applications; pass --clear to replace them.')
+        self.batch_size = opts['batch_size']
+
+        with self.fast_sqlite():
+            if opts['clear']:
+                self.clear()
+                reset_fee_table()
+            departments = self.seed_departments(rng, opts['departments'])
+            fees = fee_table()
+            teachers = self.seed_teachers(rng, departments, opts['teachers'])
+            stubs = self.write_stub_files()
+            dept_weights = [1 / (i + 1) ** opts['department_skew'] for i in range(len(departments))]
+            counts = {'applications': 0, 'files': 0, 'payments': 0, 'events': 0}
+            total = opts['applications']
+            until = opts['until'] or timezone.localdate()
+            end = timezone.make_aware(datetime.combine(until, time.max))
+            span = opts['days'] * 86_400
+            app_insert = RowInserter(Application, [
+                'id', 'full_name', 'email', 'phone', 'guardian', 'address', 'education', 'exam_roll',
+                'department', 'program', 'fee_amount', 'status', 'applied_at', 'paid_at', 'receipt_text'])
+            # seeded documents count as already checked by verify_documents
+            file_insert = RowInserter(ApplicationFile, [
+                'application', 'kind', 'file', 'uploaded_at', 'verification', 'verification_detail', 'verified_at'])
+            payment_insert = RowInserter(Payment, [
+                'application', 'amount', 'method', 'status', 'paid_at', 'receipt_data'])
+            event_insert = RowInserter(ApplicationEvent, [
+                'application', 'kind', 'old_status', 'new_status', 'source', 'data', 'created_at'])
+            for start in range(0, total, self.batch_size):
+                n = min(self.batch_size, total - start)
+                apps, files, payments, events = [], [], [], []
+                for i in range(start, start + n):
+                    dept = rng.choices(departments, dept_weights)[0]
+                    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                    app_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+                    applied_at = end - timedelta(seconds=rng.randrange(span))
+                    program = rng.choices(programs, program_weights)[0]
+                    fee = fees.application_fee(dept, program)
+                    paid_at = None
+                    if rng.random() < opts['files']:
+                        for kind, name in stubs.items():
+                            files.append((app_id, kind, name, applied_at, 'passed', {}, applied_at))
+                    if rng.random() < opts['payments']:
+                        paid_at = applied_at + timedelta(minutes=rng.randrange(60 * 24 * 7))
+                        payments.append((app_id, fee, rng.choice(PAYMENT_METHODS), 'paid', paid_at,
+                                         f'TXN{rng.randrange(10 ** 10):010d}'))
+                    apps.append((
+                        app_id,
+                        f'{first} {last}',
+                        f'{first.lower()}.{last.lower()}{i}@example.com',
+                        f'01{rng.randint(3, 9)}{rng.randrange(10 ** 8):08d}',
+                        f'{rng.choice(FIRST_NAMES)} {last}',
+                        f'House {rng.randint(1, 200)}, Road {rng.randint(1, 40)}, Dhaka',
+                        f'HSC - GPA {rng.uniform(3.0, 5.0):.2f}',
+                        f'{rng.randrange(10 ** 6):06d}',
+                        dept.pk,
+                        program,
+                        fee,
+                        rng.choices(statuses, status_weights)[0],
+                        applied_at,
+                        paid_at,
+                        '',
+                    ))
+                    events.extend(self.history(event_rng, app_id, apps[-1][11], applied_at, end))
+                with transaction.atomic():
+                    app_insert(apps)
+                    file_insert(files)
+                    payment_insert(payments)
+                    event_insert(events)
+                counts['applications'] += len(apps)
+                counts['files'] += len(files)
+                counts['payments'] += len(payments)
+                counts['events'] += len(events)
+                if opts['verbosity'] > 1:
+                    self.stdout.write(f'  {counts["applications"]:,}/{total:,} applications')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(departments)} departments, {len(teachers)} teachers, '
+            f'{counts["applications"]:,} applications, {counts["files"]:,} files, '
+            f'{counts["payments"]:,} payments, {counts["events"]:,} events.'
+        ))
+
+    @contextmanager
+    def fast_sqlite(self):
+        """Relax durability while bulk loading a throwaway SQLite database."""
+        fast = connection.vendor == 'sqlite' and not connection.in_atomic_block
+        if fast:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous=OFF')
+                cursor.execute('PRAGMA journal_mode=MEMORY')
+        try:
+            yield
+        finally:
+            if fast:
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode=DELETE')
+                    cursor.execute('PRAGMA synchronous=FULL')
+
+    def clear(self):
+        # Plain DELETEs, children first: the ORM's cascade collector would
+        # load every row into memory first.
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in (ApplicationEvent, Payment, ApplicationFile, Application, Teacher, Department):
+                cursor.execute(f'DELETE FROM {qn(model._meta.db_table)}')
+
+    def history(self, rng, app_id, status, applied_at, end):
+        """ApplicationEvent rows leading to status: created, documents checked, then the decision."""
+        events = [(app_id, 'created', '', 'submitted', 'seed', {}, applied_at)]
+        if status != 'submitted':
+            at = min(end, applied_at + timedelta(hours=rng.uniform(0.1, 48)))
+            events.append((app_id, 'status', 'submitted', 'docs_verified', 'seed', {}, at))
+            if status != 'docs_verified':
+                at = min(end, at + timedelta(days=rng.uniform(1, 21)))
+                events.append((app_id, 'status', 'docs_verified', status, 'seed', {}, at))
+        return events
+
+    def seed_departments(self, rng, count):
+        departments = []
+        for i in range(count):
+            code, name = DEPARTMENT_NAMES[i] if i < len(DEPARTMENT_NAMES) else (f'D{i:03d}', f'Department {i}')
+            dept, _ = Department.objects.get_or_create(code=code, defaults={
+                'name': name,
+                'total_credits': rng.choice([120, 140, 148, 160]),
+                'per_credit_fee': rng.choice([2500, 3000, 3500, 4000, 4500]),
+                'seats': rng.randint(40, 240),
+            })
+            departments.append(dept)
+        return departments
+
+    def seed_teachers(self, rng, departments, per_department):
+        teachers = []
+        for dept in departments:
+            for i in range(per_department):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                teachers.append(Teacher(
+                    department=dept,
+                    name=f'{first} {last}',
+                    position=rng.choice(POSITIONS),
+                    degrees='BSc, MSc' if rng.random() < 0.6 else 'BSc, MSc, PhD',
+                    email=f'{first.lower()}.{last.lower()}.{dept.code.lower()}{i}@uap-bd.edu',
+                    phone=f'01{rng.randint(3, 9)}{rng.randrange(10 ** 8):08d}',
+                ))
+        return Teacher.objects.bulk_create(teachers, batch_size=self.batch_size)
+
+    def write_stub_files(self):
+        """One tiny file per kind under MEDIA_ROOT/seed/, shared by every seeded ApplicationFile."""
+        root = Path(settings.MEDIA_ROOT) / 'seed'
+        root.mkdir(parents=True, exist_ok=True)
+        names = {}
+        for kind, (filename, content) in STUB_FILES.items():
+            path = root / filename
+            if not path.exists():
+                path.write_bytes(content)
+            names[kind] = f'seed/{filename}'
+        return names
@@ -0,0 +1,40 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from admission.slow_queries import config, read_log, top_offenders
+
+
+class Command(BaseCommand):
+    help = "The slowest queries in the slow-query log, grouped by fingerprint, with their plans and full table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='how many fingerprints to show')
+        parser.add_argument('--days', type=float, help='only queries logged in the last DAYS days')
+        parser.add_argument('--log', help='log file (default: ADMISSION_SLOW_QUERIES["LOG"])')
+        parser.add_argument('--json', action='store_true', help='print the aggregates as JSON')
+
+    def handle(self, *args, **opts):
+        since = timezone.now() - timedelta(days=opts['days']) if opts['days'] else None
+        offenders = top_offenders(read_log(opts['log'] or config()['LOG'], since), opts['top'])
+        if opts['json']:
+            self.stdout.write(json.dumps(offenders, indent=2))
+            return
+        if not offenders:
+            self.stdout.write('No slow queries logged.')
+            return
+        self.stdout.write(f'{"#":>3} {"count":>7} {"total ms":>10} {"mean ms":>8} {"max ms":>8}  full table scan')
+        for n, q in enumerate(offenders, 1):
+            scans = ', '.join(q['full_scans']) or ('no' if q['plan'] else '(no plan)')
+            self.stdout.write(f'{n:>3} {q["count"]:>7} {q["total_ms"]:>10.1f} {q["mean_ms"]:>8.1f} {q["max_ms"]:>8.1f}  {scans}')
+        for n, q in enumerate(offenders, 1):
+            self.stdout.write(f'\n#{n} {q["fingerprint"]}, last {q["last_at"]}')
+            self.stdout.write(f'  {q["sql"]}')
+            for view, count in q['views'].most_common(3):
+                self.stdout.write(f'  view    {view} ({count}x)')
+            for location, count in q['callers'].most_common(3):
+                self.stdout.write(f'  caller  {location} ({count}x)')
+            for line in q['plan'] or ():
+                self.stdout.write(f'  plan    {line}')
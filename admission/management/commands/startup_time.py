@@ -0,0 +1,66 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+BOOT = ("import json, sys; import uap_backend.{server}; from admission.startup import timings; "
+        "sys.stdout.write(json.dumps(timings))")
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def boot_worker(server='wsgi'):
+    """
+    Import uap_backend.<server> in a fresh interpreter, as a server starting
+    a worker would.  Returns (wall-clock seconds, the worker's
+    admission.startup.timings, [(self µs, cumulative µs, depth, module)] from
+    -X importtime).
+    """
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')}
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', BOOT.format(server=server)],
+                          cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode:
+        raise CommandError(f'uap_backend.{server} failed to load:\n{proc.stderr[-2000:]}')
+    imports = []
+    for line in proc.stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m:
+            imports.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    return elapsed, json.loads(proc.stdout.splitlines()[-1]), imports
+
+
+class Command(BaseCommand):
+    help = "Boot uap_backend.wsgi (or asgi) in fresh interpreters and report import, setup and warm-up time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--asgi', action='store_true', help='boot uap_backend.asgi instead of wsgi')
+        parser.add_argument('--runs', type=int, default=3, help='boots to take the median of')
+        parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+
+    def handle(self, *args, **opts):
+        server = 'asgi' if opts['asgi'] else 'wsgi'
+        runs = [boot_worker(server) for _ in range(max(1, opts['runs']))]
+
+        self.stdout.write(f'uap_backend.{server}, median of {len(runs)} boots:')
+        self.stdout.write(f'  process start to ready  {statistics.median(r[0] * 1000 for r in runs):8.1f} ms')
+        for key, label in (('imports_ms', 'imports'), ('setup_ms', 'django.setup() + handler'),
+                           ('warm_up_ms', 'warm-up'), ('total_ms', 'module total')):
+            self.stdout.write(f'  {label:<23} {statistics.median(r[1][key] for r in runs):8.1f} ms')
+        warmed = runs[-1][1]['warmed']
+        if warmed:
+            self.stdout.write('  warmed: ' + ', '.join(f'{n} {what}' for what, n in warmed.items()))
+
+        imports = runs[len(runs) // 2][2]
+        # a garbage collection during boot is charged to whichever import triggered it
+        self.stdout.write('\nSlowest imports (self time, one boot; * = this project):')
+        for self_us, cumulative_us, depth, module in sorted(imports, reverse=True)[:opts['top']]:
+            mark = '*' if module.split('.')[0] in ('admission', 'uap_backend') else ' '
+            self.stdout.write(f' {mark} {self_us / 1000:7.1f} ms  {cumulative_us / 1000:7.1f} ms cumulative  {module}')
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admission.uploads import sweep_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete direct uploads that were not attached to an application within CONFIRM_MAX_AGE."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='keep sweeping every INTERVAL seconds (default: once)')
+
+    def handle(self, *args, **opts):
+        while True:
+            deleted = sweep_uploads()
+            if opts['verbosity'] > 0:
+                self.stdout.write(f'Deleted {deleted} unattached upload(s).')
+            if opts['interval'] <= 0:
+                return
+            time.sleep(opts['interval'])
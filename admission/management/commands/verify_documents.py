@@ -0,0 +1,90 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from admission import events
+from admission.documents import DEFAULTS, check_document
+from admission.models import Application, ApplicationFile
+from admission.uploads import config as upload_config
+
+
+def config():
+    largest = max(upload_config()['MAX_SIZE'].values())
+    return {**DEFAULTS, 'MAX_FILE_SIZE': largest, **getattr(settings, 'ADMISSION_DOCUMENTS', {})}
+
+
+def settle_applications(app_ids):
+    """Move submitted applications whose documents are all checked on to docs_verified or docs_rejected."""
+    checked = ApplicationFile.objects.filter(application_id__in=app_ids)
+    pending = set(checked.filter(verification='pending').values_list('application_id', flat=True))
+    failed = set(checked.filter(verification='failed').values_list('application_id', flat=True))
+    done = set(app_ids) - pending
+    submitted = Application.objects.filter(status='submitted')
+    settled = []
+    for ids, status in ((done - failed, 'docs_verified'), (done & failed, 'docs_rejected')):
+        ids = list(submitted.filter(pk__in=ids).values_list('pk', flat=True))
+        submitted.filter(pk__in=ids).update(status=status)
+        for pk in ids:
+            events.record(pk, 'status', 'submitted', status, source='verify_documents')
+        settled.append(len(ids))
+    return tuple(settled)
+
+
+def verify_batch(executor=None, limit=500, workers=1):
+    """
+    Check up to limit pending documents, oldest first, in the executor's
+    processes (inline without one; workers is its process count), record
+    each result and settle the applications they belong to.  Returns the
+    number of documents checked.
+    """
+    files = list(ApplicationFile.objects.filter(verification='pending').order_by('uploaded_at', 'pk')[:limit])
+    if not files:
+        return 0
+    args = ([f.file.path for f in files], [f.kind for f in files], repeat(config()))
+    if executor is None:
+        results = map(check_document, *args)
+    else:
+        results = executor.map(check_document, *args, chunksize=max(1, len(files) // (4 * max(1, workers))))
+    now = timezone.now()
+    for app_file, result in zip(files, results):
+        app_file.verification = 'passed' if result['ok'] else 'failed'
+        app_file.verification_detail = result
+        app_file.verified_at = now
+    with events.atomic():
+        ApplicationFile.objects.bulk_update(files, ['verification', 'verification_detail', 'verified_at'])
+        settle_applications({f.application_id for f in files})
+    return len(files)
+
+
+class Command(BaseCommand):
+    help = "Check uploaded application documents (type, pages, dimensions, blank/corrupt) and settle their applications."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='checker processes (0 checks in this process)')
+        parser.add_argument('--batch', type=int, default=500, help='documents read and recorded per round')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='keep checking new uploads every INTERVAL seconds (default: drain once)')
+
+    def handle(self, *args, **opts):
+        executor = ProcessPoolExecutor(opts['workers']) if opts['workers'] > 0 else None
+        try:
+            while True:
+                start = time.perf_counter()
+                total = 0
+                while checked := verify_batch(executor, opts['batch'], opts['workers']):
+                    total += checked
+                if total and opts['verbosity'] > 0:
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f'Checked {total} documents in {elapsed:.2f}s ({total / elapsed * 60:,.0f}/min)')
+                if opts['interval'] <= 0:
+                    return
+                time.sleep(opts['interval'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicationfile',
+            name='verification',
+            field=models.CharField(choices=[('pending', 'pending'), ('passed', 'passed'), ('failed', 'failed')], db_index=True, default='pending', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='applicationfile',
+            name='verification_detail',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='applicationfile',
+            name='verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0003_application_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['applied_at', 'department', 'program'], name='application_applied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='applicationevent',
+            index=models.Index(fields=['kind', 'new_status', 'created_at', 'application'], name='appevent_decision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'paid_at', 'application', 'amount'], name='payment_paid_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0004_report_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='application',
+            name='status',
+            field=models.CharField(choices=[('submitted', 'Submitted'), ('docs_verified', 'Documents verified'), ('docs_rejected', 'Documents rejected'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], default='submitted', max_length=32),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0005_application_status_choices'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='applicationfile',
+            constraint=models.UniqueConstraint(condition=models.Q(('file__startswith', 'uploads/')), fields=('file',), name='applicationfile_upload_once'),
+        ),
+    ]
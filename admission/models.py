@@ -1,6 +1,7 @@
 
 from django.db import models
 import uuid
+from django.conf import settings
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 
@@ -26,6 +27,13 @@ class Teacher(models.Model):
     def __str__(self): return self.name
 
 class Application(models.Model):
+    STATUS_CHOICES = [
+        ('submitted', 'Submitted'),
+        ('docs_verified', 'Documents verified'),
+        ('docs_rejected', 'Documents rejected'),
+        ('accepted', 'Accepted'),
+        ('rejected', 'Rejected'),
+    ]
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     full_name = models.CharField(max_length=200)
     email = models.EmailField()
@@ -37,10 +45,15 @@ class Application(models.Model):
     department = models.ForeignKey(Department, on_delete=models.PROTECT, related_name='applications')
     program = models.CharField(max_length=50, choices=[('bachelors','Bachelors'),('masters','Masters'),('postgraduate','Postgraduate')])
     fee_amount = models.PositiveIntegerField(default=0)
-    status = models.CharField(max_length=32, default='submitted')
+    status = models.CharField(max_length=32, choices=STATUS_CHOICES, default='submitted')
     applied_at = models.DateTimeField(default=timezone.now)
     paid_at = models.DateTimeField(null=True, blank=True)
     receipt_text = models.TextField(blank=True)
+
+    class Meta:
+        # covers the report's per-department volume query (admission/reports.py)
+        indexes = [models.Index(fields=['applied_at', 'department', 'program'], name='application_applied_idx')]
+
     def __str__(self): return f'{self.full_name}'
 
 class ApplicationFile(models.Model):
@@ -48,6 +61,17 @@ class ApplicationFile(models.Model):
     kind = models.CharField(max_length=32, choices=[('photo','photo'),('sign','sign'),('transcript','transcript')])
     file = models.FileField(upload_to=app_media_path, validators=[FileExtensionValidator(['jpg','jpeg','png','pdf'])])
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # set by the verify_documents command (admission/documents.py)
+    verification = models.CharField(max_length=16, default='pending', db_index=True,
+                                    choices=[('pending','pending'),('passed','passed'),('failed','failed')])
+    verification_detail = models.JSONField(default=dict, blank=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # a direct upload (admission/uploads.py) is attached to one application only
+        constraints = [models.UniqueConstraint(fields=['file'], condition=models.Q(file__startswith='uploads/'),
+                                               name='applicationfile_upload_once')]
+
     def __str__(self): return f'{self.application.id} - {self.kind}'
 
 class Payment(models.Model):
@@ -57,4 +81,46 @@ class Payment(models.Model):
     status = models.CharField(max_length=32, default='pending')
     paid_at = models.DateTimeField(null=True, blank=True)
     receipt_data = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'paid_at', 'application', 'amount'], name='payment_paid_idx')]
+
     def __str__(self): return f'Payment {self.application_id}'
+
+class ApplicationEvent(models.Model):
+    """Append-only history of applications; written through admission/events.py."""
+    id = models.BigAutoField(primary_key=True)
+    # no FK constraint: the history outlives a deleted application
+    application = models.ForeignKey(Application, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events')
+    kind = models.CharField(max_length=32)  # created / status / ...
+    old_status = models.CharField(max_length=32, blank=True)
+    new_status = models.CharField(max_length=32, blank=True)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    source = models.CharField(max_length=32, blank=True)  # apply / staff / admin / verify_documents ...
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='appevent_time_idx'),
+            models.Index(fields=['application', 'id'], name='appevent_app_idx'),
+            # covers the report's scan of decisions in a time range
+            models.Index(fields=['kind', 'new_status', 'created_at', 'application'], name='appevent_decision_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError('ApplicationEvent rows are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('ApplicationEvent rows are append-only.')
+
+    def __str__(self): return f'{self.application_id} {self.kind} {self.old_status}->{self.new_status}'
+
+class EventCheckpoint(models.Model):
+    """Last ApplicationEvent id a named reader (report, export, audit) has processed."""
+    name = models.CharField(max_length=64, unique=True)
+    event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self): return f'{self.name} @ {self.event_id}'
@@ -0,0 +1,314 @@
+"""On-demand request profiling, for finding out where a slow page spends its time.
+
+ProfilingMiddleware profiles a request when a staff user sends the
+``X-Profile`` header, or when the request is picked by
+``ADMISSION_PROFILING['SAMPLE_RATE']`` (0 by default: on demand only).
+Without either, it costs one header lookup per request.
+
+A profile is the SQL the request ran (statement, database, milliseconds;
+never the parameters) plus one of:
+
+* ``X-Profile: cprofile`` (the default): a cProfile run, saved as a pstats
+  file (``python -m pstats``, snakeviz, flameprof) with the top functions
+  by cumulative time in the record;
+* ``X-Profile: sample``: a stack sampler polling every SAMPLE_INTERVAL
+  seconds, saved as folded stacks (``frame;frame;frame count`` per line),
+  the input format of flamegraph.pl, inferno and speedscope.
+
+Records land in DIR as ``<id>.json`` next to their ``<id>.prof`` or
+``<id>.folded``; only the newest KEEP are kept.  Staff browse them at
+staff/profiles/, and a profiled response carries ``X-Profile-Id``.
+
+Under ASGI the event loop thread serves every request on the worker, so a
+cProfile run of an async view includes whatever else the loop did at the
+time, and sync views (the admin) run in a worker thread it cannot see; the
+sampler records all threads, each stack rooted at its thread's name.
+"""
+import io
+import json
+import asyncio
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+
+DEFAULTS = {
+    'HEADER': 'X-Profile',
+    'SAMPLE_RATE': 0.0,          # fraction of all requests to profile
+    'MODE': 'cprofile',          # cprofile or sample, for sampled requests
+    'SAMPLE_INTERVAL': 0.005,    # seconds between stack samples
+    'KEEP': 50,                  # profiles kept on disk
+    'MAX_QUERIES': 2000,         # queries recorded per profile
+    'TOP': 40,                   # functions listed in a cprofile record
+    'DIR': None,                 # default: BASE_DIR/profiles
+}
+MODES = ('cprofile', 'sample')
+PROFILE_ID = re.compile(r'^\d{8}-\d{6}-\d{6}-[0-9a-f]{4}$')
+ARTIFACTS = {'cprofile': '.prof', 'sample': '.folded'}
+
+_current = ContextVar('admission_profile', default=None)
+
+
+def config():
+    conf = {**DEFAULTS, **getattr(settings, 'ADMISSION_PROFILING', {})}
+    conf['DIR'] = os.fspath(conf['DIR'] or os.path.join(settings.BASE_DIR, 'profiles'))
+    return conf
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper: times the query into the request's profile, if any."""
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.query(context['connection'].alias, sql, many, time.perf_counter() - start)
+
+
+def install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class StackSampler(threading.Thread):
+    """Counts folded stacks of the given thread (or of every other thread) until stopped."""
+
+    def __init__(self, interval, thread_id=None):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.names = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            threads = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (self.thread_id is not None and ident != self.thread_id):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self.frame_name(frame.f_code))
+                    frame = frame.f_back
+                if self.thread_id is None:
+                    stack.append(threads.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def frame_name(self, code):
+        name = self.names.get(code)
+        if name is None:
+            name = self.names[code] = f'{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})'
+        return name
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def short_path(filename):
+    """filename relative to the project or to the sys.path entry it was imported from."""
+    roots = [os.fspath(settings.BASE_DIR)] + [p for p in sys.path if p]
+    best = max((r for r in roots if filename.startswith(r + os.sep)), key=len, default='')
+    return filename[len(best) + 1:] if best else filename
+
+
+class RequestProfile:
+    """One request's profile: its queries and a cProfile run or stack samples."""
+
+    def __init__(self, request, mode, conf, username=''):
+        self.request = request
+        self.mode = mode
+        self.username = username
+        self.conf = conf
+        self.id = f'{datetime.now():%Y%m%d-%H%M%S-%f}-{secrets.token_hex(2)}'  # sorts by time
+        self.queries = []
+        self.dropped = 0
+
+    def query(self, alias, sql, many, elapsed):
+        if len(self.queries) < self.conf['MAX_QUERIES']:
+            self.queries.append({'db': alias, 'sql': sql, 'many': many, 'ms': round(elapsed * 1000, 3)})
+        else:
+            self.dropped += 1
+
+    def start(self, thread_id=None):
+        """Start profiling; False, with nothing left running, if the profiler cannot start."""
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        self.token = _current.set(self)
+        self.started_at = timezone.now()
+        self.began = time.perf_counter()
+        try:
+            if self.mode == 'sample':
+                self.profiler = StackSampler(self.conf['SAMPLE_INTERVAL'], thread_id)
+                self.profiler.start()
+            else:
+                import cProfile  # here rather than at boot: few requests are ever profiled
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+        except Exception:
+            # Python 3.12+ allows one active cProfile per interpreter (ValueError
+            # while another request or a debugger holds it); the sampler needs
+            # a thread.  Either way the request is served unprofiled.
+            _current.reset(self.token)
+            return False
+        return True
+
+    def stop(self, response=None):
+        """Stop profiling and tag the response with the profile's id; save() records it."""
+        if self.mode == 'sample':
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.began
+        _current.reset(self.token)
+        if response is not None:
+            response['X-Profile-Id'] = self.id
+
+    def write_artifact(self, path):
+        """Write the pstats file or folded stacks to path; returns the text summary for the record."""
+        if self.mode == 'sample':
+            with open(path, 'w') as f:
+                f.write(self.profiler.folded())
+            return ''
+        import pstats
+        out = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.dump_stats(path)
+        stats.sort_stats('cumulative').print_stats(self.conf['TOP'])
+        return out.getvalue()
+
+
+def save(profile, status):
+    """Write a profile's record and artifact to DIR and drop all but the newest KEEP."""
+    directory = profile.conf['DIR']
+    os.makedirs(directory, exist_ok=True)
+    top = profile.write_artifact(os.path.join(directory, profile.id + ARTIFACTS[profile.mode]))
+    record = {
+        'id': profile.id,
+        'mode': profile.mode,
+        'method': profile.request.method,
+        'path': profile.request.path,
+        'status': status,
+        'user': profile.username,
+        'started_at': profile.started_at.isoformat(timespec='seconds'),
+        'ms': round(profile.elapsed * 1000, 1),
+        'sql_count': len(profile.queries) + profile.dropped,
+        'sql_ms': round(sum(q['ms'] for q in profile.queries), 1),
+        'queries_dropped': profile.dropped,
+        'queries': profile.queries,
+        'top': top,
+    }
+    path = os.path.join(directory, profile.id + '.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(record, f)
+    os.replace(path + '.tmp', path)
+    for old in profile_ids(directory)[profile.conf['KEEP']:]:
+        for suffix in ('.json', *ARTIFACTS.values()):
+            try:
+                os.remove(os.path.join(directory, old + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def profile_ids(directory=None):
+    """Ids of the stored profiles, newest first."""
+    directory = directory or config()['DIR']
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted((n[:-5] for n in names if n.endswith('.json') and PROFILE_ID.match(n[:-5])), reverse=True)
+
+
+def load(profile_id):
+    """The stored record for profile_id, or None."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(config()['DIR'], profile_id + '.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def artifact_path(record):
+    return os.path.join(config()['DIR'], record['id'] + ARTIFACTS[record['mode']])
+
+
+class ProfilingMiddleware:
+    """Profile requests asked for by staff (the X-Profile header) or picked by SAMPLE_RATE.
+
+    Sync and async capable like PinPrimaryMiddleware; goes after
+    AuthenticationMiddleware, which it needs to tell staff apart.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        conf = config()
+        self.header = 'HTTP_' + conf['HEADER'].upper().replace('-', '_')
+        self.rate = conf['SAMPLE_RATE']
+        self.mode = conf['MODE']
+        connection_created.connect(install, dispatch_uid='admission.profiling')
+
+    def profile_for(self, request, user):
+        """The RequestProfile for request, or None to serve it unprofiled."""
+        if user is not None and user.is_staff:
+            mode = request.META[self.header].strip().lower()
+            return RequestProfile(request, mode if mode in MODES else 'cprofile', config(), user.get_username())
+        if self.rate and random.random() < self.rate:
+            return RequestProfile(request, self.mode, config())
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = None
+        if self.header in request.META or self.rate:
+            profile = self.profile_for(request, request.user if self.header in request.META else None)
+        if profile is None or not profile.start(threading.get_ident()):
+            return self.get_response(request)
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop(response)
+        save(profile, response.status_code)
+        return response
+
+    async def __acall__(self, request):
+        profile = None
+        if self.header in request.META or self.rate:
+            profile = self.profile_for(request, await request.auser() if self.header in request.META else None)
+        if profile is None or not profile.start():
+            return await self.get_response(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.stop(response)  # on the loop thread, where the profiler was started
+        await asyncio.to_thread(save, profile, response.status_code)  # file writes and pruning block
+        return response
@@ -0,0 +1,177 @@
+"""Registrar's admission report: volumes, decisions and revenue for a date range.
+
+For each department and program, and in total:
+
+* applications received (applied_at in the range);
+* decisions made (ApplicationEvent rows to accepted/rejected created in the
+  range), the acceptance rate among them, and the median and p90 days from
+  applied_at to the decision;
+* payments received (paid Payments with paid_at in the range) and their sum.
+
+That is two grouped aggregate queries and one streaming pass over the
+range's decision events joined to their applications, read through
+replica_reads(); each is served from a covering index (see the models'
+Meta.indexes), so a range costs a walk over its own rows only.
+
+Every figure is keyed on when something happened, so new activity does not
+change the report for a range that has ended.  Such a report is kept in
+the REPORT_CACHE alias for REPORT_CACHE_TTL, but only once the data it was
+computed from is complete:
+
+* the replica it read was refreshed after the range ended
+  (db_router.replica_as_of()), so no late rows are missing;
+* nothing that rewrites the past (an application, payment or department
+  edited or deleted) has happened since that refresh; each such change
+  stamps CHANGED_KEY, and a report older than the stamp is recomputed.
+
+The alias is shared by every worker and by the admission_report command (on
+disk, or Redis with CACHE_URL; see settings.CACHES) and holds nothing else,
+so closed ranges are not culled by the traffic in the default cache.
+"""
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .db_router import replica_reads, replica_as_of
+from .fees import config as fee_config
+from .models import Department, Application, ApplicationEvent, Payment
+
+
+DECISIONS = ('accepted', 'rejected')
+REPORT_CACHE = 'reports'
+REPORT_CACHE_TTL = 30 * 24 * 60 * 60
+CACHE_KEY = 'admission:report:v2:{}:{}'
+CHANGED_KEY = 'admission:report:changed'
+COLUMNS = ['department', 'program', 'applications', 'decisions', 'accepted', 'rejected', 'acceptance_rate',
+           'decision_days_median', 'decision_days_p90', 'payments', 'revenue']
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values, or None for no values."""
+    if not values:
+        return None
+    return values[max(0, -(-len(values) * p // 100) - 1)]
+
+
+def _bounds(start, end):
+    """Aware datetimes for local midnight on start and on the day after end."""
+    return (timezone.make_aware(datetime.combine(start, time.min)),
+            timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+
+
+def _row(department, program, counts, days):
+    decided = counts['accepted'] + counts['rejected']
+    days.sort()
+    return {
+        'department': department,
+        'program': program,
+        'applications': counts['applications'],
+        'decisions': decided,
+        'accepted': counts['accepted'],
+        'rejected': counts['rejected'],
+        'acceptance_rate': round(counts['accepted'] / decided, 4) if decided else None,
+        'decision_days_median': round(percentile(days, 50), 2) if days else None,
+        'decision_days_p90': round(percentile(days, 90), 2) if days else None,
+        'payments': counts['payments'],
+        'revenue': counts['revenue'],
+    }
+
+
+def compute_report(start, end):
+    """The report for the local dates start..end (inclusive), straight from the database."""
+    since, until = _bounds(start, end)
+    counts = defaultdict(lambda: defaultdict(int))
+    days = defaultdict(list)
+    with replica_reads():
+        codes = dict(Department.objects.values_list('pk', 'code'))
+        received = (Application.objects.filter(applied_at__gte=since, applied_at__lt=until)
+                    .values_list('department_id', 'program').annotate(n=Count('*')).order_by())
+        for dept_id, program, n in received:
+            counts[dept_id, program]['applications'] = n
+        paid = (Payment.objects.filter(status='paid', paid_at__gte=since, paid_at__lt=until)
+                .values_list('application__department_id', 'application__program')
+                .annotate(n=Count('*'), total=Sum('amount')).order_by())
+        for dept_id, program, n, total in paid:
+            counts[dept_id, program]['payments'] = n
+            counts[dept_id, program]['revenue'] = total
+        decisions = (ApplicationEvent.objects
+                     .filter(created_at__gte=since, created_at__lt=until, kind='status', new_status__in=DECISIONS)
+                     .values_list('application__department_id', 'application__program', 'new_status',
+                                  'created_at', 'application__applied_at'))
+        for dept_id, program, status, decided_at, applied_at in decisions.iterator(chunk_size=10_000):
+            counts[dept_id, program][status] += 1
+            days[dept_id, program].append((decided_at - applied_at).total_seconds() / 86400)
+
+    rows = []
+    total = defaultdict(int)
+    for key in sorted(counts, key=lambda k: (codes.get(k[0], ''), k[1])):
+        rows.append(_row(codes.get(key[0], '?'), key[1], counts[key], days[key]))
+        for name, value in counts[key].items():
+            total[name] += value
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'currency': fee_config()['CURRENCY'],
+        'generated_at': timezone.now().isoformat(timespec='seconds'),
+        'rows': rows,
+        'total': _row('All', 'all', total, [d for group in days.values() for d in group]),
+    }
+
+
+def admission_report(start, end, use_cache=True):
+    """compute_report(), cached when the range has ended and the data read for it is complete."""
+    key = CACHE_KEY.format(start.isoformat(), end.isoformat())
+    cache = caches[REPORT_CACHE]
+    changed = cache.get(CHANGED_KEY, 0)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None and cached[0] > changed:
+            return {**cached[1], 'cached': True}
+    as_of = replica_as_of()  # before the queries: they see at least this much
+    report = compute_report(start, end)
+    if as_of >= _bounds(start, end)[1].timestamp() and as_of > changed:
+        cache.set(key, (as_of, report), REPORT_CACHE_TTL)
+    return {**report, 'cached': False}
+
+
+@receiver([post_save, post_delete], sender=Application)
+@receiver([post_save, post_delete], sender=Payment)
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_reports(sender, created=False, **kwargs):
+    """A row was edited or deleted: a cached report may count it in the wrong place."""
+    if not created:
+        # after the commit, so a report computed meanwhile from the old rows is older than the stamp
+        transaction.on_commit(lambda: caches[REPORT_CACHE].set(CHANGED_KEY, timezone.now().timestamp(), None))
+
+
+def default_range(today=None):
+    """The last seven full days."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=7), today - timedelta(days=1)
+
+
+def report_csv(report):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(report['rows'])
+    writer.writerow(report['total'])
+    return out.getvalue()
+
+
+def report_html(report, request=None):
+    return render_to_string('admission/report.html', {
+        'report': report,
+        'columns': [c.replace('_', ' ') for c in COLUMNS],
+        'rows': [[row[c] for c in COLUMNS] for row in report['rows']],
+        'total': [report['total'][c] for c in COLUMNS],
+    }, request=request)
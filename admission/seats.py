@@ -0,0 +1,198 @@
+"""Seats left per department, for the apply page and its live stream.
+
+Department.seats is the real count.  After every change (accept_applicant,
+allocate_seats, an admin edit) publish() reads the counts once and stores
+them with a new version in the default cache.  Each process then serves:
+
+* GET apply/seats/ from an in-memory copy of that snapshot, re-read from
+  the cache at most every POLL_INTERVAL seconds;
+* apply/seats/stream/ as server-sent events through one SeatHub per event
+  loop: a single task polls the snapshot and, when its version changes,
+  encodes one message and wakes every open stream with it.  Changes that
+  land within one poll interval reach the browsers as a single event, and
+  a stream that falls behind simply sends the latest snapshot.
+
+With several worker processes the default cache has to be shared between
+them (Redis, Memcached); with LocMemCache each process only sees the
+changes it made itself.  Settings (``settings.ADMISSION_SEATS``) override
+DEFAULTS below.
+"""
+import json
+import time
+import uuid
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Department, Application
+from . import events
+
+
+DEFAULTS = {
+    'POLL_INTERVAL': 1.0,     # seconds between snapshot checks per process
+    'KEEPALIVE': 15,          # seconds of silence before a comment line is sent
+    'STREAM_MAX_AGE': 10 * 60,  # seconds before a stream closes and the browser reconnects
+    'RETRY': 5000,            # milliseconds browsers wait before reconnecting
+}
+SNAPSHOT_KEY = 'admission:seats:snapshot'
+
+_local = None  # (snapshot, time.monotonic() when it was read)
+_hubs = weakref.WeakKeyDictionary()  # event loop -> SeatHub
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'ADMISSION_SEATS', {})}
+
+
+def _remember(snapshot):
+    global _local
+    _local = (snapshot, time.monotonic())
+    return snapshot
+
+
+def _recent():
+    local = _local
+    if local is not None and time.monotonic() - local[1] < config()['POLL_INTERVAL']:
+        return local[0]
+    return None
+
+
+def publish():
+    """Read the seat counts from the primary and make them every process's snapshot."""
+    seats = dict(Department.objects.using(DEFAULT_DB_ALIAS).order_by('code').values_list('code', 'seats'))
+    snapshot = {'version': uuid.uuid4().hex, 'seats': seats}
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+    return _remember(snapshot)
+
+
+def current():
+    """The latest snapshot: {'version': str, 'seats': {department code: seats left}}."""
+    snapshot = _recent()
+    if snapshot is None:
+        snapshot = _remember(cache.get(SNAPSHOT_KEY) or publish())
+    return snapshot
+
+
+async def acurrent():
+    snapshot = _recent()
+    if snapshot is None:
+        snapshot = _remember(await cache.aget(SNAPSHOT_KEY) or await sync_to_async(publish)())
+    return snapshot
+
+
+def allocate_seats(applications, actor=None, source='staff'):
+    """
+    Accept applications, in the given order, while their department has seats.
+    Returns (accepted, refused) lists of the applications; ones that are
+    already accepted (or gone) by the time the seats are locked are in neither.
+    """
+    accepted, refused = [], []
+    with events.atomic():
+        dept_ids = {app.department_id for app in applications}
+        left = dict(Department.objects.select_for_update().filter(pk__in=dept_ids).values_list('pk', 'seats'))
+        taken = dict.fromkeys(left, 0)
+        # Re-read the statuses under the lock: a second click on "accept" or
+        # two staff accepting the same application must not take two seats.
+        status = dict(Application.objects.select_for_update().filter(pk__in=[app.pk for app in applications])
+                      .values_list('pk', 'status'))
+        for app in applications:
+            if status.get(app.pk, 'accepted') == 'accepted':
+                continue
+            app.status = status[app.pk]
+            if left[app.department_id] > taken[app.department_id]:
+                taken[app.department_id] += 1
+                accepted.append(app)
+            else:
+                refused.append(app)
+        Application.objects.filter(pk__in=[app.pk for app in accepted]).update(status='accepted')
+        for app in accepted:
+            events.record(app, 'status', app.status, 'accepted', actor, source)
+        for dept_id, count in taken.items():
+            if count:
+                Department.objects.filter(pk=dept_id).update(seats=F('seats') - count)
+        # update() sends no post_save: publish once for the whole batch.
+        transaction.on_commit(publish)
+    for app in accepted:
+        app.status = 'accepted'
+    return accepted, refused
+
+
+@receiver([post_save, post_delete], sender=Department)
+def publish_on_change(sender, **kwargs):
+    transaction.on_commit(publish)
+
+
+def encode(snapshot):
+    """One server-sent event carrying the snapshot, shared by every stream."""
+    data = json.dumps(snapshot, separators=(',', ':'))
+    return f'id: {snapshot["version"]}\nevent: seats\ndata: {data}\n\n'.encode()
+
+
+class SeatHub:
+    """Fan-out of seat snapshots to the streams open on one event loop."""
+
+    def __init__(self):
+        self.snapshot = None
+        self.message = b''
+        self.changed = asyncio.Event()
+        self.listeners = 0
+        self.task = None
+
+    def update(self, snapshot):
+        if self.snapshot is not None and snapshot['version'] == self.snapshot['version']:
+            return
+        self.snapshot = snapshot
+        self.message = encode(snapshot)
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def poll(self):
+        try:
+            while self.listeners:
+                await asyncio.sleep(config()['POLL_INTERVAL'])
+                self.update(await acurrent())
+        finally:
+            self.task = None
+
+    async def stream(self, last_event_id=None):
+        """Server-sent events for one browser until STREAM_MAX_AGE has passed."""
+        conf = config()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + conf['STREAM_MAX_AGE']
+        self.listeners += 1
+        try:
+            self.update(await acurrent())
+            if self.task is None:
+                self.task = loop.create_task(self.poll())
+            yield f'retry: {conf["RETRY"]}\n\n'.encode()
+            seen = last_event_id
+            while True:
+                if self.snapshot['version'] != seen:
+                    seen = self.snapshot['version']
+                    yield self.message
+                    continue
+                timeout = min(conf['KEEPALIVE'], deadline - loop.time())
+                if timeout <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(self.changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+        finally:
+            self.listeners -= 1
+
+
+def hub():
+    """The SeatHub of the running event loop."""
+    loop = asyncio.get_running_loop()
+    seat_hub = _hubs.get(loop)
+    if seat_hub is None:
+        seat_hub = _hubs[loop] = SeatHub()
+    return seat_hub
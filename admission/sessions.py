@@ -0,0 +1,58 @@
+"""Session engine that only writes staff sessions to the database.
+
+Applicants never log in, yet every session save on the default db engine
+is an INSERT or UPDATE on the same SQLite file application_create writes
+to.  This store keeps sessions in the cache (SESSION_CACHE_ALIAS) and
+writes them through to the django_session table only once a staff member
+has logged in, so admin logins survive a cache restart while anonymous
+traffic causes no session-table writes at all.  Reads fall back to the
+database exactly like the cached_db engine.
+
+Use with SESSION_ENGINE = 'admission.sessions'.
+"""
+from django.contrib.auth.signals import user_logged_in
+from django.contrib.sessions.backends.base import CreateError, UpdateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.dispatch import receiver
+
+
+STAFF_SESSION_KEY = '_uap_staff'
+
+
+class SessionStore(CachedDBStore):
+    def save(self, must_create=False):
+        if self.get(STAFF_SESSION_KEY):
+            try:
+                return super().save(must_create)
+            except UpdateError:
+                # created cache-only before the login marked it as staff
+                return super().save(must_create=True)
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if must_create:
+            if not self._cache.add(self.cache_key, data, self.get_expiry_age()):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+
+    async def asave(self, must_create=False):
+        if await self.aget(STAFF_SESSION_KEY):
+            try:
+                return await super().asave(must_create)
+            except UpdateError:
+                return await super().asave(must_create=True)
+        if self.session_key is None:
+            return await self.acreate()
+        data = self._get_session(no_load=must_create)
+        if must_create:
+            if not await self._cache.aadd(await self.acache_key(), data, await self.aget_expiry_age()):
+                raise CreateError
+        else:
+            await self._cache.aset(await self.acache_key(), data, await self.aget_expiry_age())
+
+
+@receiver(user_logged_in)
+def mark_staff_session(sender, request, user, **kwargs):
+    if user.is_staff and hasattr(request, 'session'):
+        request.session[STAFF_SESSION_KEY] = True
@@ -0,0 +1,226 @@
+"""Slow-query log: every query over a threshold, with its plan and who ran it.
+
+A database execute wrapper, installed on every connection when the app
+loads, times each query.  One slower than ``ADMISSION_SLOW_QUERIES
+['THRESHOLD_MS']`` is appended to LOG as a JSON line:
+
+* ``fingerprint``: a hash of the normalized SQL (literals and placeholders
+  become ``?``, ``IN (?, ?, ...)`` lists and multi-row VALUES collapse), so
+  the same query with other arguments or list lengths counts as one;
+* ``ms``, ``db`` and ``at``;
+* ``view``: the URL name of the request being served (found on the stack),
+  or the management command;
+* ``caller``: the innermost project frame that ran it (file:line function);
+* ``plan``: ``EXPLAIN QUERY PLAN`` of the statement with its parameters,
+  for SELECTs, the first time this process sees the fingerprint.
+
+The time is that of cursor.execute(): rows a streaming read (iterator())
+fetches afterwards are not counted.  Queries under the threshold cost two
+perf_counter() calls.  LOG rolls over to LOG.1 at MAX_BYTES.
+``manage.py slow_queries`` aggregates both files per fingerprint (see
+top_offenders()) and flags plans that scan a whole table.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpRequest
+from django.utils import timezone
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 100,
+    'EXPLAIN': True,            # capture the plan of slow SELECTs
+    'LOG': None,                # default: BASE_DIR/slow_queries.log
+    'MAX_BYTES': 10 * 1024 * 1024,
+}
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+_FULL_SCAN = re.compile(r'^SCAN (\S+)$')
+_READ = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+_lock = threading.Lock()
+_explained = set()
+_explaining = threading.local()
+
+
+@lru_cache(maxsize=None)
+def config():
+    conf = {**DEFAULTS, **getattr(settings, 'ADMISSION_SLOW_QUERIES', {})}
+    conf['LOG'] = os.fspath(conf['LOG'] or os.path.join(settings.BASE_DIR, 'slow_queries.log'))
+    return conf
+
+
+@receiver(setting_changed)
+def reset_config(setting, **kwargs):
+    if setting == 'ADMISSION_SLOW_QUERIES':
+        config.cache_clear()
+
+
+def normalize(sql):
+    """sql with its literals, placeholders and list lengths erased."""
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql.replace('%s', '?'))
+    sql = _ROWS.sub('(...), ...', _LISTS.sub('(...)', sql))
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def full_scans(plan):
+    """Tables the plan reads from end to end ("SCAN t", not "SCAN t USING INDEX ...")."""
+    return sorted({m.group(1) for line in plan or () if (m := _FULL_SCAN.match(line.strip()))})
+
+
+def log_slow_query(execute, sql, params, many, context):
+    """Database execute wrapper: records queries slower than THRESHOLD_MS."""
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed = time.perf_counter() - start
+    conf = config()
+    if elapsed * 1000 >= conf['THRESHOLD_MS'] and conf['ENABLED'] and not getattr(_explaining, 'active', False):
+        record(context['connection'], sql, params, many, elapsed, conf)
+    return result
+
+
+def record(connection, sql, params, many, elapsed, conf):
+    key = fingerprint(sql)
+    plan = None
+    if conf['EXPLAIN'] and not many and key not in _explained and _READ.match(sql):
+        _explained.add(key)
+        plan = explain(connection, sql, params)
+    view, location = caller()
+    write(conf, {
+        'at': timezone.now().isoformat(timespec='seconds'),
+        'fingerprint': key,
+        'sql': normalize(sql),
+        'ms': round(elapsed * 1000, 1),
+        'db': connection.alias,
+        'view': view,
+        'caller': location,
+        'plan': plan,
+    })
+
+
+def explain(connection, sql, params):
+    """The query plan as indented lines (SQLite's EXPLAIN QUERY PLAN, EXPLAIN elsewhere)."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    _explaining.active = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except Exception as e:
+        return [f'(no plan: {e})']
+    finally:
+        _explaining.active = False
+    if connection.vendor != 'sqlite':
+        return [' '.join(map(str, row)) for row in rows]
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+
+def caller():
+    """(view, location): what the process is serving, and the innermost project frame on the stack."""
+    view = location = ''
+    root = os.path.join(os.fspath(settings.BASE_DIR), '')
+    frame = sys._getframe(2)
+    while frame is not None and not (view and location):
+        filename = frame.f_code.co_filename
+        if not location and filename.startswith(root) and filename != __file__:
+            location = f'{filename[len(root):]}:{frame.f_lineno} {frame.f_code.co_name}'
+        if not view:
+            request = frame.f_locals.get('request')
+            if isinstance(request, HttpRequest):
+                match = getattr(request, 'resolver_match', None)
+                view = match.view_name if match else request.path
+        frame = frame.f_back
+    if not view and len(sys.argv) > 1 and sys.argv[0].endswith('manage.py'):
+        view = f'manage.py {sys.argv[1]}'
+    return view, location
+
+
+def write(conf, entry):
+    line = json.dumps(entry) + '\n'
+    path = conf['LOG']
+    with _lock:
+        try:
+            if os.path.getsize(path) >= conf['MAX_BYTES']:
+                os.replace(path, path + '.1')
+        except FileNotFoundError:
+            pass
+        with open(path, 'a') as f:
+            f.write(line)
+
+
+def install(connection, **kwargs):
+    if log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_query)
+
+
+connection_created.connect(install, dispatch_uid='admission.slow_queries')
+
+
+def read_log(path=None, since=None):
+    """The logged entries (LOG.1, then LOG), optionally only those at or after the aware datetime since."""
+    path = path or config()['LOG']
+    for name in (path + '.1', path):
+        try:
+            f = open(name)
+        except FileNotFoundError:
+            continue
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                if since is None or datetime.fromisoformat(entry['at']) >= since:
+                    yield entry
+
+
+def top_offenders(entries, limit=20):
+    """Entries grouped by fingerprint, most total time first."""
+    groups = {}
+    for entry in entries:
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'], 'sql': entry['sql'], 'count': 0, 'total_ms': 0.0,
+                'max_ms': 0.0, 'views': Counter(), 'callers': Counter(), 'plan': None, 'last_at': '',
+            }
+        group['count'] += 1
+        group['total_ms'] += entry['ms']
+        group['max_ms'] = max(group['max_ms'], entry['ms'])
+        group['views'][entry['view'] or '?'] += 1
+        group['callers'][entry['caller'] or '?'] += 1
+        group['plan'] = entry['plan'] or group['plan']
+        group['last_at'] = max(group['last_at'], entry['at'])
+    ranked = sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)[:limit]
+    for group in ranked:
+        group['total_ms'] = round(group['total_ms'], 1)
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 1)
+        group['full_scans'] = full_scans(group['plan'])
+    return ranked
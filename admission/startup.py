@@ -0,0 +1,131 @@
+"""Worker start-up: boot timing and warm-up.
+
+A fresh worker (after a deploy or an autoscale event) used to pay for its
+setup on its first requests: importing the URLconf and every view module,
+compiling URL patterns and templates, and reading the departments and
+teachers.  uap_backend/wsgi.py and asgi.py now call worker_ready() once
+Django is set up, before the server hands the worker any traffic, and it
+runs warm_up():
+
+* imports the URLconf, compiles every pattern's regex and builds the
+  reverse() lookup tables;
+* compiles every admission/*.html template, and the templates they extend,
+  into the cached template loader;
+* fills the catalog cache (departments, teachers), the seat snapshot and
+  the fee table;
+* closes the database connections it opened, so a server that forks its
+  workers after loading the app (gunicorn --preload) does not share them.
+
+Then gc.freeze() moves everything allocated so far (modules, compiled
+patterns and templates) out of the collector's reach: full collections no
+longer walk it, and forked workers do not copy the pages it lives on.
+
+worker_ready() keeps the boot timings in ``timings`` and logs them on the
+``admission.startup`` logger, e.g. "wsgi worker ready in 412 ms (imports
+301, setup 52, warm-up 59)".  ``manage.py startup_time`` boots a fresh
+interpreter to report them with the slowest imports.  Warm-up can be
+switched off with ``ADMISSION_STARTUP = {'WARM_UP': False}``.
+"""
+import gc
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import Context
+from django.template.loader import get_template
+from django.template.loader_tags import ExtendsNode
+from django.urls import URLResolver, get_resolver
+
+from . import seats
+from .catalog import adepartments, ateachers
+from .fees import fee_table
+
+
+DEFAULTS = {
+    'WARM_UP': True,
+}
+
+logger = logging.getLogger('admission.startup')
+timings = {}
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'ADMISSION_STARTUP', {})}
+
+
+def _compile_patterns(resolver):
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex  # compiled on first access, then kept
+        count += 1
+        if isinstance(pattern, URLResolver):
+            pattern.reverse_dict  # built on first access
+            count += _compile_patterns(pattern)
+    return count
+
+
+def warm_urls():
+    """Import the URLconf and compile it; returns the number of patterns."""
+    resolver = get_resolver()
+    resolver.reverse_dict
+    return _compile_patterns(resolver)
+
+
+def warm_templates():
+    """Compile admission/*.html and their parent templates; returns the number of templates."""
+    folder = os.path.join(apps.get_app_config('admission').path, 'templates', 'admission')
+    names = sorted(name for name in os.listdir(folder) if name.endswith('.html'))
+    for name in names:
+        template = get_template(f'admission/{name}').template
+        for node in template.nodelist.get_nodes_by_type(ExtendsNode):
+            # what {% extends %} does at render time, so the parent is cached under the same key
+            context = Context()
+            context.template = template
+            node.get_parent(context)
+    return len(names)
+
+
+def warm_data():
+    """Fill the per-process and shared caches the public pages read from."""
+    departments = async_to_sync(adepartments)()
+    async_to_sync(ateachers)()
+    seats.current()
+    fee_table()
+    return len(departments)
+
+
+def warm_up():
+    """Do the work a new worker's first requests would otherwise do; returns what was warmed."""
+    try:
+        return {'urls': warm_urls(), 'templates': warm_templates(), 'departments': warm_data()}
+    finally:
+        connections.close_all()
+
+
+def worker_ready(server, started, imported):
+    """
+    Record and log how long the worker took to boot (perf_counter() readings
+    from the top of wsgi.py / asgi.py and after its imports), warming it up
+    first unless ADMISSION_STARTUP['WARM_UP'] is off.
+    """
+    ready = time.perf_counter()
+    timings.update(server=server, imports_ms=round((imported - started) * 1000, 1),
+                   setup_ms=round((ready - imported) * 1000, 1), warm_up_ms=0.0, warmed={})
+    if config()['WARM_UP']:
+        # in a thread of its own: ASGI servers import the app inside their event
+        # loop, where Django refuses synchronous database access
+        try:
+            with ThreadPoolExecutor(1, thread_name_prefix='warm-up') as pool:
+                timings['warmed'] = pool.submit(warm_up).result()
+        except Exception:
+            logger.exception('Worker warm-up failed; serving cold.')
+        timings['warm_up_ms'] = round((time.perf_counter() - ready) * 1000, 1)
+    gc.freeze()
+    timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info('%s worker ready in %.0f ms (imports %.0f, setup %.0f, warm-up %.0f)', server,
+                timings['total_ms'], timings['imports_ms'], timings['setup_ms'], timings['warm_up_ms'])
@@ -28,25 +28,80 @@ function fetchWithCSRF(url, opts) {
 
   // Storage keys
   const APP_KEY = 'uap_applications';
-  const SEAT_KEY = 'uap_seats';
 
   function loadApps(){ return JSON.parse(localStorage.getItem(APP_KEY) || '[]'); }
   function saveApps(arr){ localStorage.setItem(APP_KEY, JSON.stringify(arr)); }
-  function loadSeats(){
-    const raw = localStorage.getItem(SEAT_KEY);
-    if(raw) return JSON.parse(raw);
-    const initial = { CSE:50, EEE:36, Civil:30, Architecture:16, BBA:40 };
-    localStorage.setItem(SEAT_KEY, JSON.stringify(initial));
-    return initial;
+
+  // Seats left per department: read from the server (GET /apply/seats/) and
+  // kept current by its event stream (/apply/seats/stream/)
+  let seats = {};
+  function setSeats(data){
+    const items = $$('#deptList .dept-item');
+    const same = items.length === Object.keys(data.seats).length && items.every(it => it.dataset.dept in data.seats);
+    seats = data.seats;
+    if(!same) return renderDeptList();
+    items.forEach(it => { it.querySelector('.seats').textContent = seats[it.dataset.dept]; });
+  }
+  function connectSeats(){
+    const list = $('#deptList');
+    if(window.EventSource){
+      const events = new EventSource(list.dataset.streamUrl);
+      events.addEventListener('seats', e => setSeats(JSON.parse(e.data)));
+    } else {
+      fetch(list.dataset.seatsUrl).then(r => r.json()).then(setSeats).catch(()=> toast('Could not load seats'));
+    }
   }
-  function saveSeats(obj){ localStorage.setItem(SEAT_KEY, JSON.stringify(obj)); }
 
-  // Program fees
-  const fees = { bachelors:500, masters:700, postgraduate:900 };
+  // Program fees: quoted by the server's fee table (GET /apply/quote/)
   const programType = $('#programType');
   const appFee = $('#appFee');
-  function updateFee(){ appFee.textContent = (fees[programType.value] || 0) + ' BDT'; }
+  const feeNote = $('#feeNote');
+  let quote = null;
+  function educationGPA(){
+    const m = ($('#education').value || '').match(/GPA\s*[:\-]?\s*([0-9.]+)/i);
+    return m ? m[1] : '';
+  }
+  async function fetchQuote(params){
+    const res = await fetch(appFee.dataset.quoteUrl + '?' + params);
+    const body = await res.json();
+    if(!res.ok) throw new Error(body.error);
+    return body;
+  }
+  async function updateFee(){
+    const dept = $('#applyDept').value;
+    const params = new URLSearchParams({ program: programType.value });
+    if(educationGPA()) params.set('gpa', educationGPA());
+    try {
+      let unknownDept = null;
+      if(dept){
+        try {
+          quote = await fetchQuote(new URLSearchParams([...params, ['department', dept]]));
+        } catch(e){
+          // no fee row for this department: the application fee still only depends on the program
+          unknownDept = e;
+          quote = await fetchQuote(params);
+        }
+      } else {
+        quote = await fetchQuote(params);
+      }
+      appFee.textContent = quote.application_fee + ' ' + quote.currency;
+      if(quote.tuition !== undefined){
+        feeNote.textContent = `Tuition: ${quote.tuition} ${quote.currency}` + (quote.discount
+          ? ` (${quote.discount.percent}% ${quote.discount.kind}: ${quote.tuition_after_discount} ${quote.currency})` : '');
+      } else if(unknownDept){
+        feeNote.textContent = 'Tuition unavailable' + (unknownDept.message ? ': ' + unknownDept.message : '');
+      } else {
+        feeNote.textContent = 'Select a department to see tuition';
+      }
+    } catch(e){
+      quote = null;
+      appFee.textContent = '— BDT';
+      feeNote.textContent = 'Fee unavailable' + (e.message ? ': ' + e.message : '');
+    }
+  }
   programType.addEventListener('change', updateFee);
+  $('#applyDept').addEventListener('change', updateFee);
+  $('#education').addEventListener('change', updateFee);
   updateFee();
 
   // Staged files (holds {name,type,size,dataUrl})
@@ -139,6 +194,7 @@ function fetchWithCSRF(url, opts) {
     const program = $('#programType').value;
 
     if(!name || !email || !phone || !dept){ toast('Please fill name, email, phone and select department.'); return; }
+    if(!quote){ toast('The application fee could not be quoted; please try again.'); updateFee(); return; }
 
     // Ensure required files exist (photo & transcript) for demo — signature optional
     if(!stagedFiles.photo || !stagedFiles.transcript){
@@ -155,7 +211,7 @@ function fetchWithCSRF(url, opts) {
         sign: stagedFiles.sign || null,
         transcript: stagedFiles.transcript || null
       },
-      fee: fees[program] || 0,
+      fee: quote.application_fee,
       status: 'submitted',
       appliedAt: new Date().toISOString()
     };
@@ -314,10 +370,11 @@ function fetchWithCSRF(url, opts) {
 
   // Department list + view applicants
   function renderDeptList(){
-    const seats = loadSeats();
     const container = $('#deptList'); container.innerHTML = '';
+    const q = $('#deptFilter').value.trim().toLowerCase();
     Object.keys(seats).forEach(d => {
-      const div = document.createElement('div'); div.className = 'dept-item';
+      const div = document.createElement('div'); div.className = 'dept-item'; div.dataset.dept = d;
+      if(!d.toLowerCase().includes(q)) div.style.display = 'none';
       div.innerHTML = `<h4>${d}</h4><div>Seats left: <span class="seats">${seats[d]}</span></div>
         <div style="margin-top:8px"><button class="btn" data-dept="${d}" data-act="view">View applicants</button></div>`;
       container.appendChild(div);
@@ -356,11 +413,10 @@ function fetchWithCSRF(url, opts) {
   function acceptApplicant(id){
     const apps = loadApps(); const app = apps.find(a=>a.id===id);
     if(!app) return;
-    const seats = loadSeats();
+    // seats are allocated by staff on the server; this only checks the live count
     if(seats[app.dept] <= 0){ alert('No seats left in ' + app.dept); return; }
     app.status = 'accepted';
     saveApps(apps);
-    seats[app.dept] = Math.max(0, seats[app.dept] - 1); saveSeats(seats);
     toast('Accepted ' + id + ' — seats left: ' + seats[app.dept]);
   }
   function rejectApplicant(id){
@@ -456,7 +512,7 @@ function fetchWithCSRF(url, opts) {
 
   // initial render
   renderDeptList();
-  loadSeats(); // ensure seats exist
+  connectSeats();
 
   // small auto-update: submitted -> docs_verified if files exist; paid -> verified
   setInterval(()=> {
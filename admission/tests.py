@@ -1,7 +1,49 @@
-from django.test import TestCase, Client
+import os
+import re
+import cProfile
+import json
+import time
+import hashlib
+import threading
+import asyncio
+import difflib
+import statistics
+import tempfile
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from datetime import date, datetime, timedelta
+from io import StringIO, BytesIO
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command, CommandError
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.contrib import admin
+from django.db import connection
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, Client, AsyncClient, RequestFactory, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Department, Application
+from .models import Department, Teacher, Application, ApplicationFile, Payment, ApplicationEvent
+from . import db_router
+from .db_router import PrimaryReplicaRouter, replica_reads, PIN_COOKIE
+from .management.commands.refresh_replica import refresh_replica
+from .catalog import adepartments
+from .sessions import SessionStore
+from .fees import fee_table
+from . import events, seats, uploads
+from .uploads import UploadASGIMiddleware, UploadError, storage
+from .admission_control import client_key, take_token, issue_ticket, check_in, config as admission_config, TICKET_SALT
+from .documents import DEFAULTS, check_document
+from .reports import admission_report, REPORT_CACHE
+from . import profiling, slow_queries, startup, urls
+from .management.commands.verify_documents import verify_batch
 
 
 class AdmissionAppTests(TestCase):
@@ -40,3 +82,1076 @@ class AdmissionAppTests(TestCase):
 		app = Application.objects.get(email='applicant@example.com')
 		self.assertEqual(app.full_name, 'Test Applicant')
 		self.assertEqual(app.department, dept)
+
+
+class SeedAdmissionsCommandTests(TestCase):
+	def setUp(self):
+		self.media = tempfile.TemporaryDirectory()
+		self.addCleanup(self.media.cleanup)
+
+	def seed(self, **options):
+		with override_settings(MEDIA_ROOT=self.media.name):
+			call_command('seed_admissions', departments=3, teachers=2, applications=120, batch_size=50,
+						 until=date(2025, 1, 31), stdout=StringIO(), **options)
+
+	def test_seeds_requested_volumes(self):
+		self.seed(files=1.0, payments=0.5)
+		self.assertEqual(Department.objects.count(), 3)
+		self.assertEqual(Teacher.objects.count(), 6)
+		self.assertEqual(Application.objects.count(), 120)
+		self.assertEqual(ApplicationFile.objects.count(), 360)
+		payment = Payment.objects.select_related('application').first()
+		self.assertEqual(payment.amount, payment.application.fee_amount)
+		self.assertTrue(os.path.exists(os.path.join(self.media.name, ApplicationFile.objects.first().file.name)))
+
+	def test_same_seed_is_reproducible(self):
+		self.seed(seed=7)
+		first = list(Application.objects.order_by('id').values_list('id', 'email', 'status', 'applied_at'))
+		self.seed(seed=7, clear=True)
+		second = list(Application.objects.order_by('id').values_list('id', 'email', 'status', 'applied_at'))
+		self.assertEqual(first, second)
+
+	def test_refuses_to_seed_over_applications_or_unknown_statuses(self):
+		self.seed()
+		with self.assertRaisesMessage(CommandError, 'pass --clear'):
+			self.seed(seed=2)
+		self.assertEqual((Department.objects.count(), Application.objects.count()), (3, 120))
+		with self.assertRaisesMessage(CommandError, '--statuses must use'):
+			self.seed(clear=True, statuses='submitted=1,waitlisted=1')
+
+
+@override_settings(ADMISSION_CONTROL={'RATE': 1, 'BURST': 2, 'CLIENT_RATE': 0.01, 'CLIENT_BURST': 2})
+class AdmissionControlTests(TestCase):
+	def setUp(self):
+		for c in (cache, caches['admission']):
+			c.clear()
+			self.addCleanup(c.clear)
+		self.dept = Department.objects.create(code='CSE', name='Computer Science', total_credits=120, per_credit_fee=100, seats=10)
+
+	def submit(self, client=None, ip='10.0.0.1'):
+		data = {'full_name': 'Load Test', 'email': 'load@example.com', 'phone': '0123456789', 'department': str(self.dept.pk)}
+		return (client or self.client).post(reverse('admission:application_create'), data, REMOTE_ADDR=ip)
+
+	def test_client_over_its_limit_is_turned_away_cheaply(self):
+		self.assertEqual(self.submit().status_code, 302)
+		self.assertEqual(self.submit().status_code, 302)
+		resp = self.submit()
+		self.assertEqual(resp.status_code, 429)
+		self.assertIn('Retry-After', resp)
+		self.assertEqual(Application.objects.count(), 2)
+
+	def test_overload_queues_clients_and_releases_them_in_order(self):
+		self.submit(ip='10.0.0.1')
+		self.submit(ip='10.0.0.2')
+		queued = Client()
+		resp = self.submit(queued, ip='10.0.0.3')
+		self.assertEqual(resp.status_code, 503)
+		self.assertIn('uap_queue_ticket', resp.cookies)
+		page = queued.get(reverse('admission:waiting_room'))
+		self.assertTemplateUsed(page, 'admission/waiting_room.html')
+		self.assertEqual(Application.objects.count(), 2)
+
+		with mock.patch('admission.admission_control.time.time', return_value=time.time() + 5):
+			self.assertEqual(self.submit(queued, ip='10.0.0.3').status_code, 302)
+		self.assertEqual(Application.objects.count(), 3)
+
+	def test_forged_ticket_is_ignored(self):
+		self.submit(ip='10.0.0.1')
+		self.submit(ip='10.0.0.2')
+		self.client.cookies['uap_queue_ticket'] = 'not-a-ticket'
+		self.assertEqual(self.submit(ip='10.0.0.3').status_code, 503)
+		self.assertEqual(Application.objects.count(), 2)
+
+	def test_throttled_client_without_a_ticket_is_not_sent_to_the_waiting_room(self):
+		self.submit()
+		self.submit()
+		resp = self.submit()
+		self.assertEqual(resp.status_code, 429)
+		self.assertNotIn(reverse('admission:waiting_room'), resp.content.decode())
+		page = self.client.get(reverse('admission:waiting_room'))
+		self.assertNotContains(page, 'It is your turn')
+		self.assertContains(page, 'You do not have a place in the queue')
+
+	def test_forwarded_for_counts_only_behind_trusted_proxies(self):
+		for hop in ('1.1.1.1', '2.2.2.2'):
+			self.client.post(reverse('admission:application_create'), {}, REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=hop)
+		resp = self.client.post(reverse('admission:application_create'), {}, REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='3.3.3.3')
+		self.assertEqual(resp.status_code, 429)
+
+		request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4')
+		self.assertEqual(client_key(request), '10.0.0.9')
+		self.assertEqual(client_key(request, trusted_proxies=1), '1.2.3.4')
+		self.assertEqual(client_key(request, trusted_proxies=3), '10.0.0.9')
+
+	def test_concurrent_submissions_never_share_a_token_or_a_queue_slot(self):
+		class SlowCache:
+			# widens the window between reading a bucket and writing it back
+			def __init__(self, cache):
+				self.cache = cache
+
+			def __getattr__(self, name):
+				return getattr(self.cache, name)
+
+			def get(self, *args, **kwargs):
+				value = self.cache.get(*args, **kwargs)
+				time.sleep(0.002)
+				return value
+
+		slow = SlowCache(caches['admission'])
+		with ThreadPoolExecutor(8) as pool:
+			taken = list(pool.map(lambda _: take_token(slow, 'admission:client:x', 0.001, 3)[0], range(16)))
+			tickets = list(pool.map(lambda _: issue_ticket(slow, admission_config())[0], range(16)))
+		self.assertEqual(taken.count(True), 3)
+		self.assertEqual(len({signing.loads(t, salt=TICKET_SALT)['n'] for t in tickets}), 16)
+
+	def test_queue_survives_the_default_cache_being_emptied(self):
+		self.submit(ip='10.0.0.1')
+		self.submit(ip='10.0.0.2')
+		self.assertEqual(self.submit(ip='10.0.0.3').status_code, 503)
+		cache.clear()
+		issued, served, _ = caches['admission'].get('admission:queue')
+		self.assertGreater(issued, served)
+
+	def test_apply_page_holds_visitors_while_submissions_are_queued(self):
+		self.submit(ip='10.0.0.1')
+		self.submit(ip='10.0.0.2')
+		queued = Client()
+		resp = queued.get(reverse('admission:admission_online'))
+		self.assertRedirects(resp, reverse('admission:waiting_room'))
+		self.assertIn('uap_queue_ticket', resp.cookies)
+		self.assertContains(queued.get(reverse('admission:waiting_room')), 'Your place in the queue is saved')
+
+		with mock.patch('admission.admission_control.time.time', return_value=time.time() + 5):
+			self.assertContains(queued.get(reverse('admission:waiting_room')), 'It is your turn')
+			self.assertEqual(queued.get(reverse('admission:admission_online')).status_code, 200)
+			self.assertEqual(self.submit(queued, ip='10.0.0.3').status_code, 302)
+		self.assertEqual(Application.objects.count(), 3)
+
+	def test_abandoned_tickets_do_not_hold_up_later_arrivals(self):
+		conf, store, now = admission_config(), caches['admission'], time.time()
+		tickets = [signing.loads(issue_ticket(store, conf, now)[0], salt=TICKET_SALT) for _ in range(2)]
+		first, second = [(t['id'], t['n']) for t in tickets]
+		store.delete(f'admission:alive:{first[1]}')  # its holder closed the tab and stopped checking in
+		self.assertEqual(check_in(store, conf, second, now + 1)[0], 'released')
+		self.assertIsNone(check_in(store, conf, first, now + 1)[0])
+
+
+class ReplicaRoutingTests(TestCase):
+	def setUp(self):
+		patcher = mock.patch('admission.db_router.replica_available', return_value=True)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.router = PrimaryReplicaRouter()
+
+	def test_only_opted_in_admission_reads_use_the_replica(self):
+		from django.contrib.sessions.models import Session
+		self.assertEqual(self.router.db_for_read(Department), 'default')
+		with replica_reads():
+			self.assertEqual(self.router.db_for_read(Department), 'replica')
+			self.assertEqual(self.router.db_for_read(Session), 'default')
+
+	def test_reads_stay_on_primary_after_a_write(self):
+		with replica_reads():
+			self.assertEqual(self.router.db_for_write(Application), 'default')
+			self.assertEqual(self.router.db_for_read(Application), 'default')
+		with replica_reads():  # the pin ends with the block
+			self.assertEqual(self.router.db_for_read(Application), 'replica')
+
+	def test_writes_outside_a_request_pin_nothing(self):
+		self.router.db_for_write(Application)  # a management command or worker thread
+		self.assertIsNone(db_router._pinned.get())
+		self.assertIsNone(db_router._wrote.get())
+
+	async def test_async_views_can_read_from_the_replica(self):
+		@replica_reads()
+		async def view():
+			return await sync_to_async(self.router.db_for_read)(Application)
+
+		self.assertEqual(await view(), 'replica')
+		self.assertEqual(self.router.db_for_read(Application), 'default')
+
+	def test_submission_pins_the_client_to_the_primary(self):
+		dept = Department.objects.create(code='CSE', name='Computer Science', total_credits=120, per_credit_fee=100, seats=10)
+		data = {'full_name': 'Pin Test', 'email': 'pin@example.com', 'phone': '0123456789', 'department': str(dept.pk)}
+		with override_settings(ADMISSION_CONTROL={'ENABLED': False}):
+			resp = self.client.post(reverse('admission:application_create'), data)
+		self.assertIn(PIN_COOKIE, resp.cookies)
+		self.assertNotIn(PIN_COOKIE, self.client.get(reverse('admission:index')).cookies)
+		# a later write while still pinned starts the pin over
+		with override_settings(ADMISSION_CONTROL={'ENABLED': False}):
+			resp = self.client.post(reverse('admission:application_create'), data)
+		self.assertEqual(resp.cookies[PIN_COOKIE]['max-age'], 60)
+
+	def test_refresh_replica_copies_the_primary(self):
+		import sqlite3
+		with tempfile.TemporaryDirectory() as tmp:
+			source, target = os.path.join(tmp, 'primary.sqlite3'), os.path.join(tmp, 'replica.sqlite3')
+			with sqlite3.connect(source) as db:
+				db.execute('CREATE TABLE t (x)')
+				db.executemany('INSERT INTO t VALUES (?)', [(i,) for i in range(1000)])
+			db.close()
+			before = time.time()
+			refresh_replica(source, target, pages=1, sleep=0)
+			db = sqlite3.connect(target)
+			self.assertEqual(db.execute('SELECT count(*) FROM t').fetchone()[0], 1000)
+			db.close()
+			self.assertFalse(os.path.exists(target + '.tmp'))
+			self.assertGreaterEqual(os.path.getmtime(target), int(before))  # when the copy started
+			self.assertLessEqual(os.path.getmtime(target), time.time())
+
+	def test_refresh_replica_finishes_while_the_primary_is_written_to(self):
+		import sqlite3
+		with tempfile.TemporaryDirectory() as tmp:
+			source, target = os.path.join(tmp, 'primary.sqlite3'), os.path.join(tmp, 'replica.sqlite3')
+			with sqlite3.connect(source) as db:
+				db.execute('CREATE TABLE t (x)')
+				db.executemany('INSERT INTO t VALUES (?)', [(i,) for i in range(20000)])
+			db.close()
+			stop = threading.Event()
+
+			def write():
+				db = sqlite3.connect(source, timeout=30)
+				while not stop.is_set():
+					with db:
+						db.execute('INSERT INTO t VALUES (-1)')
+				db.close()
+
+			writer = threading.Thread(target=write)
+			writer.start()
+			copier = threading.Thread(target=refresh_replica, args=(source, target))
+			try:
+				copier.start()
+				copier.join(timeout=20)
+				self.assertFalse(copier.is_alive())
+			finally:
+				stop.set()
+				writer.join()
+				copier.join()
+			db = sqlite3.connect(target)
+			self.assertGreaterEqual(db.execute('SELECT count(*) FROM t').fetchone()[0], 20000)
+			db.close()
+
+
+class AsyncViewTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(cache.clear)
+		self.dept = Department.objects.create(code='CSE', name='Computer Science', total_credits=120, per_credit_fee=100, seats=10)
+
+	async def test_public_pages_render_under_asgi(self):
+		client = AsyncClient()
+		for name in ('index', 'admission_info', 'admission_online'):
+			resp = await client.get(reverse(f'admission:{name}'))
+			self.assertEqual(resp.status_code, 200)
+		app = await Application.objects.acreate(full_name='Async', email='a@example.com', phone='1', department=self.dept)
+		resp = await client.get(reverse('admission:application_detail', args=[app.pk]))
+		self.assertContains(resp, 'Async')
+
+	async def test_catalog_is_cached_until_a_department_changes(self):
+		self.assertEqual([d.code for d in await adepartments()], ['CSE'])
+		await Department.objects.filter(pk=self.dept.pk).aupdate(code='CSE2')  # no signal: still cached
+		self.assertEqual([d.code for d in await adepartments()], ['CSE'])
+		await Department.objects.acreate(code='EEE', name='Electrical', total_credits=120, per_credit_fee=90, seats=8)
+		self.assertEqual([d.code for d in await adepartments()], ['CSE2', 'EEE'])
+
+
+@override_settings(ADMISSION_CONTROL={'ENABLED': False})
+class SessionWriteTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(cache.clear)
+		self.dept = Department.objects.create(code='CSE', name='Computer Science', total_credits=120, per_credit_fee=100, seats=10)
+
+	def test_anonymous_flow_never_writes_sessions(self):
+		data = {'full_name': 'No Session', 'email': 'ns@example.com', 'phone': '0123456789', 'department': str(self.dept.pk)}
+		with CaptureQueriesContext(connection) as queries:
+			self.client.get(reverse('admission:admission_online'))
+			resp = self.client.post(reverse('admission:application_create'), data, follow=True)
+			self.client.post(reverse('admission:application_create'), {}, follow=True)
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn('submitted successfully', [str(m) for m in resp.context['messages']][0])
+		self.assertEqual(Application.objects.count(), 1)
+		self.assertFalse([q['sql'] for q in queries if 'django_session' in q['sql']])
+		self.assertFalse(Session.objects.exists())
+
+	def test_anonymous_session_data_is_kept_in_the_cache(self):
+		session = SessionStore()
+		session['step'] = 2
+		session.save()
+		self.assertFalse(Session.objects.exists())
+		self.assertEqual(SessionStore(session.session_key)['step'], 2)
+
+	def test_staff_sessions_are_written_through(self):
+		User.objects.create_user('staff', password='pw-12345', is_staff=True)
+		self.client.get(reverse('admission:login'))
+		self.client.post(reverse('admission:login'), {'username': 'staff', 'password': 'pw-12345'})
+		self.assertEqual(Session.objects.count(), 1)
+		cache.clear()
+		self.assertEqual(self.client.get(reverse('admission:index')).context['user'].username, 'staff')
+
+
+@override_settings(ADMISSION_CONTROL={'ENABLED': False})
+class FeeEngineTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(cache.clear)
+		self.dept = Department.objects.create(code='CSE', name='Computer Science', total_credits=160, per_credit_fee=6000, seats=10)
+
+	def test_quote_applies_the_best_single_discount(self):
+		quote = fee_table().quote('cse', 'bachelors', gpa=4.85)
+		self.assertEqual((quote['application_fee'], quote['tuition']), (500, 960000))
+		self.assertEqual(quote['discount']['percent'], 25)
+		self.assertEqual(quote['tuition_after_discount'], 720000)
+		quote = fee_table().quote('CSE', 'masters', gpa=4.85, waivers=['freedom_fighter_ward'])
+		self.assertEqual((quote['tuition'], quote['discount']['name']), (36 * 6000, 'freedom_fighter_ward'))
+		self.assertEqual(quote['tuition_after_discount'], 108000)
+
+	def test_quote_endpoint_is_cacheable(self):
+		url = reverse('admission:fee_quote')
+		resp = self.client.get(url, {'department': 'CSE', 'program': 'postgraduate'})
+		self.assertEqual(resp.json()['application_fee'], 900)
+		self.assertIn('max-age', resp['Cache-Control'])
+		again = self.client.get(url, {'department': 'CSE', 'program': 'postgraduate'}, HTTP_IF_NONE_MATCH=resp['ETag'])
+		self.assertEqual(again.status_code, 304)
+		self.assertEqual(self.client.get(url, {'department': 'NOPE'}).status_code, 404)
+
+	def test_table_is_rebuilt_when_a_department_changes(self):
+		self.assertEqual(fee_table().quote('CSE', 'bachelors')['tuition'], 960000)
+		self.dept.per_credit_fee = 5000
+		self.dept.save()
+		self.assertEqual(fee_table().quote('CSE', 'bachelors')['tuition'], 800000)
+
+	def test_submission_ignores_client_fee(self):
+		data = {'full_name': 'Fee Test', 'email': 'fee@example.com', 'phone': '0123456789',
+				'department': 'CSE', 'program': 'masters', 'fee_amount': '1'}
+		self.client.post(reverse('admission:application_create'), data)
+		self.assertEqual(Application.objects.get().fee_amount, 700)
+
+	def test_online_form_offers_only_quotable_departments(self):
+		resp = self.client.get(reverse('admission:admission_online'))
+		select = re.search(r'<select id="applyDept"[^>]*>.*?</select>', resp.content.decode(), re.S).group()
+		codes = re.findall(r'<option value="([^"]+)">', select)
+		self.assertEqual(codes, ['CSE'])
+		for code in codes:
+			self.assertEqual(self.client.get(reverse('admission:fee_quote'), {'department': code}).status_code, 200)
+
+
+@override_settings(ADMISSION_CONTROL={'ENABLED': False}, ADMISSION_SEATS={'POLL_INTERVAL': 0.01})
+class SeatAvailabilityTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(cache.clear)
+		seats._local = None
+		self.dept = Department.objects.create(code='CSE', name='Computer Science', seats=2)
+		self.apps = [Application.objects.create(full_name=f'A{i}', email='a@example.com', phone='1',
+					department=self.dept, program='bachelors') for i in range(3)]
+
+	def test_accept_updates_seat_api(self):
+		url = reverse('admission:seat_availability')
+		resp = self.client.get(url)
+		self.assertEqual(resp.json()['seats'], {'CSE': 2})
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+		staff = User.objects.create_user('staff', password='pw', is_staff=True)
+		self.client.force_login(staff)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.post(reverse('admission:accept_applicant', args=[self.apps[0].pk]))
+		self.dept.refresh_from_db()
+		self.assertEqual(self.dept.seats, 1)
+		self.assertEqual(self.client.get(url).json()['seats'], {'CSE': 1})
+
+	def test_bulk_allocation_stops_at_zero_and_publishes_once(self):
+		with self.captureOnCommitCallbacks(execute=True) as callbacks:
+			accepted, refused = seats.allocate_seats(self.apps)
+		self.assertEqual((len(accepted), refused), (2, [self.apps[2]]))
+		self.assertEqual(len(callbacks), 1)
+		self.assertEqual(seats.current()['seats'], {'CSE': 0})
+		self.assertEqual(Application.objects.filter(status='accepted').count(), 2)
+
+	def test_accepting_twice_takes_one_seat(self):
+		stale = Application.objects.get(pk=self.apps[0].pk)
+		seats.allocate_seats([self.apps[0]])
+		# a second click, or a list that was loaded before the first accept
+		accepted, refused = seats.allocate_seats([stale, self.apps[0]])
+		self.assertEqual((accepted, refused), ([], []))
+		self.dept.refresh_from_db()
+		self.assertEqual(self.dept.seats, 1)
+		self.assertEqual(list(ApplicationEvent.objects.filter(kind='status').values_list('old_status', 'new_status')),
+						 [('submitted', 'accepted')])
+
+	def test_wsgi_stream_sends_one_event(self):
+		resp = self.client.get(reverse('admission:seat_stream'))
+		self.assertEqual(resp['Content-Type'], 'text/event-stream')
+		body = b''.join(resp.streaming_content)
+		self.assertIn(b'event: seats\ndata: {"version":', body)
+
+	async def test_one_encoded_message_fans_out_to_every_stream(self):
+		hub = seats.hub()
+		streams = [hub.stream() for _ in range(3)]
+		for stream in streams:
+			await anext(stream)  # retry line
+		first = [await anext(stream) for stream in streams]
+		self.assertIn(b'"CSE":2', first[0])
+		await Department.objects.filter(pk=self.dept.pk).aupdate(seats=1)
+		await sync_to_async(seats.publish)()
+		second = [await asyncio.wait_for(anext(stream), 1) for stream in streams]
+		self.assertIn(b'"CSE":1', second[0])
+		self.assertTrue(all(message is second[0] for message in second))
+		for stream in streams:
+			await stream.aclose()
+		self.assertEqual(hub.listeners, 0)
+
+
+@override_settings(ADMISSION_CONTROL={'ENABLED': False})
+class PresignedUploadTests(TestCase):
+	def setUp(self):
+		media = tempfile.TemporaryDirectory()
+		self.addCleanup(media.cleanup)
+		self.enterContext(override_settings(MEDIA_ROOT=media.name))
+		self.dept = Department.objects.create(code='CSE', name='Computer Science')
+
+	def sign(self, kind='transcript', filename='marks.pdf', size=9):
+		return self.client.post(reverse('admission:upload_sign'),
+								{'kind': kind, 'filename': filename, 'size': size, 'content_type': 'application/pdf'})
+
+	def test_signed_upload_is_attached_on_submit(self):
+		upload = self.sign().json()
+		put = self.client.put(upload['url'], b'%PDF-1.4\n', content_type='application/pdf')
+		self.assertEqual(put.status_code, 200)
+		self.client.post(reverse('admission:application_create'), {
+			'full_name': 'Up Loader', 'email': 'u@example.com', 'phone': '1', 'department': 'CSE',
+			'transcript_upload': upload['upload']})
+		app_file = ApplicationFile.objects.get()
+		self.assertEqual(app_file.application.status, 'submitted')
+		with app_file.file.open('rb') as f:
+			self.assertEqual(f.read(), b'%PDF-1.4\n')
+
+	def test_limits_and_bad_urls_are_refused(self):
+		self.assertEqual(self.sign(filename='setup.exe').status_code, 400)
+		self.assertEqual(self.sign(kind='photo', filename='me.png', size=6 * 1024 * 1024).status_code, 413)
+		upload = self.sign(size=4).json()
+		self.assertEqual(self.client.put(upload['url'], b'x' * (10 * 1024 * 1024 + 1)).status_code, 413)
+		self.assertEqual(self.client.put(upload['url'][:-3] + 'xx/', b'x').status_code, 403)
+		app = Application.objects.create(full_name='A', email='a@example.com', phone='1', department=self.dept, program='bachelors')
+		confirm = reverse('admission:upload_confirm', args=[app.pk])
+		self.assertEqual(self.client.post(confirm, {'kind': 'transcript', 'upload': upload['upload']}).status_code, 409)
+		self.client.put(upload['url'], b'%PDF-')
+		self.assertEqual(self.client.post(confirm, {'kind': 'transcript', 'upload': upload['upload']}).status_code, 201)
+		self.assertEqual(self.client.post(confirm, {'kind': 'transcript', 'upload': upload['upload']}).status_code, 409)
+
+	def test_upload_url_stores_one_object(self):
+		upload = self.sign().json()
+		self.assertEqual(self.client.put(upload['url'], b'%PDF-1.4\n').status_code, 200)
+		self.assertEqual(self.client.put(upload['url'], b'%PDF-evil').status_code, 409)
+		app = Application.objects.create(full_name='A', email='a@example.com', phone='1', department=self.dept, program='bachelors')
+		self.client.post(reverse('admission:upload_confirm', args=[app.pk]), {'kind': 'transcript', 'upload': upload['upload']})
+		app_file = ApplicationFile.objects.get()
+		app_file.file.delete(save=False)
+		self.assertEqual(self.client.put(upload['url'], b'%PDF-evil').status_code, 409)
+
+	def test_failed_put_can_be_retried(self):
+		upload = self.sign(size=4).json()
+		token = upload['url'].rstrip('/').rsplit('/', 1)[1]
+		receiver = storage.receiver(token)
+		with self.assertRaises(UploadError):
+			receiver.write(b'x' * (10 * 1024 * 1024 + 1))  # no Content-Length: refused while streaming
+		self.assertEqual(self.client.put(upload['url'], b'%PDF-').status_code, 200)
+
+	async def test_asgi_middleware_stores_put_without_django(self):
+		upload = (await sync_to_async(self.sign)()).json()
+		inner = mock.AsyncMock()
+		sent = []
+		body = [{'type': 'http.request', 'body': b'%PDF-', 'more_body': True},
+				{'type': 'http.request', 'body': b'1.7', 'more_body': False}]
+
+		async def receive():
+			return body.pop(0)
+
+		async def send(message):
+			sent.append(message)
+
+		scope = {'type': 'http', 'method': 'PUT', 'path': upload['url'], 'headers': [(b'content-length', b'8')]}
+		await UploadASGIMiddleware(inner)(scope, receive, send)
+		inner.assert_not_called()
+		self.assertEqual(sent[0]['status'], 200)
+		await UploadASGIMiddleware(inner)({**scope, 'method': 'GET'}, receive, send)
+		inner.assert_awaited_once()
+
+	async def test_asgi_put_rejects_bad_length_and_writes_off_the_event_loop(self):
+		upload = (await sync_to_async(self.sign)()).json()
+		sent, threads = [], set()
+		body = [{'type': 'http.request', 'body': b'%PDF-', 'more_body': False}]
+
+		async def receive():
+			return body.pop(0)
+
+		async def send(message):
+			sent.append(message)
+
+		scope = {'type': 'http', 'method': 'PUT', 'path': upload['url'], 'headers': [(b'content-length', b'five')]}
+		await UploadASGIMiddleware(mock.AsyncMock())(scope, receive, send)
+		self.assertEqual(sent[0]['status'], 400)
+		write = uploads.ObjectReceiver.write
+		with mock.patch.object(uploads.ObjectReceiver, 'write',
+							   lambda receiver, data: threads.add(threading.get_ident()) or write(receiver, data)):
+			await UploadASGIMiddleware(mock.AsyncMock())({**scope, 'headers': []}, receive, send)
+		self.assertEqual(sent[-1]['body'], hashlib.sha256(b'%PDF-').hexdigest().encode())
+		self.assertNotIn(threading.get_ident(), threads)
+
+	def test_put_with_bad_length_is_refused(self):
+		upload = self.sign().json()
+		self.assertEqual(self.client.generic('PUT', upload['url'], b'%PDF-', CONTENT_LENGTH='five').status_code, 400)
+
+	def test_an_upload_is_attached_once(self):
+		upload = self.sign().json()
+		self.client.put(upload['url'], b'%PDF-')
+		app = Application.objects.create(full_name='A', email='a@example.com', phone='1', department=self.dept, program='bachelors')
+		key = signing.loads(upload['upload'], salt=uploads.UPLOAD_SALT)['key']
+		ApplicationFile.objects.create(application=app, kind='transcript', file=key)  # a confirm that won the race
+		with self.assertRaisesMessage(UploadError, 'already attached'):
+			uploads.attach_upload(app, 'transcript', upload['upload'])
+		self.assertEqual(ApplicationFile.objects.count(), 1)
+
+	def test_sweep_deletes_uploads_nobody_attached(self):
+		attached, abandoned, recent = (self.sign().json() for _ in range(3))
+		for upload in (attached, abandoned, recent):
+			self.client.put(upload['url'], b'%PDF-')
+		app = Application.objects.create(full_name='A', email='a@example.com', phone='1', department=self.dept, program='bachelors')
+		uploads.attach_upload(app, 'transcript', attached['upload'])
+		later = time.time() + uploads.config()['CONFIRM_MAX_AGE'] + 1
+		key = lambda upload: signing.loads(upload['upload'], salt=uploads.UPLOAD_SALT)['key']
+		os.utime(storage.path(key(recent)), (later, later))
+		self.assertEqual(uploads.sweep_uploads(now=time.time()), 0)
+		self.assertEqual(uploads.sweep_uploads(now=later), 1)
+		self.assertEqual([storage.exists(key(u)) for u in (attached, abandoned, recent)], [True, False, True])
+		self.assertFalse(os.path.exists(os.path.dirname(storage.path(key(abandoned)))))
+
+
+def make_pdf(pages=1, trailer=b'', compressed=False):
+	import zlib
+	tree = b'<</Type/Pages/Kids[3 0 R]/Count %d>> <</Type/Page/Parent 2 0 R/Contents 4 0 R>>' % pages
+	if compressed:
+		packed = zlib.compress(tree)
+		body = b'5 0 obj<</Type/ObjStm/N 2/Length %d>>stream\n%s\nendstream endobj\n' % (len(packed), packed)
+	else:
+		body = b'2 0 obj' + tree + b'endobj\n'
+	return (b'%PDF-1.7\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n' + body
+			+ b'trailer<</Root 1 0 R' + trailer + b'>>\n%%EOF\n')
+
+
+def make_image(size=(400, 400), blank=False, fmt='PNG'):
+	from PIL import Image
+	image = Image.new('L', size, 200) if blank else Image.effect_noise(size, 60)
+	out = BytesIO()
+	image.save(out, fmt)
+	return out.getvalue()
+
+
+class DocumentVerificationTests(TestCase):
+	def setUp(self):
+		media = tempfile.TemporaryDirectory()
+		self.addCleanup(media.cleanup)
+		self.enterContext(override_settings(MEDIA_ROOT=media.name))
+		self.media = media.name
+
+	def check(self, content, kind='photo', name='doc'):
+		path = os.path.join(self.media, name)
+		with open(path, 'wb') as f:
+			f.write(content)
+		return check_document(path, kind)
+
+	def test_content_checks(self):
+		self.assertEqual(self.check(make_image())['width'], 400)
+		self.assertEqual(self.check(make_image(fmt='JPEG'))['type'], 'jpeg')
+		self.assertEqual(self.check(make_pdf(pages=3), 'transcript')['pages'], 3)
+		self.assertEqual(self.check(make_pdf(pages=2, compressed=True), 'transcript')['pages'], 2)
+		failures = {
+			'image is blank': self.check(make_image(blank=True)),
+			'image is 100x100 (at least 300x300)': self.check(make_image((100, 100))),
+			'pdf is not accepted for photo': self.check(make_pdf()),
+			'PDF is encrypted': self.check(make_pdf(trailer=b'/Encrypt 6 0 R'), 'transcript'),
+			'PDF is truncated': self.check(make_pdf()[:-8], 'transcript'),
+			'PDF has no pages': self.check(make_pdf(pages=0), 'transcript'),
+			'file is empty': self.check(b''),
+			'not a PNG, JPEG or PDF file': self.check(b'MZ\x90\x00' * 16),
+		}
+		for error, result in failures.items():
+			self.assertEqual((result['ok'], result['errors']), (False, [error]))
+		corrupt = self.check(make_image(fmt='JPEG')[:2000])
+		self.assertTrue(corrupt['errors'][0].startswith('image is corrupt'))
+
+	def test_batch_records_results_and_settles_applications(self):
+		dept = Department.objects.create(code='CSE', name='Computer Science')
+		good, bad = [Application.objects.create(full_name=n, email='a@example.com', phone='1', department=dept,
+				program='bachelors') for n in ('good', 'bad')]
+		for app, photo in ((good, make_image()), (bad, make_image(blank=True))):
+			app.files.create(kind='photo', file=ContentFile(photo, 'photo.png'))
+			app.files.create(kind='transcript', file=ContentFile(make_pdf(), 'marks.pdf'))
+		self.assertEqual(verify_batch(limit=3), 3)
+		self.assertEqual(Application.objects.get(pk=good.pk).status, 'docs_verified')
+		self.assertEqual(Application.objects.get(pk=bad.pk).status, 'submitted')  # transcript still pending
+		self.assertEqual(verify_batch(), 1)
+		self.assertEqual(verify_batch(), 0)
+		self.assertEqual(Application.objects.get(pk=bad.pk).status, 'docs_rejected')
+		blank = bad.files.get(kind='photo')
+		self.assertEqual((blank.verification, blank.verification_detail['errors']), ('failed', ['image is blank']))
+
+	def test_oversized_pdfs_are_refused_without_inflating_them(self):
+		import zlib
+		bomb = zlib.compress(b' ' * (64 * 1024 * 1024), 9)  # 64MB of spaces in ~64KB
+		pdf = (b'%PDF-1.7\n5 0 obj<</Type/ObjStm/N 2/Length ' + str(len(bomb)).encode() + b'>>stream\n' + bomb
+			   + b'\nendstream endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n')
+		self.assertEqual(self.check(pdf, 'transcript')['errors'], ['PDF object streams are too large'])
+		self.assertEqual(check_document(os.path.join(self.media, 'doc'), 'transcript', {**DEFAULTS, 'MAX_FILE_SIZE': 1024})
+						 ['errors'], ['file is larger than 1,024 bytes'])
+
+	def test_unexpected_errors_are_recorded_per_file(self):
+		os.mkdir(os.path.join(self.media, 'folder'))
+		self.assertEqual(check_document(os.path.join(self.media, 'folder'), 'photo')['errors'],
+						 [f'could not be checked (IsADirectoryError: [Errno 21] Is a directory: {os.path.join(self.media, "folder")!r})'])
+		dept = Department.objects.create(code='CSE', name='Computer Science')
+		app = Application.objects.create(full_name='A', email='a@example.com', phone='1', department=dept, program='bachelors')
+		app.files.create(kind='photo', file=ContentFile(make_image(), 'photo.png'))
+		app.files.create(kind='transcript', file=ContentFile(make_pdf(), 'marks.pdf'))
+		with mock.patch('admission.documents.inspect_pdf', side_effect=RecursionError('maximum recursion depth exceeded')):
+			self.assertEqual(verify_batch(), 2)
+		photo, transcript = app.files.order_by('kind')
+		self.assertEqual((photo.verification, transcript.verification), ('passed', 'failed'))
+		self.assertEqual(transcript.verification_detail['errors'],
+						 ['could not be checked (RecursionError: maximum recursion depth exceeded)'])
+		self.assertEqual(Application.objects.get(pk=app.pk).status, 'docs_rejected')
+
+
+@override_settings(ADMISSION_CONTROL={'ENABLED': False})
+class ApplicationEventTests(TestCase):
+	def setUp(self):
+		self.dept = Department.objects.create(code='CSE', name='Computer Science', seats=5)
+		self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+
+	def test_status_changes_are_logged(self):
+		self.client.post(reverse('admission:application_create'),
+						 {'full_name': 'Log Me', 'email': 'l@example.com', 'phone': '1', 'department': 'CSE'})
+		app = Application.objects.get()
+		self.client.force_login(self.staff)
+		self.client.post(reverse('admission:accept_applicant', args=[app.pk]))
+		self.client.post(reverse('admission:reject_applicant', args=[app.pk]))
+		history = [(e.kind, e.old_status, e.new_status, e.actor_id, e.source) for e in app.events.order_by('id')]
+		self.assertEqual(history, [
+			('created', '', 'submitted', None, 'apply'),
+			('status', 'submitted', 'accepted', self.staff.pk, 'staff'),
+			('status', 'accepted', 'rejected', self.staff.pk, 'staff'),
+		])
+		with self.assertRaises(TypeError):
+			app.events.first().save()
+
+	def test_batch_is_written_in_the_changes_transaction(self):
+		app = Application.objects.create(full_name='A', email='a@example.com', phone='1', department=self.dept, program='bachelors')
+		with self.assertRaises(RuntimeError), events.atomic():
+			events.status_changed(app, 'rejected')
+			app.save()
+			raise RuntimeError
+		self.assertEqual((Application.objects.get().status, ApplicationEvent.objects.count()), ('submitted', 0))
+		with CaptureQueriesContext(connection) as queries, events.atomic():
+			for i in range(1200):
+				events.record(app, 'note', n=i)
+		inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+		self.assertEqual(ApplicationEvent.objects.count(), 1200)
+		self.assertLess(len(inserts), 20)  # multi-row INSERTs, split to SQLite's parameter limit
+
+	def test_readers_resume_from_their_checkpoint(self):
+		app = Application.objects.create(full_name='A', email='a@example.com', phone='1', department=self.dept, program='bachelors')
+		for i in range(5):
+			events.record(app, 'note', n=i)
+		self.assertEqual([e.data['n'] for e in events.read_new('audit', limit=3)], [0, 1, 2])
+		self.assertEqual([e.data['n'] for e in events.read_new('audit')], [3, 4])
+		self.assertEqual(events.read_new('audit'), [])
+		self.assertEqual(len(events.read_new('export')), 5)
+		self.assertEqual(events.events_between(timezone.now() - timedelta(minutes=1), timezone.now()).count(), 5)
+
+
+def report_cache_in(folder):
+	"""Keep the reports cache in folder rather than the project's cache/ directory."""
+	return override_settings(CACHES={**settings.CACHES, REPORT_CACHE: {
+		'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': folder}})
+
+
+class AdmissionReportTests(TestCase):
+	def setUp(self):
+		folder = tempfile.TemporaryDirectory()
+		self.addCleanup(folder.cleanup)
+		self.enterContext(report_cache_in(folder.name))
+		cache.clear()
+		self.addCleanup(cache.clear)
+		self.today = timezone.localdate()
+		self.day = self.today - timedelta(days=3)
+		noon = timezone.make_aware(datetime.combine(self.day, datetime.min.time())) + timedelta(hours=12)
+		cse = Department.objects.create(code='CSE', name='Computer Science')
+		eee = Department.objects.create(code='EEE', name='Electrical')
+		for i, (dept, program, decision) in enumerate([(cse, 'bachelors', 'accepted'), (cse, 'bachelors', 'rejected'),
+				(cse, 'bachelors', None), (eee, 'masters', 'accepted')]):
+			app = Application.objects.create(full_name=f'A{i}', email='a@example.com', phone='1', department=dept,
+					program=program, applied_at=noon - timedelta(days=i + 1))
+			if decision:
+				ApplicationEvent.objects.create(application=app, kind='status', old_status='submitted',
+						new_status=decision, created_at=noon)
+			Payment.objects.create(application=app, amount=500, status='paid' if i < 2 else 'pending', paid_at=noon)
+
+	def test_grouped_figures(self):
+		report = admission_report(self.day - timedelta(days=7), self.day)
+		cse, eee = report['rows']
+		self.assertEqual((cse['department'], cse['applications'], cse['accepted'], cse['rejected']), ('CSE', 3, 1, 1))
+		self.assertEqual((cse['acceptance_rate'], cse['payments'], cse['revenue']), (0.5, 2, 1000))
+		self.assertEqual((cse['decision_days_median'], cse['decision_days_p90']), (1.0, 2.0))
+		self.assertEqual((eee['program'], eee['decision_days_median'], eee['revenue']), ('masters', 4.0, 0))
+		self.assertEqual((report['total']['decisions'], report['total']['acceptance_rate']), (3, 0.6667))
+
+	def test_closed_ranges_are_cached(self):
+		closed = (self.day - timedelta(days=7), self.day)
+		self.assertFalse(admission_report(*closed)['cached'])
+		with self.assertNumQueries(0):
+			self.assertTrue(admission_report(*closed)['cached'])
+		self.assertFalse(admission_report(self.day, self.today)['cached'])
+		self.assertFalse(admission_report(self.day, self.today)['cached'])
+
+	def test_closed_ranges_outlive_the_default_cache(self):
+		closed = (self.day - timedelta(days=7), self.day)
+		admission_report(*closed)
+		cache.clear()  # culled, or another worker's memory
+		with self.assertNumQueries(0):
+			self.assertTrue(admission_report(*closed)['cached'])
+		# a separate process (the admission_report command) opens its own connection
+		self.assertIsNotNone(caches.create_connection(REPORT_CACHE).get(
+			f'admission:report:v2:{closed[0].isoformat()}:{closed[1].isoformat()}'))
+		self.assertNotEqual(settings.CACHES[REPORT_CACHE]['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+
+	def test_stale_replica_and_edited_rows_are_not_frozen(self):
+		closed = (self.day - timedelta(days=7), self.day)
+		refreshed = timezone.make_aware(datetime.combine(self.day, datetime.min.time())).timestamp()
+		with mock.patch('admission.reports.replica_as_of', return_value=refreshed):  # copied on the last day
+			admission_report(*closed)
+			self.assertFalse(admission_report(*closed)['cached'])
+		self.assertFalse(admission_report(*closed)['cached'])
+		self.assertTrue(admission_report(*closed)['cached'])
+		app = Application.objects.get(full_name='A0')
+		app.department = Department.objects.get(code='EEE')
+		with self.captureOnCommitCallbacks(execute=True):
+			app.save()
+		report = admission_report(*closed)
+		self.assertFalse(report['cached'])
+		self.assertEqual([(r['department'], r['program'], r['applications']) for r in report['rows']],
+						 [('CSE', 'bachelors', 2), ('EEE', 'bachelors', 1), ('EEE', 'masters', 1)])
+		self.assertTrue(admission_report(*closed)['cached'])
+
+	def test_staff_view_formats(self):
+		url = reverse('admission:admission_report')
+		self.assertEqual(self.client.get(url).status_code, 302)
+		self.client.force_login(User.objects.create_user('registrar', password='pw', is_staff=True))
+		query = {'start': (self.day - timedelta(days=7)).isoformat(), 'end': self.day.isoformat()}
+		self.assertContains(self.client.get(url, query), '<td>CSE</td>')
+		self.assertEqual(self.client.get(url, {**query, 'format': 'json'}).json()['total']['applications'], 4)
+		csv_lines = self.client.get(url, {**query, 'format': 'csv'}).content.decode().splitlines()
+		self.assertEqual((csv_lines[0].split(',')[:3], csv_lines[-1].split(',')[:3]),
+						 (['department', 'program', 'applications'], ['All', 'all', '4']))
+		self.assertEqual(self.client.get(url, {'start': 'soon'}).status_code, 400)
+		self.assertEqual(self.client.get(url, {'start': query['end'], 'end': query['start']}).status_code, 400)
+		out = StringIO()
+		call_command('admission_report', '--start', query['start'], '--end', query['end'], '--format', 'csv', stdout=out)
+		self.assertEqual(out.getvalue().splitlines()[-1].split(',')[:3], ['All', 'all', '4'])
+
+
+class BusyProfile(cProfile.Profile):
+	"""cProfile while another profiler is active (Python 3.12+)."""
+	def enable(self, *args, **kwargs):
+		raise ValueError('Another profiling tool is already active')
+
+
+@override_settings(ADMISSION_CONTROL={'ENABLED': False})
+class ProfilingTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(cache.clear)
+		folder = tempfile.TemporaryDirectory()
+		self.addCleanup(folder.cleanup)
+		self.enterContext(override_settings(ADMISSION_PROFILING={'DIR': folder.name, 'KEEP': 2}))
+		Department.objects.create(code='CSE', name='Computer Science')
+		self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+
+	def test_only_staff_can_ask_for_a_profile(self):
+		response = self.client.get(reverse('admission:admission_online'), HTTP_X_PROFILE='cprofile')
+		self.assertNotIn('X-Profile-Id', response)
+		self.client.force_login(self.staff)
+		cache.clear()  # so the catalog reads the departments
+		response = self.client.get(reverse('admission:admission_online'), HTTP_X_PROFILE='cprofile')
+		record = profiling.load(response['X-Profile-Id'])
+		self.assertEqual((record['path'], record['status'], record['user'], record['mode']),
+						 ('/apply/', 200, 'staff', 'cprofile'))
+		self.assertTrue(any('admission_department' in q['sql'] for q in record['queries']))
+		self.assertEqual(record['sql_count'], len(record['queries']))
+		download = self.client.get(reverse('admission:profile_detail', args=[record['id']]), {'download': ''})
+		self.assertTrue(b''.join(download.streaming_content))
+		os.remove(profiling.artifact_path(record))  # pruned past KEEP after the listing was read
+		download = self.client.get(reverse('admission:profile_detail', args=[record['id']]), {'download': ''})
+		self.assertEqual(download.status_code, 404)
+
+	def test_sampled_profiles_are_folded_stacks_and_bounded(self):
+		self.client.force_login(self.staff)
+		ids = [self.client.get(reverse('admission:admission_info'), HTTP_X_PROFILE='sample')['X-Profile-Id']
+			   for _ in range(3)]
+		self.assertEqual(profiling.profile_ids(), sorted(ids[1:], reverse=True))
+		with override_settings(ADMISSION_PROFILING={'DIR': profiling.config()['DIR'], 'SAMPLE_RATE': 1.0}):
+			self.assertIn('X-Profile-Id', Client().get(reverse('admission:admission_info')))
+		listing = self.client.get(reverse('admission:profile_list'))
+		self.assertContains(listing, '/info/')
+		self.assertEqual(self.client.get(reverse('admission:profile_detail', args=['latest'])).status_code, 404)
+
+	def test_request_is_served_when_the_profiler_is_busy(self):
+		self.client.force_login(self.staff)
+		with mock.patch('cProfile.Profile', BusyProfile):
+			response = self.client.get(reverse('admission:admission_info'), HTTP_X_PROFILE='cprofile')
+		self.assertEqual(response.status_code, 200)
+		self.assertNotIn('X-Profile-Id', response)
+		self.assertIsNone(profiling._current.get())
+		self.assertEqual(profiling.profile_ids(), [])
+
+	async def test_async_request_is_served_when_the_profiler_is_busy(self):
+		await self.async_client.aforce_login(self.staff)
+		with mock.patch('cProfile.Profile', BusyProfile):
+			response = await self.async_client.get(reverse('admission:seat_availability'), headers={'X-Profile': 'cprofile'})
+		self.assertEqual(response.status_code, 200)
+		self.assertNotIn('X-Profile-Id', response)
+		self.assertIsNone(profiling._current.get())
+
+	async def test_async_profiles_are_saved_off_the_event_loop(self):
+		await self.async_client.aforce_login(self.staff)
+		threads, save = [], profiling.save
+
+		def recording_save(*args):
+			threads.append(threading.get_ident())
+			save(*args)
+
+		with mock.patch.object(profiling, 'save', recording_save):
+			response = await self.async_client.get(reverse('admission:seat_availability'), headers={'X-Profile': 'sample'})
+		self.assertEqual(len(threads), 1)
+		self.assertNotEqual(threads[0], threading.get_ident())
+		self.assertEqual(profiling.profile_ids(), [response['X-Profile-Id']])
+
+
+class SlowQueryLogTests(TestCase):
+	def setUp(self):
+		folder = tempfile.TemporaryDirectory()
+		self.addCleanup(folder.cleanup)
+		self.log = os.path.join(folder.name, 'slow.log')
+		self.enterContext(mock.patch.object(slow_queries, '_explained', set()))
+		cse = Department.objects.create(code='CSE', name='Computer Science')
+		Application.objects.create(full_name='A', email='a@example.com', phone='1', department=cse, program='bachelors')
+
+	def test_fingerprints_ignore_literals_and_list_lengths(self):
+		self.assertEqual(slow_queries.fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s) AND "n" > 5 LIMIT 21'),
+						 slow_queries.fingerprint("SELECT * FROM \"t\" WHERE \"id\" IN (%s)  AND \"n\" > 'x' LIMIT 1"))
+		self.assertNotEqual(slow_queries.fingerprint('SELECT "a" FROM "t"'), slow_queries.fingerprint('SELECT "b" FROM "t"'))
+
+	def test_slow_queries_are_logged_with_plan_view_and_caller(self):
+		User.objects.create_superuser('admin', password='pw')
+		self.client.login(username='admin', password='pw')
+		with override_settings(ADMISSION_SLOW_QUERIES={'THRESHOLD_MS': 0, 'LOG': self.log}):
+			self.assertEqual(self.client.get('/admin/admission/application/').status_code, 200)
+			list(Application.objects.filter(full_name__contains='A'))
+			list(Application.objects.filter(full_name__contains='B'))
+		entries = list(slow_queries.read_log(self.log))
+		self.assertIn('admin:admission_application_changelist', {e['view'] for e in entries})
+		scan = [e for e in entries if 'LIKE' in e['sql'] and e['caller'].startswith('admission/tests.py')]
+		self.assertEqual(len(scan), 2)
+		self.assertEqual(scan[0]['fingerprint'], scan[1]['fingerprint'])
+		self.assertIsNone(scan[1]['plan'])  # explained once per process
+
+		out = StringIO()
+		call_command('slow_queries', '--log', self.log, '--json', '--top', '100', stdout=out)
+		worst = {q['fingerprint']: q for q in json.loads(out.getvalue())}[scan[0]['fingerprint']]
+		self.assertEqual((worst['count'], worst['full_scans']), (2, ['admission_application']))
+		out = StringIO()
+		call_command('slow_queries', '--log', self.log, stdout=out)
+		self.assertIn('plan    SCAN admission_application', out.getvalue())
+
+
+class StartupWarmUpTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.enterContext(mock.patch.object(seats, '_local', None))
+		self.enterContext(mock.patch.object(startup.connections, 'close_all'))  # would end the test's transaction
+		cse = Department.objects.create(code='CSE', name='Computer Science')
+		Teacher.objects.create(department=cse, name='T', position='Lecturer')
+
+	def test_warm_up_serves_the_first_request_from_cache(self):
+		warmed = startup.warm_up()
+		folder = os.path.join(os.path.dirname(__file__), 'templates', 'admission')
+		self.assertEqual(warmed['templates'], len([n for n in os.listdir(folder) if n.endswith('.html')]))
+		self.assertEqual(warmed['departments'], 1)
+		self.assertGreater(warmed['urls'], 0)
+		with self.assertNumQueries(0):
+			self.assertEqual(self.client.get('/apply/').status_code, 200)
+
+	def test_worker_ready_records_timings(self):
+		started = time.perf_counter()
+		with override_settings(ADMISSION_STARTUP={'WARM_UP': False}), mock.patch.dict(startup.timings, clear=True):
+			startup.worker_ready('wsgi', started, started)
+			self.assertEqual((startup.timings['server'], startup.timings['warmed']), ('wsgi', {}))
+			self.assertGreaterEqual(startup.timings['total_ms'], startup.timings['setup_ms'])
+
+
+PERF_BASELINE = os.path.join(os.path.dirname(__file__), 'perf_baseline.json')
+
+
+@override_settings(ADMISSION_CONTROL={'ENABLED': False})
+class PerformanceBudgetTests(TestCase):
+	"""
+	Every URL in urls.py and every admin changelist, against medium-sized
+	seeded data: the SQL it runs with an empty cache ("cold") and warm must
+	not grow past the queries recorded in perf_baseline.json, and its median
+	warm time must stay within TIME_FACTOR of the recorded one (plus
+	TIME_SLACK_MS).  A failure shows the diff of the normalized queries.
+	After an intended change, rewrite the baseline with
+	UPDATE_PERF_BASELINE=1 python manage.py test admission.tests.PerformanceBudgetTests
+	"""
+	RUNS = 5
+	TIME_FACTOR = float(os.environ.get('PERF_TIME_FACTOR', 3))
+	TIME_SLACK_MS = 25
+
+	@classmethod
+	def setUpClass(cls):
+		folder = tempfile.TemporaryDirectory()
+		cls.addClassCleanup(folder.cleanup)
+		cls.enterClassContext(override_settings(MEDIA_ROOT=os.path.join(folder.name, 'media'),
+												ADMISSION_PROFILING={'DIR': os.path.join(folder.name, 'profiles')}))
+		cls.enterClassContext(report_cache_in(os.path.join(folder.name, 'reports')))
+		super().setUpClass()
+
+	@classmethod
+	def setUpTestData(cls):
+		call_command('seed_admissions', departments=8, teachers=12, applications=500, files=1.0, payments=0.5,
+					 until=date(2025, 1, 31), stdout=StringIO())
+		cls.admin_user = User.objects.create_superuser('perf-admin', password='pw')
+
+	def setUp(self):
+		self.staff = Client()
+		self.staff.force_login(self.admin_user)
+		self.dept = Department.objects.order_by('code').first()
+		self.png = make_image(size=(300, 300))
+
+	def new_application(self):
+		return Application.objects.create(full_name='Perf', email='p@example.com', phone='1', department=self.dept,
+										  program='bachelors')
+
+	def signed_upload(self):
+		return self.client.post(reverse('admission:upload_sign'),
+								{'kind': 'photo', 'filename': 'p.png', 'size': len(self.png), 'content_type': 'image/png'}).json()
+
+	def cases(self):
+		"""name -> prepare(): does any setup and returns the request to measure."""
+		def get(path, client=None, **params):
+			return lambda: (lambda: (client or self.client).get(path, params))
+
+		def accept():
+			pk = self.new_application().pk
+			return lambda: self.staff.post(reverse('admission:accept_applicant', args=[pk]))
+
+		def reject():
+			pk = self.new_application().pk
+			return lambda: self.staff.post(reverse('admission:reject_applicant', args=[pk]))
+
+		def upload_put():
+			url = self.signed_upload()['url']
+			return lambda: self.client.generic('PUT', url, self.png, content_type='image/png')
+
+		def upload_confirm():
+			signed = self.signed_upload()
+			self.client.generic('PUT', signed['url'], self.png, content_type='image/png')
+			pk = self.new_application().pk
+			return lambda: self.client.post(reverse('admission:upload_confirm', args=[pk]),
+											{'kind': 'photo', 'upload': signed['upload']})
+
+		def profile_detail():
+			profile_id = self.staff.get(reverse('admission:admission_info'), HTTP_X_PROFILE='cprofile')['X-Profile-Id']
+			return get(reverse('admission:profile_detail', args=[profile_id]), self.staff)()
+
+		def logout():
+			client = Client()
+			client.force_login(self.admin_user)
+			return lambda: client.post(reverse('admission:logout'))
+
+		app = Application.objects.order_by('applied_at').first()
+		cases = {
+			'admission:index': get(reverse('admission:index')),
+			'admission:admission_info': get(reverse('admission:admission_info')),
+			'admission:admission_online': get(reverse('admission:admission_online')),
+			'admission:application_create': lambda: lambda: self.client.post(reverse('admission:application_create'), {
+				'full_name': 'Perf', 'email': 'p@example.com', 'phone': '1', 'department': self.dept.code,
+				'program': 'bachelors'}),
+			'admission:waiting_room': get(reverse('admission:waiting_room')),
+			'admission:fee_quote': get(reverse('admission:fee_quote'), department=self.dept.code, program='bachelors'),
+			'admission:seat_availability': get(reverse('admission:seat_availability')),
+			'admission:seat_stream': get(reverse('admission:seat_stream')),
+			'admission:upload_sign': lambda: lambda: self.client.post(reverse('admission:upload_sign'), {
+				'kind': 'photo', 'filename': 'p.png', 'size': 100, 'content_type': 'image/png'}),
+			'admission:upload_put': upload_put,
+			'admission:application_detail': get(reverse('admission:application_detail', args=[app.pk])),
+			'admission:upload_confirm': upload_confirm,
+			'admission:accept_applicant': accept,
+			'admission:reject_applicant': reject,
+			'admission:admission_report': get(reverse('admission:admission_report'), self.staff,
+											  start='2024-11-01', end='2025-01-31'),
+			'admission:profile_list': get(reverse('admission:profile_list'), self.staff),
+			'admission:profile_detail': profile_detail,
+			'admission:login': get(reverse('admission:login')),
+			'admission:logout': logout,
+		}
+		for model in admin.site._registry:
+			name = f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+			cases[name] = get(reverse(name), self.staff)
+		return cases
+
+	def measure(self, prepare, cold=False):
+		request = prepare()
+		if cold:
+			cache.clear()
+			caches[REPORT_CACHE].clear()
+		with mock.patch.object(seats, '_local', None) if cold else nullcontext():
+			with CaptureQueriesContext(connection) as captured:
+				start = time.perf_counter()
+				response = request()
+				if response.streaming:
+					b''.join(response.streaming_content)
+				elapsed = time.perf_counter() - start
+		self.assertLess(response.status_code, 400, response)
+		return [slow_queries.normalize(q['sql']) for q in captured.captured_queries], elapsed * 1000
+
+	def test_every_url_has_a_budget(self):
+		names = {f'admission:{p.name}' for p in urls.urlpatterns}
+		self.assertEqual(names - set(self.cases()), set())
+
+	def test_query_and_time_budgets(self):
+		update = os.environ.get('UPDATE_PERF_BASELINE')
+		baseline = {}
+		if os.path.exists(PERF_BASELINE):
+			with open(PERF_BASELINE) as f:
+				baseline = json.load(f)
+		measured = {}
+		for name, prepare in self.cases().items():
+			with self.subTest(name):
+				cold, _ = self.measure(prepare, cold=True)
+				runs = [self.measure(prepare) for _ in range(self.RUNS)]
+				measured[name] = {'cold': cold, 'warm': runs[-1][0],
+								  'ms': round(statistics.median(ms for _, ms in runs), 2)}
+				if update:
+					continue
+				self.assertIn(name, baseline, 'no baseline; rerun with UPDATE_PERF_BASELINE=1')
+				for state in ('cold', 'warm'):
+					now, budget = measured[name][state], baseline[name][state]
+					if len(now) > len(budget):
+						diff = '\n'.join(difflib.unified_diff(budget, now, 'baseline', 'now', lineterm=''))
+						self.fail(f'{name} ({state}) ran {len(now)} queries, budget {len(budget)}:\n{diff}')
+				limit = baseline[name]['ms'] * self.TIME_FACTOR + self.TIME_SLACK_MS
+				self.assertLessEqual(measured[name]['ms'], limit,
+									 f'{name}: median {measured[name]["ms"]} ms, baseline {baseline[name]["ms"]} ms')
+		if update:
+			with open(PERF_BASELINE, 'w') as f:
+				json.dump(measured, f, indent=1, sort_keys=True)
+				f.write('\n')
@@ -0,0 +1,266 @@
+"""Direct-to-storage uploads for application documents.
+
+Instead of posting the photo, signature and transcript through
+application_create (where a web worker parses and copies every byte), the
+browser:
+
+1. asks for a signed upload URL: POST apply/uploads/ with kind, filename and
+   size -> {'upload': token, 'url': ..., 'method': 'PUT', ...};
+2. PUTs the file to that URL, which is served by the storage backend rather
+   than by a Django view;
+3. hands the token back, either as ``<kind>_upload`` in the application
+   form or to POST application/<id>/files/, and the stored object is
+   attached to the application as an ApplicationFile without being copied.
+
+The backend is ``ADMISSION_UPLOADS['BACKEND']``: a Django storage with a
+``presign_put(key, content_type, max_size, expires)`` method returning the
+URL and headers for step 2.  LocalObjectStore is the local, S3-like stand-in:
+it signs URLs with Django's signing module, and UploadASGIMiddleware (wired
+in asgi.py) takes the PUTs straight off the socket into MEDIA_ROOT before
+Django's request handling starts.  Each signed URL stores one object: a PUT
+claims the key with an exclusively created ``<key>.put`` marker, and a
+second PUT to the same URL is refused with 409 once the object exists,
+while it is being written, or after it has been attached.  A PUT that fails
+part-way gives its claim back so the browser can retry.  An S3 backend
+would return the bucket's presigned PUT URL from presign_put() instead.
+
+An object can be attached once (a unique constraint on uploaded keys), and
+only within CONFIRM_MAX_AGE of signing; sweep_uploads() (the sweep_uploads
+command) deletes the objects nobody attached in that time.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from .models import ApplicationFile
+
+
+DEFAULTS = {
+    'BACKEND': 'admission.uploads.LocalObjectStore',
+    'URL_MAX_AGE': 10 * 60,         # seconds a signed upload URL accepts a PUT
+    'CONFIRM_MAX_AGE': 24 * 60 * 60,  # seconds an uploaded object can wait to be attached
+    'MAX_SIZE': {'photo': 5 * 1024 * 1024, 'sign': 5 * 1024 * 1024, 'transcript': 10 * 1024 * 1024},
+    'EXTENSIONS': ['jpg', 'jpeg', 'png', 'pdf'],
+    'CHUNK': 64 * 1024,
+}
+UPLOAD_SALT = 'admission.uploads'
+UPLOAD_PATH = '/uploads/'  # admission:upload_put
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'ADMISSION_UPLOADS', {})}
+
+
+storage = SimpleLazyObject(lambda: import_string(config()['BACKEND'])())
+
+
+class LocalObjectStore(FileSystemStorage):
+    """MEDIA_ROOT storage that accepts signed PUT uploads, like a bucket would."""
+
+    def presign_put(self, key, content_type, max_size, expires):
+        token = signing.dumps({'key': key, 'max': max_size}, salt=UPLOAD_SALT + '.put')
+        return {
+            'url': reverse('admission:upload_put', args=[token]),
+            'method': 'PUT',
+            'headers': {'Content-Type': content_type},
+            'expires_in': expires,
+        }
+
+    def receiver(self, token, content_length=None):
+        """An ObjectReceiver for the PUT to a URL from presign_put()."""
+        try:
+            grant = signing.loads(token, salt=UPLOAD_SALT + '.put', max_age=config()['URL_MAX_AGE'])
+        except signing.SignatureExpired:
+            raise UploadError('Upload URL has expired.', 403)
+        except signing.BadSignature:
+            raise UploadError('Invalid upload URL.', 403)
+        if content_length is not None and content_length > grant['max']:
+            raise UploadError('File is too large.', 413)
+        return ObjectReceiver(self.path(grant['key']), grant['max'])
+
+
+class ObjectReceiver:
+    """Writes one PUT body to disk as it arrives; the object appears only when complete."""
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self.size = 0
+        self.hash = hashlib.sha256()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.claim = f'{path}.put'
+        try:
+            # O_EXCL: of two PUTs to the same URL only one gets past here,
+            # and the marker outlives the upload so the URL cannot replace it.
+            open(self.claim, 'x').close()
+        except FileExistsError:
+            raise UploadError('This upload URL has already been used.', 409)
+        if os.path.exists(path):  # stored before markers were written
+            raise UploadError('This upload URL has already been used.', 409)
+        self.partial = f'{path}.{uuid.uuid4().hex}.part'
+        self.file = open(self.partial, 'xb')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.abort()
+            raise UploadError('File is too large.', 413)
+        self.hash.update(data)
+        self.file.write(data)
+
+    def finish(self):
+        self.file.close()
+        os.replace(self.partial, self.path)
+        return {'size': self.size, 'sha256': self.hash.hexdigest()}
+
+    def abort(self):
+        self.file.close()
+        for path in (self.partial, self.claim):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def sign_upload(kind, filename, size, content_type=''):
+    """Reserve a key for one document and return the presigned upload for it."""
+    conf = config()
+    if kind not in conf['MAX_SIZE']:
+        raise UploadError(f'Unknown document kind {kind!r}.')
+    ext = os.path.splitext(filename)[1].lstrip('.').lower()
+    if ext not in conf['EXTENSIONS']:
+        raise UploadError(f'Only {", ".join(conf["EXTENSIONS"])} files are accepted.')
+    if size > conf['MAX_SIZE'][kind]:
+        raise UploadError(f'{kind} must be at most {conf["MAX_SIZE"][kind] // (1024 * 1024)}MB.', 413)
+    key = f'uploads/{uuid.uuid4().hex}/{kind}.{ext}'
+    upload = storage.presign_put(key, content_type or 'application/octet-stream',
+                                 conf['MAX_SIZE'][kind], conf['URL_MAX_AGE'])
+    upload['upload'] = signing.dumps({'key': key, 'kind': kind}, salt=UPLOAD_SALT)
+    return upload
+
+
+def attach_upload(application, kind, token):
+    """The confirmation step: attach an uploaded object to the application."""
+    try:
+        grant = signing.loads(token, salt=UPLOAD_SALT, max_age=config()['CONFIRM_MAX_AGE'])
+    except signing.BadSignature:
+        raise UploadError('Invalid or expired upload.')
+    if grant['kind'] != kind:
+        raise UploadError(f'This upload is not a {kind}.')
+    if not storage.exists(grant['key']):
+        raise UploadError('The file has not been uploaded yet.', 409)
+    try:
+        # the unique constraint on uploaded keys settles two confirms racing each other
+        with transaction.atomic():
+            return ApplicationFile.objects.create(application=application, kind=kind, file=grant['key'])
+    except IntegrityError:
+        raise UploadError('This upload is already attached.', 409)
+
+
+def content_length(value):
+    """The Content-Length header as an int, None without one; UploadError (400) when it is not a number."""
+    if not value:
+        return None
+    try:
+        length = int(value)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise UploadError('Invalid Content-Length.')
+    return length
+
+
+def sweep_uploads(now=None):
+    """
+    Delete the uploads nobody attached: every signed key has a folder of its
+    own (the object, its ``.put`` marker, partial writes), and a folder
+    whose files are all older than CONFIRM_MAX_AGE holds a token that can
+    no longer attach anything.  Returns the number of folders deleted.
+    """
+    cutoff = (now or time.time()) - config()['CONFIRM_MAX_AGE']
+    try:
+        folders = storage.listdir('uploads')[0]
+    except FileNotFoundError:
+        return 0
+    stale = {}
+    for folder in folders:
+        names = [f'uploads/{folder}/{name}' for name in storage.listdir(f'uploads/{folder}')[1]]
+        if all(storage.get_modified_time(name).timestamp() < cutoff for name in names):
+            stale[folder] = names
+    keys = [name for names in stale.values() for name in names if not name.endswith(('.put', '.part'))]
+    attached = set()
+    for i in range(0, len(keys), 500):
+        attached.update(ApplicationFile.objects.filter(file__in=keys[i:i + 500]).values_list('file', flat=True))
+    deleted = 0
+    for folder, names in stale.items():
+        if attached.intersection(names):
+            continue
+        for name in names:
+            storage.delete(name)
+        try:
+            os.rmdir(storage.path(f'uploads/{folder}'))
+        except (NotImplementedError, OSError):  # not on disk, or not empty after all
+            pass
+        deleted += 1
+    return deleted
+
+
+def _respond(status, body=b''):
+    return [
+        {'type': 'http.response.start', 'status': status,
+         'headers': [(b'content-type', b'text/plain'), (b'content-length', str(len(body)).encode())]},
+        {'type': 'http.response.body', 'body': body},
+    ]
+
+
+class UploadASGIMiddleware:
+    """
+    Serves PUT UPLOAD_PATH<token>/ for LocalObjectStore without entering
+    Django: no middleware, session or body parsing, one chunk in memory.
+    Everything else goes to the wrapped application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'PUT' or not scope['path'].startswith(UPLOAD_PATH):
+            return await self.app(scope, receive, send)
+        for message in await self.put(scope, receive):
+            await send(message)
+
+    async def put(self, scope, receive):
+        # The file I/O runs in threads: a slow disk must not stall the other
+        # requests on this event loop.
+        token = scope['path'][len(UPLOAD_PATH):].strip('/')
+        try:
+            length = content_length(dict(scope['headers']).get(b'content-length'))
+            receiver = await asyncio.to_thread(storage.receiver, token, length)
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    await asyncio.to_thread(receiver.abort)
+                    return []
+                await asyncio.to_thread(receiver.write, message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            result = await asyncio.to_thread(receiver.finish)
+        except UploadError as exc:
+            return _respond(exc.status, str(exc).encode())
+        return _respond(200, result['sha256'].encode())
@@ -16,11 +16,21 @@ urlpatterns = [
     path('info/', views.admission_info, name='admission_info'),             # /info/
     path('apply/', views.admission_online, name='admission_online'),       # /apply/
     path('apply/submit/', views.application_create, name='application_create'),  # POST target
+    path('apply/wait/', views.waiting_room, name='waiting_room'),          # queue page under load
+    path('apply/quote/', views.fee_quote, name='fee_quote'),               # JSON fee quote
+    path('apply/seats/', views.seat_availability, name='seat_availability'),   # JSON seats left
+    path('apply/seats/stream/', views.seat_stream, name='seat_stream'),        # seats as server-sent events
+    path('apply/uploads/', views.upload_sign, name='upload_sign'),         # signed upload URL
+    path('uploads/<str:token>/', views.upload_put, name='upload_put'),      # PUT target (see uploads.py)
     path('application/<uuid:pk>/', views.application_detail, name='application_detail'),
+    path('application/<uuid:pk>/files/', views.upload_confirm, name='upload_confirm'),
 
     # staff actions
     path('application/<uuid:pk>/accept/', views.accept_applicant, name='accept_applicant'),
     path('application/<uuid:pk>/reject/', views.reject_applicant, name='reject_applicant'),
+    path('staff/report/', views.admission_report, name='admission_report'),
+    path('staff/profiles/', views.profile_list, name='profile_list'),
+    path('staff/profiles/<str:profile_id>/', views.profile_detail, name='profile_detail'),
 
     
 
@@ -1,45 +1,67 @@
 
 
 # admissions/views.py
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.urls import reverse
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
+from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-from django.http import HttpResponse, Http404
+from datetime import date
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse, FileResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.cache import patch_cache_control, get_conditional_response
 
-from .models import Department, Teacher, Application, ApplicationFile, Payment
+from .models import Department, Application, ApplicationFile, Payment
+from .admission_control import admission_control, hold_for_form, waiting_room_response
+from .catalog import adepartments, ateachers
+from .db_router import replica_reads
+from .fees import fee_table, FeeError, config as fee_config
+from . import events, seats, profiling
+from .reports import admission_report as build_report, default_range, report_csv, report_html
+from .uploads import storage, sign_upload, attach_upload, content_length, UploadError, config as upload_config
 
 
 
-def index(request):
+async def arender(request, template_name, context=None, status=None):
+    """
+    render() for the async views: the user (and with it the session) is
+    loaded through the async auth API first, and the template is rendered
+    in a worker thread, so nothing a template or context processor touches
+    (a lazy queryset, the messages storage) can block the event loop.
+    """
+    request.user = await request.auser()
+    return await sync_to_async(render)(request, template_name, context, status=status)
+
+
+async def index(request):
     
-    return render(request, 'admission/index.html', {})
+    return await arender(request, 'admission/index.html', {})
 
 
-def admission_info(request):
+async def admission_info(request):
     """
     Admission information page.
     Provides department list to populate the calculator / info sections.
     Template: templates/admission/admission.html
     """
-    departments = Department.objects.all().order_by('code')
-    return render(request, 'admission/admission.html', {'departments': departments})
+    return await arender(request, 'admission/admission.html', {'departments': await adepartments()})
 
 
-def admission_online(request):
+@hold_for_form
+async def admission_online(request):
     """
     Apply online page.
     Template: templates/admission/admission_online.html
     Provide departments & teachers for dropdowns / directory.
+    Under load visitors queue in the waiting room before seeing the form.
     """
-    departments = Department.objects.all().order_by('code')
-    teachers = Teacher.objects.select_related('department').all().order_by('department__code', 'name')
-    return render(request, 'admission/admission_online.html', {
-        'departments': departments,
-        'teachers': teachers,
+    return await arender(request, 'admission/admission_online.html', {
+        'departments': await adepartments(),
+        'teachers': await ateachers(),
     })
 
 
@@ -47,6 +69,8 @@ def admission_online(request):
 
 
 
+
+@admission_control
 @require_http_methods(["POST"])
 def application_create(request):
     
@@ -81,41 +105,44 @@ def application_create(request):
         messages.error(request, 'Selected department does not exist.')
         return redirect(reverse('admission:admission_online'))
 
-    # Fee resolution: frontend may pass fee_amount, otherwise fallback to dept.per_credit_fee
-    # Error Handling: if invalid, fallback to dept.per_credit_fee
-    fee_amount = data.get('fee_amount')
-    try:
-        fee_amount = int(fee_amount) if fee_amount else int(department.per_credit_fee or 0)
-    except Exception:
-        fee_amount = int(department.per_credit_fee or 0)
-
-    # create application
-    app = Application.objects.create(
-        full_name=full_name,
-        email=email,
-        phone=phone,
-        guardian=data.get('guardian', '').strip(),
-        address=data.get('address', '').strip(),
-        education=data.get('education', '').strip(),
-        exam_roll=data.get('exam_roll', '').strip(),
-        department=department,
-        program=program,
-        fee_amount=fee_amount,
-        status='submitted',
-    )
-
-    # handle uploaded files (if any)
-    saved_any_file = False
-    for kind in ('photo', 'sign', 'transcript'):
-        f = files.get(kind)
-        if f:
-            ApplicationFile.objects.create(application=app, kind=kind, file=f)
-            saved_any_file = True
-
-    # if files exist mark docs_verified
-    if saved_any_file:
-        app.status = 'docs_verified'
-        app.save()
+    # Fee comes from the server-side fee table (fees.py); a fee_amount sent
+    # by the browser is ignored.
+    fee_amount = fee_table().application_fee(department, program)
+    if fee_amount is None:
+        messages.error(request, 'Selected program does not exist.')
+        return redirect(reverse('admission:admission_online'))
+
+    # create the application, its files and its 'created' event in one transaction
+    with events.atomic():
+        app = Application.objects.create(
+            full_name=full_name,
+            email=email,
+            phone=phone,
+            guardian=data.get('guardian', '').strip(),
+            address=data.get('address', '').strip(),
+            education=data.get('education', '').strip(),
+            exam_roll=data.get('exam_roll', '').strip(),
+            department=department,
+            program=program,
+            fee_amount=fee_amount,
+            status='submitted',
+        )
+        events.record(app, 'created', new_status=app.status, actor=request.user, source='apply')
+
+        # handle uploaded files (if any): posted with the form, or uploaded
+        # beforehand to a signed URL and referenced by its <kind>_upload token.
+        # The application stays 'submitted' until the verify_documents command
+        # has checked them.
+        for kind in ('photo', 'sign', 'transcript'):
+            f = files.get(kind)
+            token = data.get(f'{kind}_upload', '').strip()
+            if f:
+                ApplicationFile.objects.create(application=app, kind=kind, file=f)
+            elif token:
+                try:
+                    attach_upload(app, kind, token)
+                except UploadError as exc:
+                    messages.warning(request, f'{kind} was not attached: {exc}')
 
     messages.success(request, f'Application submitted successfully (ID: {str(app.id)[:10]}).')
     # redirect back to apply page (or to a thank-you page if you create one)
@@ -124,6 +151,122 @@ def application_create(request):
 
 
 
+@require_http_methods(["POST"])
+def upload_sign(request):
+    """
+    Signed upload URL for one document, so the file goes to storage
+    instead of through application_create.  POST: kind, filename, size, content_type.
+    """
+    try:
+        upload = sign_upload(request.POST.get('kind', ''), request.POST.get('filename', ''),
+                             int(request.POST.get('size') or 0), request.POST.get('content_type', ''))
+    except ValueError:
+        return JsonResponse({'error': 'size must be a number.'}, status=400)
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    return JsonResponse(upload)
+
+
+@csrf_exempt  # the signed URL is the credential
+@require_http_methods(["PUT"])
+def upload_put(request, token):
+    """
+    Receiver for LocalObjectStore's signed URLs when the site is not served
+    through asgi.py (runserver, WSGI); asgi.py answers these PUTs before Django.
+    """
+    chunk = upload_config()['CHUNK']
+    try:
+        receiver = storage.receiver(token, content_length(request.META.get('CONTENT_LENGTH')))
+        try:
+            for data in iter(lambda: request.read(chunk), b''):
+                receiver.write(data)
+        except OSError:  # the client went away: give the URL back for a retry
+            receiver.abort()
+            raise
+        result = receiver.finish()
+    except UploadError as exc:
+        return HttpResponse(str(exc), status=exc.status, content_type='text/plain')
+    return HttpResponse(result['sha256'], content_type='text/plain')
+
+
+@require_http_methods(["POST"])
+def upload_confirm(request, pk):
+    """
+    Attach an uploaded document to an existing application.
+    POST: kind, upload (the token from upload_sign).
+    """
+    app = get_object_or_404(Application, pk=pk)
+    try:
+        app_file = attach_upload(app, request.POST.get('kind', ''), request.POST.get('upload', ''))
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    return JsonResponse({'kind': app_file.kind, 'name': app_file.file.name, 'size': app_file.file.size}, status=201)
+
+
+def _quote_etag(request):
+    return f'"{fee_table().version}:{request.GET.urlencode()}"'
+
+
+@require_http_methods(["GET"])
+@condition(etag_func=_quote_etag)
+def fee_quote(request):
+    """
+    JSON fee quote for the apply page, from the server-side fee table.
+    Query: program, department (code), gpa, waiver (repeatable).
+    """
+    try:
+        gpa = float(request.GET['gpa']) if request.GET.get('gpa') else None
+    except ValueError:
+        return JsonResponse({'error': 'gpa must be a number.'}, status=400)
+    try:
+        quote = fee_table().quote(request.GET.get('department'), request.GET.get('program', 'bachelors'),
+                                  gpa, request.GET.getlist('waiver'))
+    except FeeError as exc:
+        return JsonResponse({'error': str(exc)}, status=404)
+    response = JsonResponse(quote)
+    patch_cache_control(response, public=True, max_age=fee_config()['QUOTE_MAX_AGE'])
+    return response
+
+
+async def seat_availability(request):
+    """
+    JSON seats left per department code, from the in-memory seat snapshot.
+    Browsers revalidate with the snapshot version as ETag.
+    """
+    snapshot = await seats.acurrent()
+    etag = f'"{snapshot["version"]}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(snapshot)
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+async def seat_stream(request):
+    """
+    Server-sent events with the seat snapshot whenever it changes.
+    Under WSGI a worker cannot hold the connection, so one event is sent and
+    the browser reconnects after the retry delay.
+    """
+    if isinstance(request, ASGIRequest):
+        events = seats.hub().stream(request.headers.get('Last-Event-ID'))
+    else:
+        events = [f'retry: {seats.config()["RETRY"]}\n\n'.encode(), seats.encode(await seats.acurrent())]
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+    return response
+
+
+def waiting_room(request):
+    """
+    Queue page shown while submissions are being throttled.
+    Template: templates/admission/waiting_room.html
+    """
+    return waiting_room_response(request)
+
+
 def staff_required(view_func):
     """Shortcut decorator to require is_staff."""
     return user_passes_test(lambda u: u.is_active and u.is_staff, login_url='/admin/login/')(view_func)
@@ -133,38 +276,97 @@ def staff_required(view_func):
 @require_http_methods(["POST"])
 def accept_applicant(request, pk):
    
-    app = get_object_or_404(Application, pk=pk)
+    app = get_object_or_404(Application.objects.select_related('department'), pk=pk)
     dept = app.department
-    if dept.seats <= 0:
+    accepted, refused = seats.allocate_seats([app], actor=request.user)
+    if refused:
         messages.error(request, f'No seats left in {dept.code}.')
         return redirect(request.META.get('HTTP_REFERER', reverse('admin:index')))
+    if not accepted:
+        messages.info(request, f'Application {app.id} was already accepted.')
+        return redirect(request.META.get('HTTP_REFERER', reverse('admin:index')))
 
-    app.status = 'accepted'
-    app.save()
-    dept.seats = dept.seats - 1
-    dept.save()
+    dept.refresh_from_db(fields=['seats'])
     messages.success(request, f'Application {app.id} accepted; seats left: {dept.seats}')
     return redirect(request.META.get('HTTP_REFERER', reverse('admin:index')))
 
 
+@staff_required
+@require_http_methods(["GET"])
+def admission_report(request):
+    """
+    Registrar's report for ?start=&end= (YYYY-MM-DD, default the last seven
+    days) as ?format=html (default), csv or json.
+    Template: templates/admission/report.html
+    """
+    start, end = default_range()
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else start
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else end
+    except ValueError:
+        return HttpResponse('start and end must be YYYY-MM-DD dates.', status=400, content_type='text/plain')
+    if start > end:
+        return HttpResponse('start must not be after end.', status=400, content_type='text/plain')
+    report = build_report(start, end)
+    fmt = request.GET.get('format', 'html')
+    if fmt == 'json':
+        return JsonResponse(report)
+    if fmt == 'csv':
+        response = HttpResponse(report_csv(report), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="admission-report-{start}-{end}.csv"'
+        return response
+    return HttpResponse(report_html(report, request))
+
+
+@staff_required
+@require_http_methods(["GET"])
+def profile_list(request):
+    """
+    Stored request profiles, newest first (see profiling.py).
+    Template: templates/admission/profiles.html
+    """
+    profiles = [p for p in map(profiling.load, profiling.profile_ids()) if p is not None]
+    return render(request, 'admission/profiles.html', {'profiles': profiles})
+
+
+@staff_required
+@require_http_methods(["GET"])
+def profile_detail(request, profile_id):
+    """One profile's record as JSON, or with ?download its pstats / folded-stacks file."""
+    profile = profiling.load(profile_id)
+    if profile is None:
+        raise Http404('No such profile.')
+    if 'download' in request.GET:
+        filename = profile['id'] + profiling.ARTIFACTS[profile['mode']]
+        try:
+            artifact = open(profiling.artifact_path(profile), 'rb')
+        except FileNotFoundError:  # pruned past KEEP since the record was read
+            raise Http404('No such profile.')
+        return FileResponse(artifact, as_attachment=True, filename=filename,
+                            content_type='application/octet-stream')
+    return JsonResponse(profile)
+
+
 @staff_required
 @require_http_methods(["POST"])
 def reject_applicant(request, pk):
     app = get_object_or_404(Application, pk=pk)
-    app.status = 'rejected'
-    app.save()
+    with events.atomic():
+        events.status_changed(app, 'rejected', request.user, 'staff')
+        app.save(update_fields=['status'])
     messages.success(request, f'Application {app.id} rejected.')
     return redirect(request.META.get('HTTP_REFERER', reverse('admin:index')))
 
 
 
 
-def application_detail(request, pk):
+@replica_reads()
+async def application_detail(request, pk):
    
-    app = get_object_or_404(Application, pk=pk)
+    app = await aget_object_or_404(Application.objects.select_related('department'), pk=pk)
     # If you created a template:
     try:
-        return render(request, 'admission/application_detail.html', {'application': app})
+        return await arender(request, 'admission/application_detail.html', {'application': app})
     except Exception:
         # fallback: simple HttpResponse with basic info
         content = f'Application: {app.full_name} ({str(app.id)}) - Status: {app.status}'
@@ -1,8 +1,14 @@
 import re
+import atexit
+import bisect
 import datetime
 
-CONTACT_DB = []
+from contact_index import TrigramIndex, PrefixTrie
+from contact_journal import ContactJournal
+from contact_events import EventLog, format_event
+
 CONTACT_ID_COUNTER = 1
+JOURNAL = None
 
 class AdmissionContact:
     def __init__(self, name, email, phone, message):
@@ -15,6 +21,14 @@ class AdmissionContact:
         self.message = message
         self.timestamp = datetime.datetime.now()
 
+    @classmethod
+    def restore(cls, row):
+        """Rebuild a persisted contact without consuming a new id."""
+        c = cls.__new__(cls)
+        c.id, c.name, c.email, c.phone, c.message, ts = row
+        c.timestamp = datetime.datetime.fromtimestamp(ts)
+        return c
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -25,6 +39,244 @@ class AdmissionContact:
             "timestamp": str(self.timestamp)
         }
 
+class ContactStore:
+    """In-memory contact store with primary and secondary indexes.
+
+    Contacts are kept in an insertion-ordered id map, so id lookups and
+    deletes are O(1), and in a positional list for lookups by index.
+    Emails map to the ids using them and a (timestamp, id) list kept sorted
+    for binary search answers date queries in O(log n + k).  Names and
+    messages are covered by trigram indexes, emails and phones by prefix
+    tries; all of them are maintained on add, update and remove.
+
+    A remove leaves a hole in the positional list and a stale key in the
+    date list instead of shifting them; both are compacted once half of
+    their entries are dead, so removes stay O(1) amortised.  The holes'
+    positions are kept sorted: an index lookup is O(1) without holes and a
+    binary search over them otherwise, never a compaction.
+    """
+    def __init__(self):
+        self.by_id = {}
+        self.by_email = {}
+        self.by_date = []
+        self.stale_dates = set()
+        self.order = []
+        self.slot = {}
+        self.holes = []
+        self.email_trie = PrefixTrie()
+        self.phone_trie = PrefixTrie()
+        self.name_grams = TrigramIndex()
+        self.message_grams = TrigramIndex()
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __reversed__(self):
+        return reversed(self.by_id.values())
+
+    def _link(self, index, key, cid):
+        index.setdefault(key, {})[cid] = None
+
+    def _unlink(self, index, key, cid):
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.pop(cid, None)
+        if not ids:
+            del index[key]
+
+    def add(self, contact):
+        cid = contact.id
+        self.by_id[cid] = contact
+        self._link(self.by_email, contact.email, cid)
+        self.email_trie.add(contact.email, cid)
+        self.phone_trie.add(contact.phone, cid)
+        self.name_grams.add(cid, contact.name)
+        self.message_grams.add(cid, contact.message)
+        self.slot[cid] = len(self.order)
+        self.order.append(contact)
+        key = (contact.timestamp, cid)
+        if key in self.stale_dates:
+            self.stale_dates.discard(key)
+        elif not self.by_date or self.by_date[-1] < key:
+            self.by_date.append(key)
+        else:
+            bisect.insort(self.by_date, key)
+        return contact
+
+    def get(self, cid):
+        return self.by_id.get(cid)
+
+    def remove(self, cid):
+        contact = self.by_id.pop(cid, None)
+        if contact is None:
+            return None
+        self._unlink(self.by_email, contact.email, cid)
+        self.email_trie.remove(contact.email, cid)
+        self.phone_trie.remove(contact.phone, cid)
+        self.name_grams.remove(cid, contact.name)
+        self.message_grams.remove(cid, contact.message)
+        pos = self.slot.pop(cid)
+        self.order[pos] = None
+        if not self.holes or self.holes[-1] < pos:
+            self.holes.append(pos)
+        else:
+            bisect.insort(self.holes, pos)
+        if len(self.holes) > len(self.by_id):
+            self._compact_order()
+        self.stale_dates.add((contact.timestamp, cid))
+        if 2 * len(self.stale_dates) > len(self.by_date):
+            self.by_date = [key for key in self.by_date if key not in self.stale_dates]
+            self.stale_dates.clear()
+        return contact
+
+    def _compact_order(self):
+        self.order = list(self.by_id.values())
+        self.slot = {c.id: i for i, c in enumerate(self.order)}
+        self.holes = []
+
+    def update(self, cid, **fields):
+        contact = self.by_id.get(cid)
+        if contact is None:
+            return None
+        email = fields.get("email")
+        if email is not None and email != contact.email:
+            self._unlink(self.by_email, contact.email, cid)
+            self._link(self.by_email, email, cid)
+            self.email_trie.remove(contact.email, cid)
+            self.email_trie.add(email, cid)
+        phone = fields.get("phone")
+        if phone is not None and phone != contact.phone:
+            self.phone_trie.remove(contact.phone, cid)
+            self.phone_trie.add(phone, cid)
+        name = fields.get("name")
+        if name is not None and name != contact.name:
+            self.name_grams.remove(cid, contact.name)
+            self.name_grams.add(cid, name)
+        message = fields.get("message")
+        if message is not None and message != contact.message:
+            self.message_grams.remove(cid, contact.message)
+            self.message_grams.add(cid, message)
+        for attr, value in fields.items():
+            if value is not None:
+                setattr(contact, attr, value)
+        return contact
+
+    def clear(self):
+        self.by_id.clear()
+        self.by_email.clear()
+        self.by_date.clear()
+        self.stale_dates.clear()
+        self.order.clear()
+        self.slot.clear()
+        self.holes.clear()
+        self.email_trie.clear()
+        self.phone_trie.clear()
+        self.name_grams.clear()
+        self.message_grams.clear()
+
+    def with_email(self, email):
+        return [self.by_id[cid] for cid in self.by_email.get(email, ())]
+
+    def has_email(self, email):
+        return email in self.by_email
+
+    def with_phone_prefix(self, prefix):
+        return [self.by_id[cid] for cid in sorted(self.phone_trie.prefix(prefix))]
+
+    def with_email_prefix(self, prefix):
+        return [self.by_id[cid] for cid in sorted(self.email_trie.prefix(prefix))]
+
+    def _search(self, grams, attr, keyword):
+        keyword = keyword.lower()
+        ids = grams.candidates(keyword)
+        if ids is None:
+            return [c for c in self if keyword in getattr(c, attr).lower()]
+        hits = (self.by_id[cid] for cid in sorted(ids))
+        return [c for c in hits if keyword in getattr(c, attr).lower()]
+
+    def search_name(self, keyword):
+        return self._search(self.name_grams, "name", keyword)
+
+    def search_message(self, keyword):
+        return self._search(self.message_grams, "message", keyword)
+
+    def between(self, start, end):
+        """Contacts with start <= timestamp < end, oldest first."""
+        lo = bisect.bisect_left(self.by_date, (start,))
+        hi = bisect.bisect_left(self.by_date, (end,))
+        keys = self.by_date[lo:hi]
+        if self.stale_dates:
+            keys = [key for key in keys if key not in self.stale_dates]
+        return [self.by_id[cid] for _, cid in keys]
+
+    def by_timestamp(self):
+        """All contacts, oldest first."""
+        return [self.by_id[cid] for ts, cid in self.by_date if (ts, cid) not in self.stale_dates]
+
+    def on_dates(self, start, end):
+        """Contacts whose timestamp falls on a day in [start, end]."""
+        lo = datetime.datetime.combine(start, datetime.time.min)
+        hi = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min)
+        return self.between(lo, hi)
+
+    def by_index(self, i):
+        if i < 0 or i >= len(self.by_id):
+            return None
+        holes = self.holes
+        # The i-th live contact sits at i + j, j being the number of holes
+        # before it: the first j with holes[j] - j > i (non-decreasing in j).
+        lo, hi = 0, len(holes)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if holes[mid] - mid <= i:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.order[i + lo]
+
+    def recent(self, n):
+        if n <= 0:
+            return []
+        out = []
+        for c in reversed(self.by_id.values()):
+            if len(out) == n:
+                break
+            out.append(c)
+        out.reverse()
+        return out
+
+CONTACT_DB = ContactStore()
+
+def open_contact_db(directory, **options):
+    """Load contacts persisted under directory and journal later changes."""
+    global JOURNAL, CONTACT_ID_COUNTER
+    close_contact_db()
+    JOURNAL = ContactJournal(directory, **options)
+    atexit.register(close_contact_db)
+    CONTACT_ID_COUNTER = max(CONTACT_ID_COUNTER, JOURNAL.load(CONTACT_DB, AdmissionContact.restore))
+    return len(CONTACT_DB)
+
+def close_contact_db():
+    global JOURNAL
+    atexit.unregister(close_contact_db)
+    if JOURNAL is not None:
+        JOURNAL.close()
+        JOURNAL = None
+
+def _check_writable():
+    """Raise ReadOnlyJournal before a change the journal could not record."""
+    if JOURNAL is not None:
+        JOURNAL.check_writable()
+
+def _journal(method, *args):
+    if JOURNAL is not None:
+        getattr(JOURNAL, method)(*args)
+        JOURNAL.maybe_snapshot(CONTACT_DB)
+
 def is_valid_email(email):
     return re.match(r"[^@]+@[^@]+\.[^@]+", email) is not None
 
@@ -46,66 +298,70 @@ def create_contact(name, email, phone, message):
         return {"error": "Invalid phone number"}
     if not is_valid_message(message):
         return {"error": "Message too short"}
+    _check_writable()
     contact = AdmissionContact(name, email, phone, message)
-    CONTACT_DB.append(contact)
-    log_event(f"New contact received (ID={contact.id})")
+    CONTACT_DB.add(contact)
+    _journal("record_create", contact)
+    log_event("New contact received (ID=%d)", contact.id)
     return {"success": True, "contact": contact.to_dict()}
 
 def get_contact(contact_id):
-    for c in CONTACT_DB:
-        if c.id == contact_id:
-            return c.to_dict()
-    return {"error": "Contact not found"}
+    c = CONTACT_DB.get(contact_id)
+    if c is None:
+        return {"error": "Contact not found"}
+    return c.to_dict()
 
 def get_all_contacts():
     return [c.to_dict() for c in CONTACT_DB]
 
 def search_by_name(keyword):
-    keyword = keyword.lower()
-    return [c.to_dict() for c in CONTACT_DB if keyword in c.name.lower()]
+    return [c.to_dict() for c in CONTACT_DB.search_name(keyword)]
 
 def search_by_email(email):
-    return [c.to_dict() for c in CONTACT_DB if c.email == email]
+    return [c.to_dict() for c in CONTACT_DB.with_email(email)]
 
 def filter_by_date(start, end):
-    results = []
-    for c in CONTACT_DB:
-        if start <= c.timestamp.date() <= end:
-            results.append(c.to_dict())
-    return results
+    return [c.to_dict() for c in CONTACT_DB.on_dates(start, end)]
+
+LOG_CAPACITY = 10_000
+LOGS = EventLog(LOG_CAPACITY)
 
-LOGS = []
+def log_event(msg, *args):
+    LOGS.record(msg, args)
 
-def log_event(msg):
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    LOGS.append(f"[{timestamp}] {msg}")
+def get_logs(offset=0, limit=None):
+    """Formatted events still in the ring buffer (the last LOG_CAPACITY), oldest first."""
+    return [format_event(e) for e in LOGS.events(offset, limit)]
 
-def get_logs():
-    return LOGS
+def start_log_writer(path, **options):
+    """Also write events to path from a background thread, rotating by size."""
+    return LOGS.start_writer(path, **options)
+
+def stop_log_writer():
+    LOGS.stop_writer()
 
 def delete_contact(cid):
-    global CONTACT_DB
-    new_db = [c for c in CONTACT_DB if c.id != cid]
-    if len(new_db) == len(CONTACT_DB):
+    _check_writable()
+    if CONTACT_DB.remove(cid) is None:
         return {"error": "ID not found"}
-    CONTACT_DB = new_db
-    log_event(f"Contact ID {cid} deleted")
+    _journal("record_delete", cid)
+    log_event("Contact ID %d deleted", cid)
     return {"success": True}
 
 def update_contact(cid, name=None, email=None, phone=None, message=None):
-    for c in CONTACT_DB:
-        if c.id == cid:
-            if name and is_valid_name(name):
-                c.name = name
-            if email and is_valid_email(email):
-                c.email = email
-            if phone and is_valid_phone(phone):
-                c.phone = phone
-            if message and is_valid_message(message):
-                c.message = message
-            log_event(f"Contact ID {cid} updated")
-            return {"success": True, "contact": c.to_dict()}
-    return {"error": "Contact not found"}
+    fields = {
+        "name": name if name and is_valid_name(name) else None,
+        "email": email if email and is_valid_email(email) else None,
+        "phone": phone if phone and is_valid_phone(phone) else None,
+        "message": message if message and is_valid_message(message) else None,
+    }
+    _check_writable()
+    c = CONTACT_DB.update(cid, **fields)
+    if c is None:
+        return {"error": "Contact not found"}
+    _journal("record_update", cid, fields)
+    log_event("Contact ID %d updated", cid)
+    return {"success": True, "contact": c.to_dict()}
 
 def seed_dummy_contacts():
     create_contact("Mahmud Alam", "mahmud@gmail.com", "01710000000", "Admission query")
@@ -121,17 +377,15 @@ def count_contacts():
     return len(CONTACT_DB)
 
 def contact_exists(email):
-    for c in CONTACT_DB:
-        if c.email == email:
-            return True
-    return False
+    return CONTACT_DB.has_email(email)
 
 def get_recent_contacts(n):
-    return [c.to_dict() for c in CONTACT_DB[-n:]]
+    return [c.to_dict() for c in CONTACT_DB.recent(n)]
 
 def clear_contacts():
-    global CONTACT_DB
-    CONTACT_DB = []
+    _check_writable()
+    CONTACT_DB.clear()
+    _journal("record_clear")
     return True
 
 def get_contact_ids():
@@ -151,14 +405,12 @@ def shortest_message():
     return min(CONTACT_DB, key=lambda x: len(x.message)).to_dict()
 
 def first_contact():
-    if CONTACT_DB:
-        return CONTACT_DB[0].to_dict()
-    return None
+    c = CONTACT_DB.by_index(0)
+    return c.to_dict() if c else None
 
 def last_contact():
-    if CONTACT_DB:
-        return CONTACT_DB[-1].to_dict()
-    return None
+    c = CONTACT_DB.by_index(len(CONTACT_DB) - 1)
+    return c.to_dict() if c else None
 
 def list_names():
     return [c.name for c in CONTACT_DB]
@@ -170,14 +422,14 @@ def list_phones():
     return [c.phone for c in CONTACT_DB]
 
 def search_message(keyword):
-    keyword = keyword.lower()
-    return [c.to_dict() for c in CONTACT_DB if keyword in c.message.lower()]
+    return [c.to_dict() for c in CONTACT_DB.search_message(keyword)]
 
 def contacts_on_date(date):
-    return [c.to_dict() for c in CONTACT_DB if c.timestamp.date() == date]
+    return [c.to_dict() for c in CONTACT_DB.on_dates(date, date)]
 
 def total_logs():
-    return len(LOGS)
+    """Events logged since the last clear, including ones rotated out of the buffer."""
+    return LOGS.total
 
 def clear_logs():
     LOGS.clear()
@@ -189,9 +441,8 @@ def fake_bulk_generate(n):
     return True
 
 def get_contact_by_index(i):
-    if i < 0 or i >= len(CONTACT_DB):
-        return None
-    return CONTACT_DB[i].to_dict()
+    c = CONTACT_DB.by_index(i)
+    return c.to_dict() if c else None
 
 def reverse_contacts():
     return [c.to_dict() for c in reversed(CONTACT_DB)]
@@ -200,19 +451,19 @@ def sorted_by_name():
     return [c.to_dict() for c in sorted(CONTACT_DB, key=lambda x: x.name)]
 
 def sorted_by_date():
-    return [c.to_dict() for c in sorted(CONTACT_DB, key=lambda x: x.timestamp)]
+    return [c.to_dict() for c in CONTACT_DB.by_timestamp()]
 
 def messages_length_list():
     return [len(c.message) for c in CONTACT_DB]
 
 def emails_starting_with(letter):
-    return [c.to_dict() for c in CONTACT_DB if c.email.startswith(letter)]
+    return [c.to_dict() for c in CONTACT_DB.with_email_prefix(letter)]
 
 def phones_by_prefix(prefix):
-    return [c.to_dict() for c in CONTACT_DB if c.phone.startswith(prefix)]
+    return [c.to_dict() for c in CONTACT_DB.with_phone_prefix(prefix)]
 
 def all_data():
-    return {"contacts": get_all_contacts(), "logs": LOGS}
+    return {"contacts": get_all_contacts(), "logs": get_logs()}
 
 if __name__ == "__main__":
     seed_dummy_contacts()
@@ -1,3 +1,9 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from user_cache import UserCache
+
+
 class Role(Enum):
     STUDENT = "student"
     ADMIN = "admin"
@@ -78,13 +84,39 @@ class Application(db.Model):
 # Simple auth middleware (session-based)
 # ---------------------------------------------------------------------------
 
+USER_CACHE = UserCache(maxsize=4096, ttl=30.0)
+
+
+def _load_user(user_id):
+    user = db.session.get(User, user_id)
+    if user is not None:
+        db.session.expunge(user)
+    return user
+
+
 @app.before_request
 def load_logged_in_user():
     user_id = session.get("user_id")
     g.user = None
     if user_id is None:
         return
-    g.user = User.query.get(user_id)
+    cached = USER_CACHE.get_or_load(user_id, _load_user)
+    # merge(load=False) attaches a copy to this request's session without a query
+    g.user = db.session.merge(cached, load=False) if cached is not None else None
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_cached_user_stale(mapper, connection, target):
+    # Dropped only once the change commits: dropped at flush time, a concurrent
+    # request could reload the old row and cache it again for the whole TTL.
+    object_session(target).info.setdefault("stale_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_cached_users(session):
+    for user_id in session.info.pop("stale_users", ()):
+        USER_CACHE.invalidate(user_id)
 
 
 def login_user(user: User):
@@ -131,7 +163,10 @@ def api_register():
     if not validate_email(email):
         return jsonify({"error": "invalid email"}), 400
 
-    if User.query.filter((User.username == username) | (User.email == email)).first():
+    # two lookups on the unique indexes rather than one OR across both columns
+    taken = db.session.query(User.id).filter_by(username=username).first() or \
+        db.session.query(User.id).filter_by(email=email).first()
+    if taken:
         return jsonify({"error": "username or email already exists"}), 400
 
     user = User(
@@ -0,0 +1,190 @@
+"""Save and load simulated applicants (see simulate.py) in reloadable formats.
+
+* JSONL: one applicant dict per line, the same keys as Applicant.to_dict().
+* CSV: the same fields with a header row.
+* Columnar: the ApplicantTable arrays and indexes dumped back to back after
+  a small JSON header.  Loading maps the file and copies each column into
+  its array in one go, so nothing is parsed per row.
+
+Writers work straight from the table columns in chunks, caching the text of
+each name, department, score, date and status code instead of calling
+to_dict() per row.
+"""
+import csv
+import sys
+import json
+import mmap
+import datetime
+from array import array
+
+from simulate import AdmissionPortal, ApplicantTable, STATUSES, EPOCH
+
+FIELDS = ["applicant_id", "name", "department", "score", "application_date", "status"]
+COLUMNAR_MAGIC = b"UAPCOL1\n"
+CHUNK = 65_536
+BUFFER = 1 << 20
+
+
+def _text_columns(table, quote):
+    """Per-code text for each coded column, built once per write."""
+    names = [quote(n) for n in table.names]
+    depts = [quote(d) for d in table.departments]
+    statuses = [quote(s) for s in STATUSES]
+    scores = {}
+    dates = {}
+    for code in set(table.score):
+        scores[code] = repr(code / 100)
+    for days in set(table.date):
+        dates[days] = quote(str(EPOCH + datetime.timedelta(days=days)))
+    return names, depts, statuses, scores, dates
+
+
+def _rows(table, line, quote):
+    names, depts, statuses, scores, dates = _text_columns(table, quote)
+    prefix = table.prefix
+    for start in range(0, len(table), CHUNK):
+        stop = min(start + CHUNK, len(table))
+        yield "".join(
+            line(f"{prefix}{row + 1:07d}", names[n], depts[d], scores[sc], dates[dt], statuses[st])
+            for row, n, d, sc, dt, st in zip(
+                range(start, stop), table.name[start:stop], table.department[start:stop],
+                table.score[start:stop], table.date[start:stop], table.status[start:stop])
+        )
+
+
+# ---------- JSONL ------------------------------------------------------
+
+def write_jsonl(portal, path):
+    def line(aid, name, dept, score, date, status):
+        return (f'{{"applicant_id": "{aid}", "name": {name}, "department": {dept}, '
+                f'"score": {score}, "application_date": {date}, "status": {status}}}\n')
+    with open(path, "w", encoding="utf-8", buffering=BUFFER) as f:
+        for chunk in _rows(portal.table, line, json.dumps):
+            f.write(chunk)
+    return len(portal.table)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8", buffering=BUFFER) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# ---------- CSV --------------------------------------------------------
+
+def _csv_quote(value):
+    if any(c in value for c in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def write_csv(portal, path):
+    def line(*values):
+        return ",".join(values) + "\r\n"
+    with open(path, "w", encoding="utf-8", newline="", buffering=BUFFER) as f:
+        f.write(",".join(FIELDS) + "\r\n")
+        for chunk in _rows(portal.table, line, _csv_quote):
+            f.write(chunk)
+    return len(portal.table)
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="", buffering=BUFFER) as f:
+        for row in csv.DictReader(f):
+            row["score"] = float(row["score"])
+            yield row
+
+
+def load_rows(rows):
+    """Build a portal from applicant dicts as yielded by read_jsonl/read_csv."""
+    portal = AdmissionPortal()
+    table = portal.table
+    status_codes = {s: i for i, s in enumerate(STATUSES)}
+    for r in rows:
+        table.append(r["name"], r["department"], r["score"],
+                     datetime.date.fromisoformat(r["application_date"]), status_codes[r["status"]])
+    return portal
+
+
+def load_jsonl(path):
+    return load_rows(read_jsonl(path))
+
+
+def load_csv(path):
+    return load_rows(read_csv(path))
+
+
+# ---------- Columnar ---------------------------------------------------
+
+def _columns(table):
+    cols = [("name", table.name), ("department", table.department), ("score", table.score),
+            ("date", table.date), ("status", table.status), ("status_pos", table.status_pos)]
+    cols += [(f"status_rows:{i}", rows) for i, rows in enumerate(table.status_rows)]
+    cols += [(f"department_rows:{code}", rows) for code, rows in table.department_rows.items()]
+    return cols
+
+
+def write_columnar(portal, path):
+    table = portal.table
+    header = {
+        "byteorder": sys.byteorder,
+        "prefix": table.prefix,
+        "names": table.names,
+        "departments": table.departments,
+        "columns": [],
+    }
+    offset = 0
+    for name, col in _columns(table):
+        nbytes = col.itemsize * len(col)
+        header["columns"].append([name, col.typecode, offset, nbytes])
+        offset += nbytes + (-nbytes % 8)
+    meta = json.dumps(header).encode()
+    meta += b" " * (-(len(COLUMNAR_MAGIC) + 8 + len(meta)) % 8)
+    with open(path, "wb", buffering=BUFFER) as f:
+        f.write(COLUMNAR_MAGIC)
+        f.write(len(meta).to_bytes(8, "little"))
+        f.write(meta)
+        for _, col in _columns(table):
+            f.write(col.tobytes())
+            f.write(b"\0" * (-(col.itemsize * len(col)) % 8))
+    return len(table)
+
+
+def load_columnar(path):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[:len(COLUMNAR_MAGIC)] != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar applicant file")
+        pos = len(COLUMNAR_MAGIC)
+        meta_len = int.from_bytes(mm[pos:pos + 8], "little")
+        header = json.loads(mm[pos + 8:pos + 8 + meta_len])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+        base = pos + 8 + meta_len
+        table = ApplicantTable(header["prefix"])
+        table.names = header["names"]
+        table.name_codes = {n: i for i, n in enumerate(table.names)}
+        table.departments = header["departments"]
+        table.department_codes = {d: i for i, d in enumerate(table.departments)}
+        table.department_rows = {}
+        view = memoryview(mm)
+        try:
+            for name, typecode, offset, nbytes in header["columns"]:
+                col = array(typecode)
+                col.frombytes(view[base + offset:base + offset + nbytes])
+                if name.startswith("status_rows:"):
+                    table.status_rows[int(name.split(":")[1])] = col
+                elif name.startswith("department_rows:"):
+                    table.department_rows[int(name.split(":")[1])] = col
+                else:
+                    setattr(table, name, col)
+        finally:
+            view.release()
+    return AdmissionPortal(table)
+
+
+FORMATS = {
+    "jsonl": (write_jsonl, load_jsonl),
+    "csv": (write_csv, load_csv),
+    "columnar": (write_columnar, load_columnar),
+}
@@ -0,0 +1,113 @@
+"""Bounded event log for admissionContact.
+
+Events are stored as (unix_seconds, template, args) tuples in a fixed-size
+ring buffer, so recording one costs an int timestamp and a list store; the
+"[YYYY-mm-dd HH:MM:SS] message" text is only built when someone reads the
+log.  An optional background thread drains new events to a size-rotated
+file in batches.
+"""
+import os
+import time
+import atexit
+import itertools
+import threading
+from collections import deque
+
+
+def format_event(event):
+    ts, template, args = event
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+    return f"[{stamp}] {template % args if args else template}"
+
+
+class EventLog:
+    def __init__(self, capacity=10_000):
+        self.capacity = capacity
+        self.writer = None
+        self.clear()
+
+    def clear(self):
+        self.buffer = [None] * self.capacity
+        self.total = 0
+        self._seq = itertools.count()
+
+    def record(self, template, args=()):
+        event = (int(time.time()), template, args)
+        i = next(self._seq)
+        self.buffer[i % self.capacity] = event
+        self.total = i + 1
+        if self.writer is not None:
+            self.writer.pending.append(event)
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def events(self, offset=0, limit=None):
+        """Retained events oldest first, skipping offset and returning at most limit."""
+        total = self.total
+        first = total - min(total, self.capacity) + max(offset, 0)
+        last = total if limit is None else min(total, first + limit)
+        return [self.buffer[i % self.capacity] for i in range(first, last)]
+
+    def start_writer(self, path, **options):
+        self.stop_writer()
+        self.writer = EventWriter(path, **options)
+        self.writer.start()
+        atexit.register(self.stop_writer)
+        return self.writer
+
+    def stop_writer(self):
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            atexit.unregister(self.stop_writer)
+            writer.stop()
+
+
+class EventWriter(threading.Thread):
+    """Daemon thread appending formatted events to path, rotating at max_bytes.
+
+    At most max_pending events wait for the thread; if it falls behind the
+    oldest are dropped rather than growing without bound.
+    """
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=5, interval=0.5, max_pending=100_000):
+        super().__init__(name="contact-event-writer", daemon=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.interval = interval
+        self.pending = deque(maxlen=max_pending)
+        self.written = 0
+        self._stopping = threading.Event()
+
+    def run(self):
+        while not self._stopping.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+    def flush(self):
+        batch = []
+        pending = self.pending
+        while pending:
+            batch.append(pending.popleft())
+        if not batch:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(format_event(e) + "\n" for e in batch))
+            size = f.tell()
+        self.written += len(batch)
+        if size >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
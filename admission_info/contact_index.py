@@ -0,0 +1,148 @@
+"""Text and prefix indexes used by admissionContact.ContactStore."""
+
+
+class TrigramIndex:
+    """Inverted index from lowercase 3-character substrings to contact ids.
+
+    A keyword of three or more characters can only occur in texts that
+    contain every one of its trigrams, so intersecting those posting sets
+    (smallest first) yields a small candidate set that the caller confirms
+    with a plain substring check.
+    """
+    def __init__(self):
+        self.postings = {}
+
+    @staticmethod
+    def grams(text):
+        text = text.lower()
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, cid, text):
+        postings = self.postings
+        for g in self.grams(text):
+            ids = postings.get(g)
+            if ids is None:
+                postings[g] = {cid}
+            else:
+                ids.add(cid)
+
+    def remove(self, cid, text):
+        postings = self.postings
+        for g in self.grams(text):
+            ids = postings.get(g)
+            if ids is None:
+                continue
+            ids.discard(cid)
+            if not ids:
+                del postings[g]
+
+    def candidates(self, keyword):
+        """Ids that may contain keyword, or None if it is too short to index."""
+        grams = self.grams(keyword)
+        if not grams:
+            return None
+        lists = []
+        for g in grams:
+            ids = self.postings.get(g)
+            if ids is None:
+                return set()
+            lists.append(ids)
+        lists.sort(key=len)
+        return lists[0].intersection(*lists[1:])
+
+    def clear(self):
+        self.postings.clear()
+
+
+class _TrieNode:
+    __slots__ = ("children", "bucket")
+
+    def __init__(self):
+        self.children = None
+        self.bucket = {}
+
+
+class PrefixTrie:
+    """Burst trie mapping string keys to the ids that use them.
+
+    Leaves hold up to BURST distinct keys in a dict and split into one child
+    per next character once they grow past it, so a prefix query walks at
+    most len(prefix) nodes before collecting the matching subtree.  Keeping
+    small leaves as buckets avoids a node per character, which matters at
+    a million emails.
+    """
+    BURST = 64
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, key, cid):
+        node = self.root
+        depth = 0
+        while node.children is not None and depth < len(key):
+            child = node.children.get(key[depth])
+            if child is None:
+                child = node.children[key[depth]] = _TrieNode()
+            node = child
+            depth += 1
+        ids = node.bucket.get(key)
+        if ids is None:
+            node.bucket[key] = {cid: None}
+            if node.children is None and len(node.bucket) > self.BURST:
+                self._burst(node, depth)
+        else:
+            ids[cid] = None
+
+    def _burst(self, node, depth):
+        old = node.bucket
+        node.bucket = {}
+        node.children = {}
+        for key, ids in old.items():
+            if len(key) == depth:
+                node.bucket[key] = ids
+            else:
+                child = node.children.get(key[depth])
+                if child is None:
+                    child = node.children[key[depth]] = _TrieNode()
+                child.bucket[key] = ids
+        for child in node.children.values():
+            if len(child.bucket) > self.BURST:
+                self._burst(child, depth + 1)
+
+    def remove(self, key, cid):
+        node = self.root
+        depth = 0
+        while node.children is not None and depth < len(key):
+            node = node.children.get(key[depth])
+            if node is None:
+                return
+            depth += 1
+        ids = node.bucket.get(key)
+        if ids is None:
+            return
+        ids.pop(cid, None)
+        if not ids:
+            del node.bucket[key]
+
+    def prefix(self, prefix):
+        """Ids of every key starting with prefix, in no particular order."""
+        node = self.root
+        depth = 0
+        while node.children is not None and depth < len(prefix):
+            node = node.children.get(prefix[depth])
+            if node is None:
+                return []
+            depth += 1
+        out = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, ids in node.bucket.items():
+                if key.startswith(prefix):
+                    out.extend(ids)
+            if node.children:
+                stack.extend(node.children.values())
+        return out
+
+    def clear(self):
+        self.root = _TrieNode()
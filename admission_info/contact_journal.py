@@ -0,0 +1,219 @@
+"""Durable storage for admissionContact: append-only log plus snapshots.
+
+Every create/update/delete/clear is appended to ``contacts.log`` as one JSON
+line tagged with a sequence number.  Writes are buffered and fsync'd in
+batches (every ``sync_every`` records or ``sync_interval`` seconds, whichever
+comes first); a flusher thread syncs records left pending when writes
+stop.  Every ``snapshot_every`` records the whole store is written to
+``contacts.snap`` (via a temp file + rename) and the log is truncated.  On
+startup the snapshot is read through a memory map and only log records with
+a higher sequence number are replayed, so a crash between the rename and the
+truncate is harmless.
+
+The journal has a single writer.  Other worker processes can open the same
+directory read-only and call ``catch_up`` to apply records written since;
+recording a change through a read-only journal raises ReadOnlyJournal.
+"""
+import os
+import json
+import mmap
+import time
+import threading
+
+LOG_NAME = "contacts.log"
+SNAPSHOT_NAME = "contacts.snap"
+
+
+class ReadOnlyJournal(RuntimeError):
+    """A change was recorded through a journal opened with readonly=True."""
+
+
+class ContactJournal:
+    def __init__(self, directory, sync_every=256, sync_interval=0.05, snapshot_every=100_000, readonly=False):
+        self.directory = directory
+        self.log_path = os.path.join(directory, LOG_NAME)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.readonly = readonly
+        self.seq = 0
+        self.next_id = 1
+        self.pending = 0
+        self.since_snapshot = 0
+        self.last_sync = time.monotonic()
+        self.read_offset = 0
+        self.snapshot_id = None
+        self.log = None
+        self.flusher = None
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    # ---------- recovery ----------
+
+    def load(self, store, restore):
+        """Fill store from snapshot + log tail; restore(row) builds a contact."""
+        store.clear()
+        self.seq = 0
+        self.next_id = 1
+        self.snapshot_id = self._snapshot_id()
+        if self.snapshot_id is not None:
+            with open(self.snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header = json.loads(mm.readline())
+                self.seq = header["seq"]
+                self.next_id = header["next_id"]
+                for line in iter(mm.readline, b""):
+                    store.add(restore(json.loads(line)))
+        self.read_offset = 0
+        self.since_snapshot = self.catch_up(store, restore)
+        if not self.readonly and self.log is None:
+            self.log = open(self.log_path, "ab")
+            self.flusher = JournalFlusher(self)
+            self.flusher.start()
+        return self.next_id
+
+    def catch_up(self, store, restore):
+        """Apply log records past the last one seen; returns how many."""
+        if self._snapshot_id() != self.snapshot_id:
+            # the writer compacted; the new snapshot covers what we missed
+            self.load(store, restore)
+            return len(store)
+        if not os.path.exists(self.log_path):
+            return 0
+        applied = 0
+        with open(self.log_path, "rb") as f:
+            f.seek(self.read_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                self.read_offset += len(line)
+                if rec[0] <= self.seq:
+                    continue
+                self._apply(store, restore, rec)
+                self.seq = rec[0]
+                applied += 1
+        if not self.readonly and os.path.getsize(self.log_path) > self.read_offset:
+            # drop a torn tail left by a crash mid-write
+            with open(self.log_path, "r+b") as f:
+                f.truncate(self.read_offset)
+        return applied
+
+    def _snapshot_id(self):
+        try:
+            st = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _apply(self, store, restore, rec):
+        op = rec[1]
+        if op == "c":
+            store.add(restore(rec[2:]))
+            self.next_id = max(self.next_id, rec[2] + 1)
+        elif op == "u":
+            store.update(rec[2], **rec[3])
+        elif op == "d":
+            store.remove(rec[2])
+        elif op == "x":
+            store.clear()
+
+    # ---------- writing ----------
+
+    def check_writable(self):
+        if self.readonly:
+            raise ReadOnlyJournal(f"contact journal in {self.directory} is open read-only")
+
+    def _append(self, rec):
+        self.check_writable()
+        with self._lock:
+            self.seq += 1
+            self.log.write(json.dumps([self.seq] + rec, separators=(",", ":")).encode() + b"\n")
+            self.pending += 1
+            self.since_snapshot += 1
+            if self.pending >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+                self.sync()
+
+    def record_create(self, contact):
+        self._append(["c", contact.id, contact.name, contact.email, contact.phone,
+                      contact.message, contact.timestamp.timestamp()])
+        self.next_id = max(self.next_id, contact.id + 1)
+
+    def record_update(self, cid, fields):
+        self._append(["u", cid, {k: v for k, v in fields.items() if v is not None}])
+
+    def record_delete(self, cid):
+        self._append(["d", cid])
+
+    def record_clear(self):
+        self._append(["x"])
+
+    def sync(self):
+        with self._lock:
+            if self.log is None or not self.pending:
+                return
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            self.pending = 0
+            self.last_sync = time.monotonic()
+
+    def maybe_snapshot(self, store):
+        if self.since_snapshot >= self.snapshot_every:
+            self.snapshot(store)
+
+    def snapshot(self, store):
+        """Write a compacted snapshot of store and truncate the log."""
+        with self._lock:
+            self.sync()
+            tmp = self.snapshot_path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(json.dumps({"seq": self.seq, "next_id": self.next_id}).encode() + b"\n")
+                f.writelines(
+                    json.dumps([c.id, c.name, c.email, c.phone, c.message, c.timestamp.timestamp()],
+                               separators=(",", ":")).encode() + b"\n"
+                    for c in store
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            self.snapshot_id = self._snapshot_id()
+            dir_fd = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            self.log.close()
+            self.log = open(self.log_path, "wb")
+            self.read_offset = 0
+            self.since_snapshot = 0
+
+    def close(self):
+        flusher, self.flusher = self.flusher, None
+        if flusher is not None:
+            flusher.stop()
+        with self._lock:
+            if self.log is not None:
+                self.sync()
+                self.log.close()
+                self.log = None
+
+
+class JournalFlusher(threading.Thread):
+    """Daemon thread syncing records a journal has left pending for sync_interval."""
+    def __init__(self, journal):
+        super().__init__(name="contact-journal-flusher", daemon=True)
+        self.journal = journal
+        self._stopping = threading.Event()
+
+    def run(self):
+        journal = self.journal
+        while not self._stopping.wait(journal.sync_interval):
+            if journal.pending and time.monotonic() - journal.last_sync >= journal.sync_interval:
+                journal.sync()
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
@@ -1,6 +1,8 @@
 import random
 import string
 import datetime
+from array import array
+from collections.abc import Mapping
 
 
 
@@ -32,21 +34,197 @@ def random_date():
 
 # ---------- Classes ----------------------------------------------------
 
+DEPARTMENTS = ["CSE", "EEE", "BBA", "English", "Law", "Civil", "Mechanical"]
+STATUSES = ["Pending", "Approved", "Rejected"]
+PENDING, APPROVED, REJECTED = range(3)
+EPOCH = datetime.date(1970, 1, 1)
+
+class ApplicantTable:
+    """Column store for applicants, one compact array per field.
+
+    A row costs about 10 bytes: name and department are codes into small
+    lookup lists, the score is kept in hundredths, the date as days since
+    1970 and the status as an index into STATUSES.  Applicant ids are derived
+    from the row number ("APP0000001" is row 0), so they never collide and
+    need no storage of their own.
+
+    Rows are also indexed by department (append-only row lists) and by
+    status (one row list per status plus each row's position in it, so a
+    status change is an O(1) swap-remove and append).  The length of a
+    status list is that status's running count.
+    """
+    def __init__(self, prefix="APP"):
+        self.prefix = prefix
+        self.names = []
+        self.name_codes = {}
+        self.departments = list(DEPARTMENTS)
+        self.department_codes = {d: i for i, d in enumerate(self.departments)}
+        self.name = array("I")
+        self.department = array("B")
+        self.score = array("H")
+        self.date = array("H")
+        self.status = array("B")
+        self.department_rows = {}
+        self.status_rows = [array("I") for _ in STATUSES]
+        self.status_pos = array("I")
+
+    def __len__(self):
+        return len(self.status)
+
+    def _code(self, values, codes, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def name_code(self, name):
+        return self._code(self.names, self.name_codes, name)
+
+    def department_code(self, dept):
+        return self._code(self.departments, self.department_codes, dept)
+
+    def append(self, name, dept, score, application_date, status=PENDING):
+        row = len(self.status)
+        code = self.department_code(dept)
+        self.name.append(self.name_code(name))
+        self.department.append(code)
+        self.score.append(round(score * 100))
+        self.date.append((application_date - EPOCH).days)
+        self.status.append(status)
+        self.department_rows.setdefault(code, array("I")).append(row)
+        self.status_pos.append(len(self.status_rows[status]))
+        self.status_rows[status].append(row)
+        return row
+
+    def set_status(self, row, status):
+        old = self.status[row]
+        if old == status:
+            return
+        rows = self.status_rows[old]
+        pos = self.status_pos[row]
+        last = rows.pop()
+        if last != row:
+            rows[pos] = last
+            self.status_pos[last] = pos
+        new = self.status_rows[status]
+        self.status_pos[row] = len(new)
+        new.append(row)
+        self.status[row] = status
+
+    def status_count(self, status):
+        return len(self.status_rows[status])
+
+    def rows_with_department(self, dept):
+        code = self.department_codes.get(dept)
+        if code is None:
+            return array("I")
+        return self.department_rows.get(code, array("I"))
+
+    def row_id(self, row):
+        return f"{self.prefix}{row + 1:07d}"
+
+    def row_for_id(self, applicant_id):
+        """Row number for an applicant id, or None if it is not in the table."""
+        if not isinstance(applicant_id, str) or not applicant_id.startswith(self.prefix):
+            return None
+        digits = applicant_id[len(self.prefix):]
+        if not digits.isdigit():
+            return None
+        row = int(digits) - 1
+        return row if 0 <= row < len(self.status) else None
+
+    def row(self, row):
+        return Applicant.view(self, row)
+
+    def generate(self, count, rng=None, chunk=100_000):
+        """Append count random applicants drawn from rng, chunk rows at a time."""
+        rng = rng or random
+        first = ["Rahim", "Karim", "Jamal", "Rafi", "Imran", "Sami", "Hasan", "Fahim"]
+        last = ["Ahmed", "Hossain", "Rahman", "Sheikh", "Mia", "Talukder", "Biswas"]
+        names = range(len(first) * len(last))
+        name_codes = [self.name_code(f + " " + l) for f in first for l in last]
+        depts = [self.department_code(d) for d in DEPARTMENTS]
+        scores = range(300, 501)
+        days = [(datetime.date(y, m, d) - EPOCH).days
+                for y in (2022, 2023, 2024) for m in range(1, 13) for d in range(1, 29)]
+        for code in depts:
+            self.department_rows.setdefault(code, array("I"))
+        pending = self.status_rows[PENDING]
+        while count > 0:
+            n = min(count, chunk)
+            base = len(self.status)
+            dept_chunk = rng.choices(depts, k=n)
+            self.name.extend(array("I", [name_codes[i] for i in rng.choices(names, k=n)]))
+            self.department.extend(array("B", dept_chunk))
+            self.score.extend(array("H", rng.choices(scores, k=n)))
+            self.date.extend(array("H", rng.choices(days, k=n)))
+            self.status.extend(bytes(n))
+            by_dept = {code: [] for code in depts}
+            for row, code in enumerate(dept_chunk, base):
+                by_dept[code].append(row)
+            for code, rows in by_dept.items():
+                self.department_rows[code].extend(array("I", rows))
+            self.status_pos.extend(array("I", range(len(pending), len(pending) + n)))
+            pending.extend(array("I", range(base, base + n)))
+            count -= n
+
 class Applicant:
-    """Applicant information class."""
+    """Applicant information class.
+
+    Instances are light views onto one row of an ApplicantTable.  Building
+    one directly, as Applicant(name, dept, score), gives it a private
+    one-row table; AdmissionPortal.add_applicant copies it into the portal's
+    table and re-points the view there.
+    """
+    __slots__ = ("table", "row")
+
     def __init__(self, name, dept, score):
-        self.applicant_id = random_id("APP")
-        self.name = name
-        self.department = dept
-        self.score = score
-        self.application_date = random_date()
-        self.status = "Pending"
+        self.table = ApplicantTable()
+        self.row = self.table.append(name, dept, score, random_date())
+
+    @classmethod
+    def view(cls, table, row):
+        view = cls.__new__(cls)
+        view.table = table
+        view.row = row
+        return view
+
+    @property
+    def applicant_id(self):
+        return self.table.row_id(self.row)
+
+    @property
+    def name(self):
+        return self.table.names[self.table.name[self.row]]
+
+    @property
+    def department(self):
+        return self.table.departments[self.table.department[self.row]]
+
+    @property
+    def score(self):
+        return self.table.score[self.row] / 100
+
+    @property
+    def application_date(self):
+        return EPOCH + datetime.timedelta(days=self.table.date[self.row])
+
+    @property
+    def status(self):
+        return STATUSES[self.table.status[self.row]]
 
     def approve(self):
-        self.status = "Approved"
+        self.table.set_status(self.row, APPROVED)
 
     def reject(self):
-        self.status = "Rejected"
+        self.table.set_status(self.row, REJECTED)
+
+    def __eq__(self, other):
+        return isinstance(other, Applicant) and self.table is other.table and self.row == other.row
+
+    def __hash__(self):
+        return hash((id(self.table), self.row))
 
     def to_dict(self):
         return {
@@ -58,16 +236,68 @@ class Applicant:
             "status": self.status
         }
 
+class ApplicantsView(Mapping):
+    """Read-only {applicant_id: Applicant} mapping over a table."""
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, applicant_id):
+        row = self.table.row_for_id(applicant_id)
+        if row is None:
+            raise KeyError(applicant_id)
+        return self.table.row(row)
+
+    def __iter__(self):
+        return (self.table.row_id(i) for i in range(len(self.table)))
+
+    def __len__(self):
+        return len(self.table)
+
+    def values(self):
+        table = self.table
+        return (Applicant.view(table, i) for i in range(len(table)))
+
+class ApplicantRows:
+    """Lazy result of a portal filter: len() is O(1), iterating yields
+    applicant dicts in insertion order without building a list first."""
+    def __init__(self, table, rows, ordered=True):
+        self.table = table
+        self.rows = rows
+        self.ordered = ordered
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return len(self.rows) > 0
+
+    def applicants(self):
+        table, rows = self.table, self.rows
+        if not self.ordered:
+            rows = sorted(rows)
+        return (Applicant.view(table, rows[i]) for i in range(len(rows)))
+
+    def __iter__(self):
+        return (a.to_dict() for a in self.applicants())
+
 class AdmissionPortal:
     """Main portal system maintaining applicants."""
-    def __init__(self):
-        self.applicants = {}
+    def __init__(self, table=None):
+        self.table = table if table is not None else ApplicantTable()
+        self.applicants = ApplicantsView(self.table)
 
     def add_applicant(self, applicant):
-        self.applicants[applicant.applicant_id] = applicant
+        if applicant.table is self.table:
+            return
+        src, i = applicant.table, applicant.row
+        applicant.row = self.table.append(
+            src.names[src.name[i]], src.departments[src.department[i]],
+            src.score[i] / 100, EPOCH + datetime.timedelta(days=src.date[i]), src.status[i])
+        applicant.table = self.table
 
     def get_applicant(self, applicant_id):
-        return self.applicants.get(applicant_id, None)
+        row = self.table.row_for_id(applicant_id)
+        return None if row is None else self.table.row(row)
 
     def approve_applicant(self, applicant_id):
         app = self.get_applicant(applicant_id)
@@ -87,21 +317,22 @@ class AdmissionPortal:
         return [a.to_dict() for a in self.applicants.values()]
 
     def filter_by_department(self, dept):
-        return [a.to_dict() for a in self.applicants.values() if a.department == dept]
+        return ApplicantRows(self.table, self.table.rows_with_department(dept))
 
     def filter_by_status(self, status):
-        return [a.to_dict() for a in self.applicants.values() if a.status == status]
+        if status not in STATUSES:
+            return ApplicantRows(self.table, array("I"))
+        return ApplicantRows(self.table, self.table.status_rows[STATUSES.index(status)], ordered=False)
+
+    def status_counts(self):
+        return {status: self.table.status_count(i) for i, status in enumerate(STATUSES)}
 
 # ---------- Demo Functions ---------------------------------------------
 
-def generate_random_applicants(portal, count=20):
-    """Generate random applicants."""
-    for _ in range(count):
-        name = random_name()
-        dept = random_department()
-        score = random_score()
-        applicant = Applicant(name, dept, score)
-        portal.add_applicant(applicant)
+def generate_random_applicants(portal, count=20, seed=None):
+    """Generate random applicants; the same seed gives the same applicants."""
+    rng = random.Random(seed) if seed is not None else random
+    portal.table.generate(count, rng)
 
 def print_applicant_info(applicant):
     """Print single applicant info."""
@@ -115,15 +346,12 @@ def print_applicant_info(applicant):
 
 def print_portal_summary(portal):
     """Print summary."""
-    apps = portal.list_all()
+    counts = portal.status_counts()
     print("===== ADMISSION SUMMARY =====")
-    print(f"Total Applicants: {len(apps)}")
-    approved = len([a for a in apps if a['status'] == "Approved"])
-    rejected = len([a for a in apps if a['status'] == "Rejected"])
-    pending = len([a for a in apps if a['status'] == "Pending"])
-    print(f"Approved: {approved}")
-    print(f"Rejected: {rejected}")
-    print(f"Pending : {pending}")
+    print(f"Total Applicants: {len(portal.applicants)}")
+    print(f"Approved: {counts['Approved']}")
+    print(f"Rejected: {counts['Rejected']}")
+    print(f"Pending : {counts['Pending']}")
     print("==============================\n")
 
 # ---------- Main Functional Simulation --------------------------------
@@ -185,11 +413,10 @@ def print_merit_list(merit_list):
         rank += 1
     print("=======================\n")
 
-def save_applicant_data_to_file(portal, filename="admission_data.txt"):
-    """Save all applicant data."""
-    with open(filename, "w") as f:
-        for a in portal.applicants.values():
-            f.write(str(a.to_dict()) + "\n")
+def save_applicant_data_to_file(portal, filename="admission_data.jsonl", fmt="jsonl"):
+    """Save all applicant data as jsonl, csv or columnar (see applicant_io)."""
+    from applicant_io import FORMATS
+    return FORMATS[fmt][0](portal, filename)
 
 def load_fake_notice():
     notices = [
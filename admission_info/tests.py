@@ -0,0 +1,338 @@
+"""Tests for the admission_info modules, checked against naive scans.
+
+Run: python -m unittest discover -s admission_info -p tests.py
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import datetime
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import admissionContact as ac
+from contact_journal import ContactJournal, ReadOnlyJournal
+from contact_events import EventLog
+from simulate import AdmissionPortal, Applicant, STATUSES, generate_random_applicants
+from applicant_io import FORMATS, read_jsonl, read_csv
+from user_cache import UserCache
+
+
+NAMES = ["Rahim Ahmed", "Karim Hossain", "Aisha Noor", "Nusrat Rahman", "Rafi Mia", "Sami Biswas"]
+TOPICS = ["admission", "scholarship", "tuition fee", "hostel seat", "waiver", "deadline"]
+
+
+def make_contact(rng, i, when):
+    c = ac.AdmissionContact(rng.choice(NAMES), f"user{rng.randrange(40)}@mail.com",
+                            f"01{rng.randint(3, 9)}{rng.randrange(10 ** 8):08d}",
+                            f"About {rng.choice(TOPICS)} #{i}")
+    c.timestamp = when
+    return c
+
+
+class ContactStoreTests(unittest.TestCase):
+    """Random adds, updates and removes; every lookup must match a scan of a plain list."""
+
+    def setUp(self):
+        self.rng = random.Random(26)
+        self.store = ac.ContactStore()
+        self.naive = []
+        self.start = datetime.datetime(2025, 1, 1)
+
+    def add(self, i):
+        # mostly in timestamp order, sometimes out of it
+        when = self.start + datetime.timedelta(hours=i if self.rng.random() < 0.8 else self.rng.randrange(i + 1))
+        c = make_contact(self.rng, i, when)
+        self.store.add(c)
+        self.naive.append(c)
+
+    def check(self):
+        store, naive, rng = self.store, self.naive, self.rng
+        self.assertEqual(len(store), len(naive))
+        self.assertEqual(list(store), naive)
+        for i in (0, len(naive) - 1, rng.randrange(max(1, len(naive))), len(naive), -1):
+            self.assertIs(store.by_index(i), naive[i] if 0 <= i < len(naive) else None)
+        self.assertEqual(store.recent(5), naive[-5:])
+        self.assertEqual(store.by_timestamp(), sorted(naive, key=lambda c: (c.timestamp, c.id)))
+        lo = self.start + datetime.timedelta(hours=rng.randrange(200))
+        hi = lo + datetime.timedelta(hours=rng.randrange(1, 50))
+        self.assertEqual(store.between(lo, hi),
+                         sorted((c for c in naive if lo <= c.timestamp < hi), key=lambda c: (c.timestamp, c.id)))
+        for keyword in ("ai", "Noor", "rahman", "fee", "#1", "hostel seat", "zzz"):
+            self.assertEqual(store.search_name(keyword), sorted(
+                (c for c in naive if keyword.lower() in c.name.lower()), key=lambda c: c.id))
+            self.assertEqual(store.search_message(keyword), sorted(
+                (c for c in naive if keyword.lower() in c.message.lower()), key=lambda c: c.id))
+        email = f"user{rng.randrange(40)}@mail.com"
+        self.assertEqual(sorted(store.with_email(email), key=lambda c: c.id), [c for c in naive if c.email == email])
+        self.assertEqual(store.has_email(email), any(c.email == email for c in naive))
+        for prefix in ("user1", "u", "x"):
+            self.assertEqual(store.with_email_prefix(prefix), [c for c in naive if c.email.startswith(prefix)])
+        for prefix in ("017", "01", "0199"):
+            self.assertEqual(store.with_phone_prefix(prefix), [c for c in naive if c.phone.startswith(prefix)])
+
+    def test_matches_naive_scans(self):
+        for i in range(400):
+            self.add(i)
+        self.check()
+        for step in range(600):
+            op = self.rng.random()
+            if op < 0.35 and self.naive:
+                c = self.naive.pop(self.rng.randrange(len(self.naive)))
+                self.assertIs(self.store.remove(c.id), c)
+            elif op < 0.55 and self.naive:
+                c = self.rng.choice(self.naive)
+                self.store.update(c.id, name=self.rng.choice(NAMES), email=f"user{self.rng.randrange(40)}@mail.com",
+                                  message=f"Now about {self.rng.choice(TOPICS)}")
+            else:
+                self.add(400 + step)
+            if step % 25 == 0:
+                self.check()
+        self.check()
+        self.assertIsNone(self.store.remove(-1))
+
+    def test_removing_most_contacts_compacts(self):
+        for i in range(300):
+            self.add(i)
+        for c in self.naive[:250]:
+            self.store.remove(c.id)
+        del self.naive[:250]
+        self.assertLessEqual(len(self.store.order), 2 * len(self.naive))
+        self.assertLessEqual(len(self.store.by_date), 2 * len(self.naive))
+        self.check()
+        self.store.clear()
+        self.naive.clear()
+        self.check()
+
+    def test_index_lookups_do_not_compact(self):
+        for i in range(2000):
+            self.add(i)
+        compactions = []
+        compact = self.store._compact_order
+        self.store._compact_order = lambda: compactions.append(len(self.store.order)) or compact()
+        for _ in range(1500):  # delete the oldest, read the first and the last
+            c = self.naive.pop(0)
+            self.store.remove(c.id)
+            self.assertIs(self.store.by_index(0), self.naive[0])
+            self.assertIs(self.store.by_index(len(self.naive) - 1), self.naive[-1])
+        self.assertEqual(compactions, [2000])
+        self.check()
+
+
+class ContactJournalTests(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.dir = folder.name
+        self.addCleanup(ac.CONTACT_DB.clear)
+        self.addCleanup(ac.close_contact_db)
+        ac.CONTACT_DB.clear()
+
+    def follower(self):
+        store = ac.ContactStore()
+        journal = ContactJournal(self.dir, readonly=True)
+        journal.load(store, ac.AdmissionContact.restore)
+        return store
+
+    def test_idle_journal_is_synced_after_sync_interval(self):
+        ac.open_contact_db(self.dir, sync_every=1000, sync_interval=0.05)
+        ac.create_contact("Aisha Noor", "aisha@yahoo.com", "01300000000", "Scholarship info?")
+        ac.create_contact("Rafi Ahmed", "rafi@example.com", "01500000000", "Admission requirements?")
+        time.sleep(0.3)
+        self.assertGreater(os.path.getsize(os.path.join(self.dir, "contacts.log")), 0)
+        self.assertEqual([c.email for c in self.follower()], ["aisha@yahoo.com", "rafi@example.com"])
+
+    def test_recovery_matches_the_store_it_journaled(self):
+        rng = random.Random(28)
+        ac.open_contact_db(self.dir, snapshot_every=150)
+        for i in range(500):
+            ids = ac.get_contact_ids()
+            op = rng.random()
+            if op < 0.2 and ids:
+                ac.delete_contact(rng.choice(ids))
+            elif op < 0.35 and ids:
+                ac.update_contact(rng.choice(ids), name=rng.choice(NAMES), phone=f"0199{i:07d}")
+            else:
+                ac.create_contact(rng.choice(NAMES), f"user{i}@mail.com", f"017{i:08d}", f"About {rng.choice(TOPICS)}")
+        expected = ac.get_all_contacts()
+        ac.close_contact_db()
+        self.assertEqual([c.to_dict() for c in self.follower()], expected)
+        ac.CONTACT_DB.clear()
+        ac.open_contact_db(self.dir)
+        self.assertEqual(ac.get_all_contacts(), expected)
+
+    def test_readonly_journal_refuses_changes_before_applying_them(self):
+        ac.open_contact_db(self.dir)
+        cid = ac.create_contact("Aisha Noor", "aisha@yahoo.com", "01300000000", "Scholarship info?")["contact"]["id"]
+        ac.close_contact_db()
+        ac.open_contact_db(self.dir, readonly=True)
+        next_id = ac.CONTACT_ID_COUNTER
+        with self.assertRaises(ReadOnlyJournal):
+            ac.create_contact("Rafi Ahmed", "rafi@example.com", "01500000000", "Admission requirements?")
+        with self.assertRaises(ReadOnlyJournal):
+            ac.update_contact(cid, name="Updated User")
+        with self.assertRaises(ReadOnlyJournal):
+            ac.delete_contact(cid)
+        with self.assertRaises(ReadOnlyJournal):
+            ac.clear_contacts()
+        self.assertEqual([(c["id"], c["name"]) for c in ac.get_all_contacts()], [(cid, "Aisha Noor")])
+        self.assertEqual(ac.CONTACT_ID_COUNTER, next_id)
+
+
+class EventLogTests(unittest.TestCase):
+    def test_ring_buffer_matches_the_tail_of_every_event(self):
+        log = EventLog(capacity=50)
+        naive = []
+        for i in range(237):
+            log.record("Contact ID %d updated", (i,))
+            naive.append(i)
+            if i % 17 == 0:
+                kept = naive[-50:]
+                self.assertEqual(log.total, len(naive))
+                self.assertEqual(len(log), len(kept))
+                for offset, limit in ((0, None), (3, 10), (45, 20), (60, None), (0, 0)):
+                    expected = kept[offset:] if limit is None else kept[offset:offset + limit]
+                    self.assertEqual([e[2][0] for e in log.events(offset, limit)], expected)
+        log.clear()
+        self.assertEqual((log.total, log.events()), (0, []))
+
+    def test_writer_drains_every_event_and_rotates(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "contacts-events.log")
+            log = EventLog(capacity=10)
+            log.start_writer(path, max_bytes=2000, backups=20, interval=0.01)
+            for i in range(300):
+                log.record("Contact ID %d deleted", (i,))
+                if i % 30 == 29:
+                    time.sleep(0.03)  # let the writer flush a batch
+            log.stop_writer()
+            # oldest backup first, the live file (if the last flush did not rotate it away) last
+            names = [name for name in [f"{path}.{i}" for i in range(20, 0, -1)] + [path] if os.path.exists(name)]
+            lines = []
+            for name in names:
+                with open(name, encoding="utf-8") as f:
+                    lines += f.read().splitlines()
+            self.assertGreater(len(names), 2)
+            self.assertEqual([line.split("] ", 1)[1] for line in lines], [f"Contact ID {i} deleted" for i in range(300)])
+
+
+def random_portal(seed, count=300):
+    """A portal with count applicants and random decisions, and the same applicants as plain dicts."""
+    rng = random.Random(seed)
+    portal = AdmissionPortal()
+    naive = []
+    for i in range(count):
+        dept = rng.choice(["CSE", "EEE", "BBA", "Law", "Pharmacy"])
+        a = Applicant(rng.choice(NAMES), dept, round(rng.uniform(3, 5), 2))
+        portal.add_applicant(a)
+        naive.append(a.to_dict())
+    for _ in range(count * 2):
+        d = rng.choice(naive)
+        status = rng.choice(STATUSES)
+        if status == "Approved":
+            portal.approve_applicant(d["applicant_id"])
+        elif status == "Rejected":
+            portal.reject_applicant(d["applicant_id"])
+        else:
+            continue
+        d["status"] = status
+    return portal, naive
+
+
+class ApplicantTableTests(unittest.TestCase):
+    def test_rows_read_back_as_added(self):
+        portal, naive = random_portal(30)
+        self.assertEqual(portal.list_all(), naive)
+        self.assertEqual(len(portal.applicants), len(naive))
+        self.assertEqual(list(portal.applicants), [d["applicant_id"] for d in naive])
+        for d in naive[::37]:
+            self.assertEqual(portal.get_applicant(d["applicant_id"]).to_dict(), d)
+            self.assertEqual(portal.applicants[d["applicant_id"]].to_dict(), d)
+        for bad in ("APP0000000", f"APP{len(naive) + 1:07d}", "APPxyz", "ID0000001", None):
+            self.assertIsNone(portal.get_applicant(bad))
+            self.assertFalse(portal.approve_applicant(bad))
+
+    def test_generated_applicants_are_reproducible(self):
+        first, second = AdmissionPortal(), AdmissionPortal()
+        generate_random_applicants(first, count=500, seed=7)
+        generate_random_applicants(second, count=500, seed=7)
+        rows = first.list_all()
+        self.assertEqual(rows, second.list_all())
+        self.assertTrue(all(d["status"] == "Pending" and 3 <= d["score"] <= 5 for d in rows))
+
+    def test_department_and_status_indexes_match_scans(self):
+        portal, naive = random_portal(31)
+        generate_random_applicants(portal, count=200, seed=31)
+        naive += portal.list_all()[len(naive):]
+        for dept in ("CSE", "Law", "Pharmacy", "Civil", "Nope"):
+            rows = portal.filter_by_department(dept)
+            self.assertEqual(list(rows), [d for d in naive if d["department"] == dept])
+            self.assertEqual(len(rows), sum(d["department"] == dept for d in naive))
+        for status in STATUSES + ["Unknown"]:
+            rows = portal.filter_by_status(status)
+            self.assertEqual(list(rows), [d for d in naive if d["status"] == status])
+            self.assertEqual(bool(rows), any(d["status"] == status for d in naive))
+        self.assertEqual(portal.status_counts(), {s: sum(d["status"] == s for d in naive) for s in STATUSES})
+
+
+class ApplicantIOTests(unittest.TestCase):
+    def test_every_format_reloads_the_same_applicants(self):
+        portal, naive = random_portal(32, count=150)
+        portal.add_applicant(Applicant('Karim, "KH" Hossain', "Law", 4.5))
+        naive.append(portal.list_all()[-1])
+        with tempfile.TemporaryDirectory() as folder:
+            for fmt, (write, load) in FORMATS.items():
+                path = os.path.join(folder, f"applicants.{fmt}")
+                self.assertEqual(write(portal, path), len(naive))
+                loaded = load(path)
+                self.assertEqual(loaded.list_all(), naive, fmt)
+                self.assertEqual(loaded.status_counts(), portal.status_counts(), fmt)
+                self.assertEqual(list(loaded.filter_by_department("Law")), list(portal.filter_by_department("Law")), fmt)
+                self.assertEqual(list(loaded.filter_by_status("Approved")), list(portal.filter_by_status("Approved")), fmt)
+            self.assertEqual(list(read_jsonl(os.path.join(folder, "applicants.jsonl"))), naive)
+            self.assertEqual(list(read_csv(os.path.join(folder, "applicants.csv"))),
+                             [{k: str(v) if k != "score" else v for k, v in d.items()} for d in naive])
+
+
+class UserCacheTests(unittest.TestCase):
+    def test_matches_a_naive_lru_with_expiry(self):
+        rng = random.Random(38)
+        now = [0.0]
+        cache = UserCache(maxsize=8, ttl=5.0, clock=lambda: now[0])
+        naive = []  # [user_id, expires], least recently used first
+        loads = []
+
+        def load(user_id):
+            loads.append(user_id)
+            return None if user_id == 0 else {"id": user_id}
+
+        for _ in range(2000):
+            now[0] += rng.choice((0.0, 0.1, 1.0, 3.0))
+            user_id = rng.randrange(15)
+            op = rng.random()
+            entry = next((e for e in naive if e[0] == user_id), None)
+            if entry is not None and entry[1] <= now[0]:
+                naive.remove(entry)
+                entry = None
+            if op < 0.1:
+                cache.invalidate(user_id)
+                if entry is not None:
+                    naive.remove(entry)
+                continue
+            before = len(loads)
+            self.assertEqual(cache.get_or_load(user_id, load), None if user_id == 0 else {"id": user_id})
+            self.assertEqual(len(loads) - before, 0 if entry is not None else 1)
+            if entry is not None:
+                naive.remove(entry)
+                naive.append(entry)
+            elif user_id != 0:
+                naive.append([user_id, now[0] + 5.0])
+                del naive[:-8]
+            self.assertEqual(list(cache.entries), [e[0] for e in naive])
+        self.assertEqual(cache.misses, len(loads))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Short-lived, size-bounded cache of users for the API's auth hook.
+
+load_logged_in_user runs before every API request.  Caching the user for a
+few seconds turns the per-request primary-key query into a dict lookup;
+entries are dropped when an update or delete of the user row commits (see
+the SQLAlchemy listeners in admission_info.py), and the TTL bounds how
+stale a user can be in other worker processes.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+
+class UserCache:
+    """LRU mapping of user id -> value with a per-entry time to live."""
+    def __init__(self, maxsize=1024, ttl=30.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None:
+                expires, value = entry
+                if expires > self.clock():
+                    self.entries.move_to_end(user_id)
+                    self.hits += 1
+                    return value
+                del self.entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, value):
+        with self.lock:
+            self.entries[user_id] = (self.clock() + self.ttl, value)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get_or_load(self, user_id, load):
+        value = self.get(user_id)
+        if value is None:
+            value = load(user_id)
+            if value is not None:
+                self.put(user_id, value)
+        return value
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
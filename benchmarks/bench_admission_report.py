@@ -0,0 +1,67 @@
+"""Time to build the admission report (admission/reports.py) at production scale.
+
+Seeds a throwaway SQLite database with seed_admissions (--applications
+spread over 90 days, with their event history and payments), then times
+admission_report() for the last week, for the whole 90 days, and for the
+last week again from the closed-range cache.
+
+Usage: python benchmarks/bench_admission_report.py [--applications 1000000] [--db PATH]
+       (--db keeps the seeded database for another run)
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNTIL = date(2025, 9, 30)
+
+
+def setup(db_path, applications):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DATABASES['default']['NAME'] = db_path
+    from django.core.management import call_command
+    from admission.models import Application
+    call_command('migrate', verbosity=0)
+    if Application.objects.count() != applications:
+        start = time.perf_counter()
+        call_command('seed_admissions', applications=applications, until=UNTIL, days=90, clear=True,
+                     batch_size=20_000, stdout=io.StringIO())
+        print(f'seeded {applications:,} applications in {time.perf_counter() - start:.0f}s')
+
+
+def timed(label, start, end, **kwargs):
+    from admission.reports import admission_report
+    began = time.perf_counter()
+    report = admission_report(start, end, **kwargs)
+    elapsed = time.perf_counter() - began
+    total = report['total']
+    print(f'{label:<22} {elapsed:>8.3f} {total["applications"]:>12,} {total["decisions"]:>10,} '
+          f'{total["payments"]:>9,} {"yes" if report["cached"] else "no":>7}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--applications', type=int, default=1_000_000)
+    parser.add_argument('--db')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(args.db or os.path.join(tmp, 'bench.sqlite3'), args.applications)
+        from django.core.cache import cache
+        cache.clear()
+        week = (UNTIL - timedelta(days=6), UNTIL)
+        print(f'{"range":<22} {"seconds":>8} {"applications":>12} {"decisions":>10} {"payments":>9} {"cached":>7}')
+        timed('last week', *week)
+        timed('90 days', UNTIL - timedelta(days=89), UNTIL)
+        timed('last week, again', *week)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Round-trip and throughput of the applicant_io formats.
+
+Usage: python benchmarks/bench_applicant_io.py [N] [DIR]   (default 2,000,000 applicants)
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "admission_info"))
+
+import simulate
+import applicant_io
+
+
+def main(n=2_000_000, directory=None):
+    directory = directory or tempfile.gettempdir()
+    portal = simulate.AdmissionPortal()
+    simulate.generate_random_applicants(portal, count=n, seed=7)
+    for row in range(0, n, 4):
+        portal.table.set_status(row, simulate.APPROVED)
+    sample = [portal.get_applicant(portal.table.row_id(r)).to_dict() for r in (0, n // 2, n - 1)]
+
+    for fmt, (write, load) in applicant_io.FORMATS.items():
+        path = os.path.join(directory, f"bench_applicants.{fmt}")
+        start = time.perf_counter()
+        write(portal, path)
+        write_s = time.perf_counter() - start
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        loaded = load(path)
+        load_s = time.perf_counter() - start
+        same = (len(loaded.applicants) == n
+                and loaded.status_counts() == portal.status_counts()
+                and [loaded.get_applicant(s["applicant_id"]).to_dict() for s in sample] == sample)
+        print(f"{fmt:<9} write {n / write_s:12,.0f} rows/s  load {n / load_s:12,.0f} rows/s  "
+              f"{size / 2**20:8.1f} MiB  round-trip {'ok' if same else 'MISMATCH'}")
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000, sys.argv[2] if len(sys.argv) > 2 else None)
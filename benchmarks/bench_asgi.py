@@ -0,0 +1,188 @@
+"""Sync WSGI vs async ASGI throughput for the public pages, with slow clients.
+
+Starts the project in a subprocess against a throwaway SQLite database,
+either behind a WSGI server with a fixed thread pool (like a gthread worker)
+or behind uvicorn (ASGI, one event loop), then keeps --concurrency clients
+busy requesting the public pages.  A share of the clients are slow: they
+dribble their request headers over --slow seconds, as phones on a bad
+connection do.  A WSGI thread is stuck with such a client until its headers
+arrive; the ASGI server only parses them as they come in.
+
+Needs uvicorn (pip install uvicorn) for the ASGI runs.
+
+Usage: python benchmarks/bench_asgi.py [--concurrency 50,200,500] [--seconds 10] [--slow 1.0] [--slow-share 0.5]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import io
+import tempfile
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = ['/', '/info/', '/apply/']
+
+
+def setup(db_path):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('seed_admissions', applications=0, stdout=io.StringIO())
+
+
+def serve_wsgi(port, threads):
+    from django.core.servers.basehttp import WSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PooledWSGIServer(WSGIServer):
+        """One request per pool thread, like a gthread worker."""
+        pool = ThreadPoolExecutor(threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.process_request_thread, request, client_address)
+
+        def process_request_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    httpd = PooledWSGIServer(('127.0.0.1', port), QuietHandler)
+    httpd.request_queue_size = 4096
+    httpd.set_app(get_wsgi_application())
+    httpd.serve_forever()
+
+
+def serve_asgi(port):
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+    uvicorn.run(get_asgi_application(), host='127.0.0.1', port=port, log_level='error',
+                backlog=4096, lifespan='off')
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def get(port, path, slow, timeout):
+    """GET path, sending the headers over slow seconds; returns latency or None."""
+    start = time.perf_counter()
+    lines = [f'GET {path} HTTP/1.1\r\n', 'Host: 127.0.0.1\r\n', 'User-Agent: bench\r\n',
+             'Accept: text/html\r\n', 'Connection: close\r\n', '\r\n']
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        for line in lines:
+            writer.write(line.encode())
+            if slow:
+                await asyncio.sleep(slow / len(lines))
+        raw = await asyncio.wait_for(reader.read(), timeout - (time.perf_counter() - start))
+    except (OSError, asyncio.TimeoutError):
+        return None
+    finally:
+        if writer is not None:
+            writer.close()
+    if not raw.startswith(b'HTTP/1.1 200'):
+        return None
+    return time.perf_counter() - start
+
+
+async def client(i, port, end, slow, timeout, fast_latencies, counts):
+    n = 0
+    while time.perf_counter() < end:
+        latency = await get(port, PATHS[(i + n) % len(PATHS)], slow, timeout)
+        n += 1
+        if latency is None:
+            counts['failed'] += 1
+            continue
+        counts['ok'] += 1
+        if not slow:
+            fast_latencies.append(latency)
+
+
+async def run(port, concurrency, seconds, slow, slow_share, timeout):
+    fast_latencies = []
+    counts = {'ok': 0, 'failed': 0}
+    end = time.perf_counter() + seconds
+    n_slow = int(concurrency * slow_share)
+    await asyncio.gather(*(
+        client(i, port, end, slow if i < n_slow else 0, timeout, fast_latencies, counts)
+        for i in range(concurrency)
+    ))
+    fast_latencies.sort()
+    p50 = fast_latencies[len(fast_latencies) // 2] if fast_latencies else float('nan')
+    p99 = fast_latencies[int(len(fast_latencies) * 0.99) - 1] if fast_latencies else float('nan')
+    return counts['ok'] / seconds, counts['failed'], p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', default='50,200,500')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--slow', type=float, default=1.0, help='seconds a slow client takes to send its headers')
+    parser.add_argument('--slow-share', type=float, default=0.5)
+    parser.add_argument('--threads', type=int, default=16, help='WSGI worker threads')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--serve', type=int)
+    parser.add_argument('--mode', choices=['wsgi', 'asgi'])
+    parser.add_argument('--db')
+    args = parser.parse_args()
+    if args.serve:
+        setup(args.db)
+        if args.mode == 'wsgi':
+            return serve_wsgi(args.serve, args.threads)
+        return serve_asgi(args.serve)
+
+    import resource
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    print(f'{"server":<6} {"clients":>7} {"req/s":>8} {"failed":>7} {"fast p50 (s)":>13} {"fast p99 (s)":>13}')
+    for mode in ('wsgi', 'asgi'):
+        with tempfile.TemporaryDirectory() as tmp:
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, __file__, '--serve', str(port), '--mode', mode, '--threads', str(args.threads),
+                 '--db', os.path.join(tmp, 'bench.sqlite3')])
+            try:
+                wait_for_port(port)
+                for concurrency in (int(c) for c in args.concurrency.split(',')):
+                    rps, failed, p50, p99 = asyncio.run(
+                        run(port, concurrency, args.seconds, args.slow, args.slow_share, args.timeout))
+                    print(f'{mode:<6} {concurrency:>7} {rps:>8.1f} {failed:>7} {p50:>13.3f} {p99:>13.3f}', flush=True)
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""First-request latency of a freshly booted worker, with and without warm-up.
+
+Boots uap_backend.wsgi in a new interpreter per measurement, against a
+throwaway SQLite database seeded once, and times its first and second
+request to each of --paths, with ADMISSION_STARTUP['WARM_UP'] off (as
+before admission/startup.py) and on.  The boot column is the time to
+import uap_backend.wsgi, warm-up included; first - warm is what the first
+visitor to a new worker pays on top of an ordinary request.
+
+Usage: python benchmarks/bench_cold_start.py [--runs 5] [--paths /apply/,/info/,/] [--applications 500]
+"""
+import io
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = '''
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+os.environ['DJANGO_SETTINGS_MODULE'] = 'uap_backend.settings'
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = {db!r}
+settings.ALLOWED_HOSTS = ['*']
+settings.DEBUG = False
+settings.ADMISSION_STARTUP = {{'WARM_UP': {warm_up!r}}}
+settings.ADMISSION_CONTROL = {{'ENABLED': False}}
+start = time.perf_counter()
+from uap_backend.wsgi import application
+boot = time.perf_counter() - start
+from wsgiref.util import setup_testing_defaults
+
+def get(path):
+    environ = {{'PATH_INFO': path}}
+    setup_testing_defaults(environ)
+    status = []
+    start = time.perf_counter()
+    body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+    elapsed = time.perf_counter() - start
+    assert status[0].startswith('200'), status
+    return elapsed
+
+first = get({path!r})
+second = get({path!r})
+sys.stdout.write(json.dumps([boot, first, second]))
+'''
+
+
+def seed(db, applications):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
+    import django
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = db
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('seed_admissions', applications=applications, stdout=io.StringIO())
+
+
+def boot(db, path, warm_up):
+    script = WORKER.format(root=ROOT, db=db, path=path, warm_up=warm_up)
+    proc = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode:
+        sys.exit(proc.stderr[-2000:])
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--paths', default='/apply/,/info/,/')
+    parser.add_argument('--applications', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, 'bench.sqlite3')
+        seed(db, args.applications)
+        print(f'{"path":<10} {"warm-up":<8} {"boot ms":>8} {"first ms":>9} {"warm ms":>8}')
+        for path in args.paths.split(','):
+            for warm_up in (False, True):
+                runs = [boot(db, path, warm_up) for _ in range(args.runs)]
+                boot_ms, first, second = (statistics.median(r[i] for r in runs) * 1000 for i in range(3))
+                print(f'{path:<10} {"on" if warm_up else "off":<8} {boot_ms:>8.1f} {first:>9.2f} {second:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Measure what admissionContact.log_event adds to the create path.
+
+Usage: python benchmarks/bench_contact_events.py [N]   (default 1,000,000 events)
+"""
+import os
+import sys
+import time
+import datetime
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "admission_info"))
+
+import admissionContact as ac
+
+
+def legacy_log_event(logs, msg):
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    logs.append(f"[{timestamp}] {msg}")
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def retained_bytes(fn, n):
+    tracemalloc.start()
+    for i in range(n):
+        fn(i)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main(n=1_000_000):
+    legacy = []
+    old_ns = per_call(lambda i: legacy_log_event(legacy, f"New contact received (ID={i})"), n)
+    legacy.clear()
+    old_mem = retained_bytes(lambda i: legacy_log_event(legacy, f"New contact received (ID={i})"), n)
+    legacy.clear()
+
+    ac.clear_logs()
+    new_ns = per_call(lambda i: ac.log_event("New contact received (ID=%d)", i), n)
+    ac.clear_logs()
+    new_mem = retained_bytes(lambda i: ac.log_event("New contact received (ID=%d)", i), n)
+
+    path = os.path.join(tempfile.gettempdir(), "bench_contact_events.log")
+    ac.start_log_writer(path, max_bytes=64 * 1024 * 1024, backups=1)
+    writer_ns = per_call(lambda i: ac.log_event("New contact received (ID=%d)", i), n)
+    ac.stop_log_writer()
+    for suffix in ("", ".1"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    print(f"legacy strftime + list append  {old_ns:8.0f} ns/event  {old_mem / 2**20:8.1f} MiB after {n:,}")
+    print(f"ring buffer                    {new_ns:8.0f} ns/event  {new_mem / 2**20:8.1f} MiB after {n:,}")
+    print(f"ring buffer + file writer      {writer_ns:8.0f} ns/event")
+
+    count = min(n, 100_000)
+    ac.clear_contacts()
+    create_ns = per_call(lambda i: ac.create_contact("Bench User", f"u{i}@mail.com", "01711111111", "Hello there"), count)
+    print(f"create_contact (total)         {create_ns:8.0f} ns/call, of which logging ~{new_ns:.0f} ns")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,58 @@
+"""Benchmark indexed lookups and searches in admission_info/admissionContact.py.
+
+Usage: python benchmarks/bench_contacts.py [N]   (default 1,000,000 contacts)
+"""
+import os
+import sys
+import time
+import random
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "admission_info"))
+
+import admissionContact as ac
+
+FIRST = ["Rahim", "Karim", "Jamal", "Rafi", "Imran", "Sami", "Hasan", "Fahim", "Aisha", "Nusrat"]
+LAST = ["Ahmed", "Hossain", "Rahman", "Sheikh", "Mia", "Talukder", "Biswas", "Noor"]
+TOPICS = ["admission", "scholarship", "tuition fee", "hostel seat", "transport", "waiver",
+          "deadline", "result", "credit transfer", "orientation", "documents", "payment"]
+
+
+def timed(label, fn, repeat=1000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_call = (time.perf_counter() - start) / repeat
+    print(f"{label:<28} {per_call * 1e6:10.2f} us/call")
+
+
+def main(n=1_000_000):
+    ac.clear_contacts()
+    start = time.perf_counter()
+    for i in range(n):
+        name = f"{random.choice(FIRST)} {random.choice(LAST)}"
+        message = f"Question about {random.choice(TOPICS)} and {random.choice(TOPICS)} #{i}"
+        ac.create_contact(name, f"user{i}@mail.com", f"01{random.randint(3, 9)}{i:08d}", message)
+    print(f"created {n} contacts in {time.perf_counter() - start:.1f}s")
+
+    ids = ac.get_contact_ids()
+    today = datetime.date.today()
+    timed("get_contact", lambda: ac.get_contact(random.choice(ids)))
+    timed("get_contact_by_index", lambda: ac.get_contact_by_index(random.randrange(n)))
+    timed("contact_exists", lambda: ac.contact_exists(f"user{random.randrange(n)}@mail.com"))
+    timed("search_by_email", lambda: ac.search_by_email(f"user{random.randrange(n)}@mail.com"))
+    timed("search_message(rare)", lambda: ac.search_message(f"#{random.randrange(n)}"), repeat=100)
+    timed("search_message(2 topics)", lambda: ac.search_message("waiver and hostel"), repeat=10)
+    timed("search_by_name", lambda: ac.search_by_name("sami noor"), repeat=10)
+    timed("emails_starting_with", lambda: ac.emails_starting_with(f"user{random.randrange(n)}"), repeat=100)
+    timed("phones_by_prefix", lambda: ac.phones_by_prefix(f"017{random.randrange(100000):05d}"), repeat=100)
+    timed("update_contact", lambda: ac.update_contact(random.choice(ids), email=f"moved{random.randrange(n)}@mail.com"))
+    timed("contacts_on_date(yesterday)", lambda: ac.contacts_on_date(today - datetime.timedelta(days=1)))
+    timed("filter_by_date(empty range)", lambda: ac.filter_by_date(today + datetime.timedelta(days=1), today + datetime.timedelta(days=2)))
+    victims = random.sample(ids, 1000)
+    timed("delete_contact", lambda: ac.delete_contact(victims.pop()), repeat=1000)
+    timed("get_contact_by_index(after)", lambda: ac.get_contact_by_index(random.randrange(n - 1000)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,143 @@
+"""Django worker time per submission: documents posted with the form vs presigned uploads.
+
+Runs the project in-process against a throwaway SQLite database and media
+folder, with admission control off, and submits --repeat applications with
+a photo, a signature and a transcript (--sizes, in KB):
+
+* form post: one multipart POST to application_create carrying the files,
+  parsed by Django and copied into MEDIA_ROOT;
+* presigned: three POSTs to apply/uploads/ for signed URLs, the PUTs of the
+  files through UploadASGIMiddleware (the handler asgi.py runs in front of
+  Django), then application_create with the three upload tokens.
+
+Request bodies are encoded before the clock starts, so the times are what
+the server spends.  They are the best case for the form post: the body is
+already in memory, while a real worker also waits for it to arrive, which
+the last column estimates for a client at --link-mbps.
+
+Usage: python benchmarks/bench_presigned_upload.py [--repeat 20] [--sizes 2048,512,8192] [--link-mbps 8]
+"""
+import os
+import io
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KINDS = [('photo', 'photo.png', b'\x89PNG\r\n\x1a\n'), ('sign', 'sign.png', b'\x89PNG\r\n\x1a\n'),
+         ('transcript', 'transcript.pdf', b'%PDF-1.7\n')]
+FORM = {'full_name': 'Bench Applicant', 'email': 'bench@example.com', 'phone': '0123456789',
+        'department': 'CSE', 'program': 'bachelors'}
+
+
+def setup(tmp):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DATABASES['default']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+    settings.MEDIA_ROOT = os.path.join(tmp, 'media')
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    settings.ADMISSION_CONTROL = {'ENABLED': False}
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('seed_admissions', applications=0, stdout=io.StringIO())
+
+
+def multipart(fields, files=()):
+    from django.test.client import encode_multipart, BOUNDARY, MULTIPART_CONTENT
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    data = dict(fields)
+    for kind, name, content in files:
+        data[kind] = SimpleUploadedFile(name, content)
+    return encode_multipart(BOUNDARY, data), MULTIPART_CONTENT
+
+
+def form_post(client, contents):
+    body, content_type = multipart(FORM, [(kind, name, contents[kind]) for kind, name, _ in KINDS])
+    start = time.perf_counter()
+    response = client.generic('POST', '/apply/submit/', body, content_type)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 302, response.status_code
+    return elapsed, 0.0, len(body)
+
+
+async def asgi_put(app, url, content, chunk=64 * 1024):
+    sent = []
+    pieces = [content[i:i + chunk] for i in range(0, len(content), chunk)]
+
+    async def receive():
+        data = pieces.pop(0)
+        return {'type': 'http.request', 'body': data, 'more_body': bool(pieces)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'PUT', 'path': url,
+             'headers': [(b'content-length', str(len(content)).encode())]}
+    await app(scope, receive, send)
+    assert sent[0]['status'] == 200, sent
+
+
+def presigned(client, middleware, contents):
+    from urllib.parse import urlencode
+    worker = handler = 0.0
+    tokens = {}
+    largest = 0
+    for kind, name, _ in KINDS:
+        body = urlencode({'kind': kind, 'filename': name, 'size': len(contents[kind])})
+        start = time.perf_counter()
+        upload = client.generic('POST', '/apply/uploads/', body, 'application/x-www-form-urlencoded').json()
+        worker += time.perf_counter() - start
+        start = time.perf_counter()
+        asyncio.run(asgi_put(middleware, upload['url'], contents[kind]))
+        handler += time.perf_counter() - start
+        tokens[f'{kind}_upload'] = upload['upload']
+        largest = max(largest, len(body))
+    body, content_type = multipart({**FORM, **tokens})
+    start = time.perf_counter()
+    response = client.generic('POST', '/apply/submit/', body, content_type)
+    worker += time.perf_counter() - start
+    assert response.status_code == 302, response.status_code
+    return worker, handler, max(largest, len(body))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--sizes', default='2048,512,8192', help='photo,sign,transcript sizes in KB')
+    parser.add_argument('--link-mbps', type=float, default=8.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(tmp)
+        from django.test import Client
+        from admission.models import ApplicationFile
+        from admission.uploads import UploadASGIMiddleware
+
+        sizes = [int(s) * 1024 for s in args.sizes.split(',')]
+        contents = {kind: magic + os.urandom(size - len(magic)) for (kind, _, magic), size in zip(KINDS, sizes)}
+        client = Client()
+        middleware = UploadASGIMiddleware(None)  # only PUTs reach it here
+
+        print(f'{args.repeat} submissions, files of {args.sizes} KB')
+        print(f'{"path":<11} {"worker (ms)":>12} {"upload handler (ms)":>20} {"largest body (KB)":>18} '
+              f'{"+ transfer at " + str(args.link_mbps) + " Mbps (ms)":>29}')
+        for label, submit in (('form post', lambda: form_post(client, contents)),
+                              ('presigned', lambda: presigned(client, middleware, contents))):
+            submit()  # warm up
+            runs = [submit() for _ in range(args.repeat)]
+            worker = sum(r[0] for r in runs) / len(runs) * 1000
+            handler = sum(r[1] for r in runs) / len(runs) * 1000
+            body = max(r[2] for r in runs)
+            transfer = worker + body * 8 / (args.link_mbps * 1e6) * 1000
+            print(f'{label:<11} {worker:>12.1f} {handler:>20.1f} {body / 1024:>18.1f} {transfer:>29.1f}')
+        assert ApplicationFile.objects.count() == 3 * 2 * (args.repeat + 1)
+
+
+if __name__ == '__main__':
+    main()
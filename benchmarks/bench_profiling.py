@@ -0,0 +1,78 @@
+"""Cost of ProfilingMiddleware (admission/profiling.py) per request.
+
+Serves --requests GETs of each --paths through Django's WSGI handler
+(django.test.Client) against a throwaway SQLite database, with the
+middleware removed, installed but idle (no X-Profile header, SAMPLE_RATE 0),
+and profiling every request in cprofile and in sample mode.  The idle
+column is the price every production request pays for having it installed.
+
+Usage: python benchmarks/bench_profiling.py [--requests 500] [--paths /info/,/apply/]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIDDLEWARE = 'admission.profiling.ProfilingMiddleware'
+
+
+def setup(tmp):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DATABASES['default']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+    settings.ALLOWED_HOSTS = ['*']
+    settings.ADMISSION_CONTROL = {'ENABLED': False}
+    settings.ADMISSION_PROFILING = {'DIR': os.path.join(tmp, 'profiles'), 'KEEP': 50}
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('seed_admissions', applications=200, stdout=io.StringIO())
+
+
+def per_request(path, requests, middleware, **headers):
+    from django.test import Client, override_settings
+    with override_settings(MIDDLEWARE=middleware):
+        client = Client()
+        client.force_login(staff())
+        client.get(path, **headers)  # load the middleware chain, warm caches
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = client.get(path, **headers)
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+    return elapsed / requests * 1000
+
+
+def staff():
+    from django.contrib.auth.models import User
+    user, _ = User.objects.get_or_create(username='bench-staff', defaults={'is_staff': True})
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--paths', default='/info/,/apply/')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(tmp)
+        from django.conf import settings
+        installed = list(settings.MIDDLEWARE)
+        removed = [m for m in installed if m != MIDDLEWARE]
+        print(f'{"path":<10} {"without ms":>10} {"idle ms":>8} {"cprofile ms":>11} {"sample ms":>9}')
+        for path in args.paths.split(','):
+            without = per_request(path, args.requests, removed)
+            idle = per_request(path, args.requests, installed)
+            cprof = per_request(path, args.requests // 5, installed, HTTP_X_PROFILE='cprofile')
+            sample = per_request(path, args.requests // 5, installed, HTTP_X_PROFILE='sample')
+            print(f'{path:<10} {without:>10.3f} {idle:>8.3f} {cprof:>11.3f} {sample:>9.3f}')
+
+
+if __name__ == '__main__':
+    main()
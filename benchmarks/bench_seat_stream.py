@@ -0,0 +1,163 @@
+"""Fan-out latency of the seat stream (apply/seats/stream/) to many open browsers.
+
+Starts the project under uvicorn in a subprocess against a throwaway SQLite
+database, opens --clients server-sent-event streams, then has the server
+accept --changes applications one after another (allocate_seats in a thread
+of the server process, as an admin request would).  For every change the
+harness records how long each stream took to receive the new counts, and
+how many events each stream got in total: changes closer together than the
+poll interval arrive as one event.
+
+The server only ever reads Department once per change (publish()), however
+many streams are open; polling GET apply/seats/ every second instead would
+cost --clients requests a second.
+
+Needs uvicorn (pip install uvicorn).
+
+Usage: python benchmarks/bench_seat_stream.py [--clients 2000] [--changes 20] [--gap 0.25]
+"""
+import os
+import io
+import sys
+import json
+import time
+import socket
+import argparse
+import asyncio
+import tempfile
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(port, db_path):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('seed_admissions', applications=200, stdout=io.StringIO())
+
+    from admission.models import Application
+    from admission.seats import allocate_seats
+
+    def accept_on_request():
+        # one line on stdin -> accept the next submitted application
+        for _ in sys.stdin:
+            app = Application.objects.filter(status='submitted').first()
+            allocate_seats([app])
+            print(json.dumps({'time': time.time()}), flush=True)
+
+    threading.Thread(target=accept_on_request, daemon=True).start()
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+    uvicorn.run(get_asgi_application(), host='127.0.0.1', port=port, log_level='error',
+                backlog=8192, lifespan='off')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def stream(port, received, connected):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'GET /apply/seats/stream/ HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n')
+    first = True
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b'data:'):
+                if first:
+                    first = False
+                    connected.append(1)
+                else:
+                    received.append((time.time(), json.loads(line[5:])['seats']))
+    finally:
+        writer.close()
+
+
+async def run(port, server, clients, changes, gap):
+    received = [[] for _ in range(clients)]
+    connected = []
+    tasks = [asyncio.create_task(stream(port, received[i], connected)) for i in range(clients)]
+    while len(connected) < clients:
+        await asyncio.sleep(0.05)
+
+    loop = asyncio.get_running_loop()
+    committed = []
+    for _ in range(changes):
+        server.stdin.write(b'accept\n')
+        server.stdin.flush()
+        committed.append(json.loads(await loop.run_in_executor(None, server.stdout.readline))['time'])
+        await asyncio.sleep(gap)
+    await asyncio.sleep(2)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # latency: commit of a change -> first event delivered after it
+    latencies = []
+    for events in received:
+        for t in committed:
+            after = [at for at, _ in events if at >= t]
+            if after:
+                latencies.append(after[0] - t)
+    latencies.sort()
+    events = [len(e) for e in received]
+    return latencies, events
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--changes', type=int, default=20)
+    parser.add_argument('--gap', type=float, default=0.25, help='seconds between changes')
+    parser.add_argument('--serve', type=int)
+    parser.add_argument('--db')
+    args = parser.parse_args()
+    if args.serve:
+        return serve(args.serve, args.db)
+
+    import resource
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = subprocess.Popen([sys.executable, __file__, '--serve', str(port), '--db', os.path.join(tmp, 'bench.sqlite3')],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        try:
+            wait_for_port(port)
+            latencies, events = asyncio.run(run(port, server, args.clients, args.changes, args.gap))
+        finally:
+            server.terminate()
+            server.wait()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f'{args.clients} streams, {args.changes} changes {args.gap}s apart')
+    print(f'delivery after commit: p50 {p50:.3f}s  p99 {p99:.3f}s  max {latencies[-1]:.3f}s')
+    print(f'events per stream: min {min(events)}  max {max(events)}  (changes coalesced within the poll interval)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Time and memory of simulated applicants in admission_info/simulate.py.
+
+Usage: python benchmarks/bench_simulate.py [N]   (default 5,000,000 applicants)
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "admission_info"))
+
+import simulate
+
+
+def table_bytes(table):
+    arrays = [table.name, table.department, table.score, table.date, table.status, table.status_pos]
+    arrays += table.status_rows + list(table.department_rows.values())
+    return sum(a.itemsize * len(a) for a in arrays)
+
+
+def main(n=5_000_000):
+    start = time.perf_counter()
+    portal = simulate.AdmissionPortal()
+    simulate.generate_random_applicants(portal, count=n, seed=42)
+    elapsed = time.perf_counter() - start
+    size = table_bytes(portal.table)
+    print(f"generated {len(portal.applicants):,} applicants in {elapsed:.1f}s")
+    print(f"columns + indexes: {size / 2**20:.1f} MiB ({size / max(n, 1):.1f} bytes/applicant)")
+    print("last applicant:", portal.get_applicant(portal.table.row_id(n - 1)).to_dict())
+
+    start = time.perf_counter()
+    for row in range(0, n, 3):
+        portal.table.set_status(row, simulate.APPROVED)
+    print(f"approved {len(range(0, n, 3)):,} applicants in {time.perf_counter() - start:.2f}s")
+
+    for label, fn in [
+        ("status_counts", portal.status_counts),
+        ("len(filter_by_status)", lambda: len(portal.filter_by_status("Approved"))),
+        ("len(filter_by_department)", lambda: len(portal.filter_by_department("CSE"))),
+        ("first 10 of filter_by_department", lambda: [a for _, a in zip(range(10), portal.filter_by_department("Law"))]),
+    ]:
+        start = time.perf_counter()
+        for _ in range(1000):
+            fn()
+        print(f"{label:<34} {(time.perf_counter() - start) * 1e3:8.3f} us/call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000)
@@ -0,0 +1,125 @@
+"""Memory and throughput of streaming_upload.receive_multipart under a burst of big uploads.
+
+Each simulated request is a 50MB multipart body (a text field and one
+PNG-signed file) generated on the fly, so the harness itself holds no body
+in memory.  A burst of them is parsed concurrently in threads:
+
+* with the app's limits (5MB per file, 10MB per request): every upload is
+  refused once its file passes 5MB, and the partial file is removed;
+* with limits raised above 50MB: every upload is written to disk.
+
+Peak Python heap (tracemalloc) is measured in a separate run from the
+timings, next to the peak of reading one body whole, as
+request.get_data() would.
+
+Needs werkzeug (pip install werkzeug).
+
+Usage: python benchmarks/bench_streaming_upload.py [--size-mb 50] [--burst 8]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streaming_upload import receive_multipart, UploadRejected
+
+BOUNDARY = b'----bench7MA4YWxkTrZu0gW'
+ALLOWED = {'jpg', 'jpeg', 'png', 'pdf'}
+MB = 1024 * 1024
+BLOCK = os.urandom(MB)
+
+
+class BodyStream:
+    """File-like multipart body of a given file size, produced as it is read."""
+    def __init__(self, file_size):
+        self.parts = [
+            b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data; name="full_name"\r\n\r\nRahim Ahmed\r\n',
+            b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data; name="photo"; filename="big.png"\r\n'
+            b'Content-Type: image/png\r\n\r\n\x89PNG\r\n\x1a\n',
+        ]
+        self.remaining = file_size - 8
+        self.tail = b'\r\n--' + BOUNDARY + b'--\r\n'
+        self.buffer = b''
+        self.read_bytes = 0
+
+    def read(self, n):
+        while len(self.buffer) < n:
+            if self.parts:
+                self.buffer += self.parts.pop(0)
+            elif self.remaining > 0:
+                take = min(self.remaining, n)
+                self.buffer += BLOCK[:take]
+                self.remaining -= take
+            elif self.tail:
+                self.buffer += self.tail
+                self.tail = b''
+            else:
+                break
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        self.read_bytes += len(data)
+        return data
+
+
+def burst(folder, size, count, max_file, max_total):
+    results = []
+
+    def one():
+        stream = BodyStream(size)
+        try:
+            _, uploads = receive_multipart(stream, BOUNDARY, folder, ALLOWED, max_file, max_total)
+            results.append(('saved', stream.read_bytes, uploads['photo'].size))
+        except UploadRejected as exc:
+            results.append(('rejected', stream.read_bytes, exc.status))
+
+    threads = [threading.Thread(target=one) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def measure(label, folder, size, count, max_file, max_total):
+    start = time.perf_counter()
+    results = burst(folder, size, count, max_file, max_total)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    burst(folder, size, count, max_file, max_total)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    outcome = sorted({r[0] for r in results})
+    read = sum(r[1] for r in results) / len(results) / MB
+    print(f"{label:<26} {'/'.join(outcome):<9} {read:>9.1f} {elapsed:>8.2f} {peak / MB:>10.2f}")
+    for name in os.listdir(folder):
+        os.unlink(os.path.join(folder, name))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=int, default=50)
+    parser.add_argument('--burst', type=int, default=8)
+    args = parser.parse_args()
+    size = args.size_mb * MB
+
+    print(f"{args.burst} concurrent uploads of {args.size_mb}MB")
+    print(f"{'limits':<26} {'outcome':<9} {'MB read':>9} {'time (s)':>8} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as folder:
+        measure('5MB file / 10MB request', folder, size, args.burst, 5 * MB, 10 * MB)
+        measure(f'raised above {args.size_mb}MB', folder, size, args.burst, size + MB, size + 2 * MB)
+
+    stream = BodyStream(size)
+    tracemalloc.start()
+    body = b''.join(iter(lambda: stream.read(MB), b''))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del body
+    print(f"\nreading one {args.size_mb}MB body whole: peak {peak / MB:.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
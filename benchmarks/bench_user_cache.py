@@ -0,0 +1,78 @@
+"""Benchmark the auth-hook user cache in admission_info/user_cache.py.
+
+The Flask API in admission_info/admission_info.py cannot be imported in this
+tree (its header is missing and it still has merge markers), so this runs
+the hook's work directly against a SQLite "users" table with the same
+schema and unique indexes: one primary-key lookup per authenticated request
+without the cache, UserCache.get_or_load with it.  It also shows the query
+plans for the register check (OR across username/email vs two lookups).
+
+Usage: python benchmarks/bench_user_cache.py [REQUESTS]   (default 200,000)
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "admission_info"))
+
+from user_cache import UserCache
+
+USERS = 50_000
+ACTIVE = 2_000
+
+
+def make_db(path):
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("""CREATE TABLE users (
+        id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE, email VARCHAR(120) NOT NULL UNIQUE,
+        password_hash VARCHAR(128) NOT NULL, role VARCHAR(20) NOT NULL, created_at DATETIME)""")
+    db.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?, datetime('now'))",
+                   ((i, f"user{i}", f"user{i}@mail.com", "x" * 64, "student") for i in range(1, USERS + 1)))
+    db.commit()
+    return db
+
+
+def main(n=200_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(os.path.join(tmp, "users.sqlite3"))
+        columns = ("id", "username", "email", "password_hash", "role", "created_at")
+
+        def load(user_id):
+            row = db.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+            return dict(zip(columns, row)) if row else None
+
+        # logged-in traffic comes from a few thousand active users at a time
+        rng = random.Random(1)
+        ids = [rng.randint(1, ACTIVE) for _ in range(n)]
+
+        start = time.perf_counter()
+        for user_id in ids:
+            load(user_id)
+        uncached = n / (time.perf_counter() - start)
+
+        cache = UserCache(maxsize=4096, ttl=30.0)
+        start = time.perf_counter()
+        for user_id in ids:
+            cache.get_or_load(user_id, load)
+        cached = n / (time.perf_counter() - start)
+
+        print(f"auth hook, no cache     {uncached:12,.0f} requests/s")
+        print(f"auth hook, UserCache    {cached:12,.0f} requests/s  "
+              f"(hit rate {cache.hits / (cache.hits + cache.misses):.1%})")
+
+        print("\nregister check query plans:")
+        for label, sql, args in [
+            ("OR", "SELECT id FROM users WHERE username = ? OR email = ? LIMIT 1", ("nobody", "nobody@mail.com")),
+            ("username", "SELECT id FROM users WHERE username = ? LIMIT 1", ("nobody",)),
+            ("email", "SELECT id FROM users WHERE email = ? LIMIT 1", ("nobody@mail.com",)),
+        ]:
+            plan = "; ".join(row[-1] for row in db.execute("EXPLAIN QUERY PLAN " + sql, args))
+            print(f"  {label:<9} {plan}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,120 @@
+"""Throughput of the document verification pipeline (verify_documents).
+
+Builds a throwaway SQLite database and media folder holding --apps
+applications with a photo (1200x1600 JPEG), a signature (600x200 PNG) and a
+transcript (a PDF of a few pages) each, some of them blank, truncated or
+encrypted, then drains the queue with verify_batch() for each --workers
+count: the checks run in a process pool and every batch of results is
+recorded and its applications settled in one transaction.
+
+Usage: python benchmarks/bench_verify_documents.py [--apps 300] [--workers 1,2,4] [--batch 500]
+"""
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup(tmp):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DATABASES['default']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+    settings.MEDIA_ROOT = os.path.join(tmp, 'media')
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('seed_admissions', applications=0, stdout=io.StringIO())
+
+
+def image(size, fmt, rng, blank=False):
+    from PIL import Image
+    if blank:
+        im = Image.new('RGB', size, (250, 250, 250))
+    else:
+        # noise at a quarter of the size, scaled up: photo-like file sizes
+        small = Image.effect_noise((size[0] // 4, size[1] // 4), 40 + rng.randrange(20)).convert('RGB')
+        im = small.resize(size)
+    out = io.BytesIO()
+    im.save(out, fmt, quality=85) if fmt == 'JPEG' else im.save(out, fmt)
+    return out.getvalue()
+
+
+def pdf(pages, rng, encrypted=False):
+    objects = [b'<</Type/Catalog/Pages 2 0 R>>',
+               b'<</Type/Pages/Kids[%s]/Count %d>>' % (b' '.join(b'%d 0 R' % (3 + 2 * i) for i in range(pages)), pages)]
+    for i in range(pages):
+        text = b'BT /F1 12 Tf 72 720 Td (' + os.urandom(4000).hex().encode() + b') Tj ET'
+        objects.append(b'<</Type/Page/Parent 2 0 R/Contents %d 0 R>>' % (4 + 2 * i))
+        objects.append(b'<</Length %d>>stream\n%s\nendstream' % (len(text), text))
+    body = b''.join(b'%d 0 obj%sendobj\n' % (n + 1, obj) for n, obj in enumerate(objects))
+    trailer = b'<</Root 1 0 R%s>>' % (b'/Encrypt 99 0 R' if encrypted else b'')
+    return b'%PDF-1.7\n' + body + b'trailer' + trailer + b'\n%%EOF\n'
+
+
+def build(apps, rng):
+    from django.core.files.storage import default_storage
+    from django.core.files.base import ContentFile
+    from admission.models import Department, Application, ApplicationFile
+
+    dept = Department.objects.first()
+    photos = [image((1200, 1600), 'JPEG', rng) for _ in range(8)] + [image((1200, 1600), 'JPEG', rng, blank=True)]
+    signs = [image((600, 200), 'PNG', rng) for _ in range(4)]
+    transcripts = [pdf(rng.randint(1, 6), rng) for _ in range(8)] + [pdf(2, rng, encrypted=True)]
+    applications = Application.objects.bulk_create(
+        Application(full_name=f'Applicant {i}', email='a@example.com', phone='1', department=dept, program='bachelors')
+        for i in range(apps))
+    files = []
+    total = 0
+    for i, app in enumerate(applications):
+        for kind, pool, ext in (('photo', photos, 'jpg'), ('sign', signs, 'png'), ('transcript', transcripts, 'pdf')):
+            content = rng.choice(pool)
+            if rng.random() < 0.02:
+                content = content[:len(content) // 2]  # interrupted upload
+            name = default_storage.save(f'bench/{app.pk}/{kind}.{ext}', ContentFile(content))
+            files.append(ApplicationFile(application=app, kind=kind, file=name))
+            total += len(content)
+    ApplicationFile.objects.bulk_create(files)
+    return len(files), total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=300)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(tmp)
+        from django.db.models import Count
+        from admission.models import Application, ApplicationFile
+        from admission.management.commands.verify_documents import verify_batch
+
+        count, size = build(args.apps, random.Random(7))
+        print(f'{count} documents, {size / 2**20:.1f} MB, {os.cpu_count()} CPUs')
+        print(f'{"workers":>7} {"seconds":>8} {"documents/min":>14} {"MB/s":>6}')
+        for workers in (int(w) for w in args.workers.split(',')):
+            ApplicationFile.objects.update(verification='pending')
+            Application.objects.update(status='submitted')
+            with ProcessPoolExecutor(workers) as executor:
+                executor.submit(int).result()  # start the workers before timing
+                start = time.perf_counter()
+                while verify_batch(executor, args.batch, workers):
+                    pass
+                elapsed = time.perf_counter() - start
+            print(f'{workers:>7} {elapsed:>8.2f} {count / elapsed * 60:>14,.0f} {size / 2**20 / elapsed:>6.1f}')
+        outcome = dict(Application.objects.values_list('status').annotate(n=Count('pk')))
+        failed = ApplicationFile.objects.filter(verification='failed').count()
+        print(f'applications: {outcome}; failed documents: {failed}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Load test for submission admission control (admission/admission_control.py).
+
+Starts the project in a threaded WSGI server subprocess against a throwaway
+SQLite database, then offers open-loop POST /apply/submit/ traffic at
+increasing rates, once with admission control off and once with it on.
+Goodput is applications saved (302) per second of the run, counting only
+requests answered within the client timeout.  With control on, excess load
+gets a fast 503 plus a queue ticket instead of piling up on the SQLite
+writer; simulated clients behave like the waiting-room page and come back
+with their ticket after Retry-After, until the run ends.
+
+Usage: python benchmarks/load_waiting_room.py [--rates 50,100,200,300] [--seconds 10] [--capacity 100]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import asyncio
+import subprocess
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(port, control, rate, db_path):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.DATABASES['default'].setdefault('OPTIONS', {})['timeout'] = 30
+    # The load generator has no browser session, so skip CSRF for this harness only.
+    settings.MIDDLEWARE = [m for m in settings.MIDDLEWARE if 'csrf' not in m.lower()]
+    # Simulated clients are told apart by the X-Forwarded-For a proxy would add.
+    settings.ADMISSION_CONTROL = {**settings.ADMISSION_CONTROL, 'ENABLED': control, 'TRUSTED_PROXIES': 1,
+                                  'RATE': rate, 'BURST': rate, 'CLIENT_BURST': 100}
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+
+    from django.core.management import call_command
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+    from admission.models import Department
+    call_command('migrate', verbosity=0)
+    Department.objects.get_or_create(code='CSE', defaults={'name': 'CSE', 'per_credit_fee': 100, 'seats': 100})
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadedWSGIServer(('127.0.0.1', port), QuietHandler)
+    httpd.request_queue_size = 1024
+    httpd.set_app(get_wsgi_application())
+    print('ready', flush=True)
+    httpd.serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def post(port, body, headers, timeout):
+    """POST /apply/submit/; returns (status, response headers, latency)."""
+    start = time.perf_counter()
+    head = ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+    request = (f'POST /apply/submit/ HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n'
+               f'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n'
+               f'{head}\r\n').encode() + body
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        writer.write(request)
+        raw = await asyncio.wait_for(reader.read(), timeout - (time.perf_counter() - start))
+    except (OSError, asyncio.TimeoutError):
+        return 'timeout', {}, time.perf_counter() - start
+    finally:
+        if writer is not None:
+            writer.close()
+    lines = raw.split(b'\r\n\r\n', 1)[0].decode('latin-1').split('\r\n')
+    if not lines[0].startswith('HTTP/'):
+        return 'error', {}, time.perf_counter() - start
+    status = int(lines[0].split()[1])
+    response_headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+    return status, response_headers, time.perf_counter() - start
+
+
+async def client(i, port, end, timeout, results):
+    body = urlencode({'full_name': 'Load Test', 'email': f'load{i}@example.com',
+                      'phone': '01711111111', 'department': 'CSE'}).encode()
+    headers = {'X-Forwarded-For': f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}'}
+    while True:
+        status, response_headers, latency = await post(port, body, headers, timeout)
+        if status != 503:
+            break
+        cookie = response_headers.get('Set-Cookie')
+        if cookie:
+            headers['Cookie'] = cookie.split(';', 1)[0]
+        retry_at = time.perf_counter() + float(response_headers.get('Retry-After', '1'))
+        if retry_at > end:
+            break
+        await asyncio.sleep(retry_at - time.perf_counter())
+    if time.perf_counter() <= end + timeout:
+        results.append((status, latency))
+
+
+async def offer_load(port, rate, seconds, timeout):
+    """Open-loop arrivals at rate/s for seconds; returns (goodput/s, queued, failed, p99)."""
+    results = []
+    begin = time.perf_counter()
+    end = begin + seconds
+    tasks = []
+    for i in range(int(rate * seconds)):
+        delay = begin + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(client(i, port, end, timeout, results)))
+    await asyncio.gather(*tasks)
+    good = sorted(lat for status, lat in results if status == 302 and lat <= timeout)
+    queued = sum(1 for status, _ in results if status in (429, 503))
+    failed = len(results) - len(good) - queued
+    p99 = good[int(len(good) * 0.99) - 1] if good else float('nan')
+    return len(good) / seconds, queued, failed, p99
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rates', default='50,100,200,300')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=2.0)
+    parser.add_argument('--capacity', type=int, default=100, help='ADMISSION_CONTROL RATE while control is on')
+    parser.add_argument('--serve', type=int)
+    parser.add_argument('--control', choices=['on', 'off'])
+    parser.add_argument('--db')
+    args = parser.parse_args()
+    if args.serve:
+        return serve(args.serve, args.control == 'on', args.capacity, args.db)
+
+    print(f'{"control":<8} {"offered/s":>9} {"goodput/s":>10} {"queued":>7} {"failed":>7} {"p99 ok (s)":>11}')
+    for control in ('off', 'on'):
+        for rate in (float(r) for r in args.rates.split(',')):
+            # fresh server and database per step, so queues left by one
+            # step do not eat into the next one's capacity
+            with tempfile.TemporaryDirectory() as tmp:
+                port = free_port()
+                server = subprocess.Popen(
+                    [sys.executable, __file__, '--serve', str(port), '--control', control,
+                     '--capacity', str(args.capacity), '--db', os.path.join(tmp, 'load.sqlite3')],
+                    stdout=subprocess.PIPE, text=True)
+                try:
+                    server.stdout.readline()
+                    goodput, queued, failed, p99 = asyncio.run(offer_load(port, rate, args.seconds, args.timeout))
+                    print(f'{control:<8} {rate:>9.0f} {goodput:>10.1f} {queued:>7} {failed:>7} {p99:>11.3f}', flush=True)
+                finally:
+                    server.terminate()
+                    server.wait()
+
+
+if __name__ == '__main__':
+    main()
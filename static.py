@@ -3,8 +3,9 @@ import os
 import re
 import uuid
 from datetime import datetime, date
-from flask import (Flask, render_template_string, request, redirect,
+from flask import (Flask, render_template, request, redirect,
                    url_for, flash, send_from_directory, abort, jsonify)
+from jinja2 import ChoiceLoader, DictLoader
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf import FlaskForm
 from wtforms import (StringField, SubmitField, SelectField, PasswordField,
@@ -14,6 +15,8 @@ from wtforms.validators import (DataRequired, Email, Length, Regexp,
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from streaming_upload import receive_multipart, discard_uploads, UploadRejected
+
 # -------------------------
 # Configuration
 # -------------------------
@@ -140,6 +143,25 @@ def validate_dob_age(form, field):
         raise ValidationError('Applicant must be at least 15 years old.')
 
 
+def streamed_form():
+    """Parse the multipart request body as it arrives (see streaming_upload.py).
+
+    Files are size-checked, sniffed and written under UPLOAD_FOLDER while the
+    body is read; returns (form data for the WTForms form, saved uploads).
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if not boundary:
+        raise UploadRejected('malformed upload: no multipart boundary')
+    return receive_multipart(
+        request.stream,
+        boundary.encode('latin-1'),
+        app.config['UPLOAD_FOLDER'],
+        ALLOWED_EXT,
+        MAX_FILE_SIZE,
+        app.config['MAX_CONTENT_LENGTH'],
+    )
+
+
 def allowed_file(filename):
     if not filename:
         return False
@@ -197,7 +219,7 @@ BASE_HTML = """
 """
 
 INDEX_HTML = """
-{% extends base %}
+{% extends "base.html" %}
 {% block content %}
   <p><a href="{{ url_for('apply') }}">Apply Now</a> | <a href="{{ url_for('admin_list') }}">Admin: View Applications</a></p>
   <p>Sample Departments:</p>
@@ -210,7 +232,7 @@ INDEX_HTML = """
 """
 
 APPLY_HTML = """
-{% extends base %}
+{% extends "base.html" %}
 {% block content %}
   <h2>Application Form</h2>
   <form method="post" enctype="multipart/form-data">
@@ -236,7 +258,7 @@ APPLY_HTML = """
 """
 
 APPLICATION_VIEW_HTML = """
-{% extends base %}
+{% extends "base.html" %}
 {% block content %}
   <h2>Application {{ app.id }}</h2>
   <p><strong>Name:</strong> {{ app.full_name }}</p>
@@ -272,7 +294,7 @@ APPLICATION_VIEW_HTML = """
 """
 
 ADMIN_LIST_HTML = """
-{% extends base %}
+{% extends "base.html" %}
 {% block content %}
   <h2>All Applications</h2>
   <table>
@@ -298,18 +320,41 @@ ADMIN_LIST_HTML = """
 {% endblock %}
 """
 
+# The inline templates are registered under names and compiled once here;
+# Jinja's template cache then hands the routes the compiled objects (base
+# included) instead of re-parsing the strings on every request.
+TEMPLATES = {
+    'base.html': BASE_HTML,
+    'index.html': INDEX_HTML,
+    'apply.html': APPLY_HTML,
+    'application_view.html': APPLICATION_VIEW_HTML,
+    'admin_list.html': ADMIN_LIST_HTML,
+}
+app.jinja_env.loader = ChoiceLoader([DictLoader(TEMPLATES), app.jinja_env.loader])
+for _name in TEMPLATES:
+    app.jinja_env.get_template(_name)
+
 # -------------------------
 # Routes
 # -------------------------
 @app.route('/')
 def index():
     depts = Department.query.all()
-    return render_template_string(INDEX_HTML, base=BASE_HTML, depts=depts)
+    return render_template('index.html', depts=depts)
 
 
 @app.route('/apply', methods=['GET', 'POST'])
 def apply():
-    form = ApplicationForm()
+    uploads = {}
+    if request.method == 'POST' and request.mimetype == 'multipart/form-data':
+        try:
+            formdata, uploads = streamed_form()
+        except UploadRejected as exc:
+            flash(str(exc), 'error')
+            return redirect(url_for('apply'))
+        form = ApplicationForm(formdata=formdata)
+    else:
+        form = ApplicationForm()
     # populate departments choices
     depts = Department.query.all()
     form.department.choices = [(d.id, f'{d.code} - {d.name}') for d in depts]
@@ -317,6 +362,9 @@ def apply():
         # create application
         dept = Department.query.get(form.department.data)
         if not dept:
+            discard_uploads(uploads)
             flash('Selected department not found', 'error')
             return redirect(url_for('apply'))
-
+    # Reaching here, the request created no application (a GET, or a form
+    # that did not validate), so nothing will reference the files it uploaded.
+    discard_uploads(uploads)
@@ -0,0 +1,181 @@
+# streaming_upload.py
+"""Streaming multipart parser for the Flask app's application uploads (static.py).
+
+Werkzeug normally parses the whole request body before the view runs and
+only then lets allowed_file() look at the extension.  receive_multipart()
+instead reads the body in CHUNK-sized pieces through werkzeug's sans-IO
+MultipartDecoder and, while reading:
+
+* caps every file at max_file_size and the whole body at max_total bytes;
+* checks the first bytes of every file against the known signatures, so a
+  renamed .exe is rejected after its first chunk, not after 5MB;
+* writes each file straight to its final name under the upload folder while
+  updating a SHA-256 of its contents;
+* refuses a second file for a field that already has one, rather than
+  leaving the first on disk unreferenced.
+
+Memory stays around one chunk per request however large the upload.  On
+any rejection the files already written for the request are removed.
+"""
+import os
+import hashlib
+import uuid
+from dataclasses import dataclass
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+
+CHUNK = 64 * 1024
+SNIFF_BYTES = 8
+MAX_FIELDS_SIZE = 64 * 1024  # all non-file form fields together
+
+# file signature -> extension the file is saved under
+SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'%PDF-', 'pdf'),
+]
+
+
+class UploadRejected(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class SavedUpload:
+    field: str
+    original_name: str
+    filename: str      # relative to the upload folder
+    path: str
+    size: int
+    sha256: str
+
+
+def _size(n):
+    return f'{n // (1024 * 1024)}MB' if n >= 1024 * 1024 else f'{n // 1024}KB'
+
+
+def sniff(head):
+    """Extension for the file that starts with head, or None if unrecognised."""
+    for magic, ext in SIGNATURES:
+        if head.startswith(magic):
+            return ext
+    return None
+
+
+class _Writer:
+    def __init__(self, field, original_name, folder, allowed, max_file_size):
+        self.field = field
+        self.original_name = original_name
+        self.folder = folder
+        self.allowed = allowed
+        self.max_file_size = max_file_size
+        self.head = b''
+        self.size = 0
+        self.hash = hashlib.sha256()
+        self.file = None
+        self.filename = None
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_file_size:
+            raise UploadRejected(f'{self.field}: file is larger than {_size(self.max_file_size)}', 413)
+        self.hash.update(data)
+        if self.file is None:
+            self.head += data
+            if len(self.head) < SNIFF_BYTES:
+                return
+            data, self.head = self.head, b''
+            self.open(data)
+        self.file.write(data)
+
+    def open(self, head):
+        ext = sniff(head)
+        if ext is None or ext not in self.allowed:
+            raise UploadRejected(f'{self.field}: only {", ".join(sorted(self.allowed))} files are accepted')
+        self.filename = f'{uuid.uuid4().hex}.{ext}'
+        self.file = open(os.path.join(self.folder, self.filename), 'xb')
+
+    def finish(self):
+        if self.file is None:
+            if not self.head:
+                return None  # empty file input
+            self.open(self.head)
+            self.file.write(self.head)
+        self.file.close()
+        return SavedUpload(self.field, self.original_name, self.filename,
+                           os.path.join(self.folder, self.filename), self.size, self.hash.hexdigest())
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+            os.unlink(self.file.name)
+
+
+def discard_uploads(uploads):
+    for upload in uploads.values():
+        try:
+            os.unlink(upload.path)
+        except FileNotFoundError:
+            pass
+
+
+def receive_multipart(stream, boundary, folder, allowed, max_file_size, max_total, chunk=CHUNK):
+    """Parse a multipart/form-data body from stream.
+
+    Returns (fields, uploads): a MultiDict of the text fields and a dict of
+    field name -> SavedUpload for the non-empty file inputs.  The caller owns
+    the saved files: it must discard_uploads() them unless it keeps them.
+    """
+    decoder = MultipartDecoder(boundary)
+    fields = MultiDict()
+    uploads = {}
+    current = None   # (name, [bytes]) for a text field, or a _Writer
+    total = 0
+    fields_size = 0
+    eof = False
+    try:
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, NeedData):
+                if eof:
+                    raise UploadRejected('incomplete upload')
+                data = stream.read(chunk)
+                total += len(data)
+                if total > max_total:
+                    raise UploadRejected(f'request is larger than {_size(max_total)}', 413)
+                eof = not data
+                decoder.receive_data(data or None)
+            elif isinstance(event, File):
+                if event.name in uploads:
+                    raise UploadRejected(f'{event.name}: only one file can be uploaded')
+                current = _Writer(event.name, event.filename, folder, allowed, max_file_size)
+            elif isinstance(event, Field):
+                current = (event.name, [])
+            elif isinstance(event, Data):
+                if isinstance(current, _Writer):
+                    current.write(event.data)
+                    if not event.more_data:
+                        upload = current.finish()
+                        if upload is not None:
+                            uploads[upload.field] = upload
+                        current = None
+                else:
+                    fields_size += len(event.data)
+                    if fields_size > MAX_FIELDS_SIZE:
+                        raise UploadRejected(f'form fields are larger than {_size(MAX_FIELDS_SIZE)}', 413)
+                    current[1].append(event.data)
+                    if not event.more_data:
+                        fields.add(current[0], b''.join(current[1]).decode('utf-8', 'replace'))
+                        current = None
+            elif isinstance(event, Epilogue):
+                return fields, uploads
+    except Exception as exc:
+        if isinstance(current, _Writer):
+            current.discard()
+        discard_uploads(uploads)
+        if isinstance(exc, ValueError):
+            raise UploadRejected(f'malformed upload: {exc}') from exc
+        raise
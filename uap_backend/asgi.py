@@ -8,9 +8,24 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import time
 
-from django.core.asgi import get_asgi_application
+started = time.perf_counter()
+
+from django.core.asgi import get_asgi_application  # noqa: E402
+
+imported = time.perf_counter()
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Signed document PUTs (admission/uploads.py) are written to storage here,
+# without going through Django's request handling.
+from admission.uploads import UploadASGIMiddleware  # noqa: E402  (needs the app registry)
+from admission.startup import worker_ready  # noqa: E402
+
+application = UploadASGIMiddleware(django_application)
+
+# Time the boot and warm the worker up before it serves (admission/startup.py).
+worker_ready('asgi', started, imported)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 
@@ -43,10 +44,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'admission.db_router.PinPrimaryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'admission.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,7 +84,94 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # Read replica for the public catalog pages and staff reports, refreshed
+    # from the primary by `manage.py refresh_replica` (see admission/db_router.py).
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_ROUTERS = ['admission.db_router.PrimaryReplicaRouter']
+# How long a client reads from the primary after it writes; keep it above
+# the refresh_replica interval.
+REPLICA_PIN_SECONDS = 60
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per worker process.  With several workers set CACHE_URL
+# (redis://host:6379/0) so that rate limits, the waiting-room queue, sessions
+# and the catalog/fee/seat invalidations are shared by all of them.
+# Admission control has an alias of its own: culling in the busy default
+# cache must not drop queue positions or the record of used tickets.
+# Reports of closed date ranges (admission/reports.py) go to 'reports',
+# which is on disk without CACHE_URL so that the site and the
+# admission_report command share them and they survive restarts.
+
+CACHE_URL = os.environ.get('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': alias,
+        }
+        for alias in ('default', 'admission', 'reports')
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 50_000},
+        },
+        'admission': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'admission',
+            'OPTIONS': {'MAX_ENTRIES': 1_000_000},
+        },
+        'reports': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache' / 'reports',
+            'OPTIONS': {'MAX_ENTRIES': 10_000},
+        },
     }
+
+# Sessions live in the cache and reach the database only for staff logins
+# (admission/sessions.py); flash messages travel in a signed cookie, so the
+# anonymous apply flow never writes a session.
+SESSION_ENGINE = 'admission.sessions'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Submission admission control (see admission/admission_control.py)
+ADMISSION_CONTROL = {
+    'RATE': 20,          # submissions/second the database can absorb
+    'BURST': 40,
+    'CLIENT_RATE': 0.2,  # one submission per 5 seconds per client...
+    'CLIENT_BURST': 3,   # ...after an initial 3
+}
+
+# On-demand request profiling (see admission/profiling.py): staff send
+# "X-Profile: cprofile" or "X-Profile: sample" and find the result at
+# /staff/profiles/; SAMPLE_RATE also profiles that fraction of all requests.
+ADMISSION_PROFILING = {
+    'SAMPLE_RATE': 0,
+    'KEEP': 50,
+    'DIR': BASE_DIR / 'profiles',
+}
+
+# Queries slower than THRESHOLD_MS are logged with their plan and caller
+# (see admission/slow_queries.py); `manage.py slow_queries` ranks them.
+ADMISSION_SLOW_QUERIES = {
+    'THRESHOLD_MS': 100,
+    'LOG': BASE_DIR / 'slow_queries.log',
+}
+
+# wsgi.py / asgi.py warm each worker up (URLs, templates, catalog cache)
+# before it serves; see admission/startup.py and `manage.py startup_time`.
+ADMISSION_STARTUP = {
+    'WARM_UP': True,
 }
 
 
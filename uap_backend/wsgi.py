@@ -8,11 +8,20 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
 import os
+import time
 
-from django.core.wsgi import get_wsgi_application
+started = time.perf_counter()
+
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+imported = time.perf_counter()
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uap_backend.settings')
 
 
 application = get_wsgi_application()
 
+# Time the boot and warm the worker up before it serves (admission/startup.py).
+from admission.startup import worker_ready  # noqa: E402  (needs the app registry)
+
+worker_ready('wsgi', started, imported)